@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Benchmark compiled tag accessors against inspecting the tag_map per call
+
+For each sample file, times ``f.get(key)`` (with ``cache_reads`` off, so
+every call goes through the accessor) against the old uncompiled path,
+which works out what kind of getter a tag_map entry has on every call,
+and against fetching the backing value straight from mutagen. Also times
+``f.set(key, val)``.
+
+    $ python benchmarks/bench_accessors.py [-n NUMBER] [--keys KEY ...]
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import music_tag
+from music_tag import util
+from music_tag.file import MetadataItem
+
+
+sample_dir = os.path.join(os.path.dirname(__file__), '..', 'sample')
+
+
+def _raw_getter(f, norm_key):
+    getter = f.tag_map[norm_key].getter
+    if isinstance(getter, (list, tuple)):
+        getter = getter[0]
+
+    if hasattr(getter, '__call__'):
+        return lambda: getter(f, norm_key)
+    elif norm_key.startswith('#'):
+        return lambda: getattr(f.mfile.info, getter)
+    else:
+        return lambda: f._ft_getter(getter)
+
+
+def _uncompiled_get(f, norm_key):
+    # AudioFile.get as it was before tag_map entries were compiled
+    norm_key = f._normalize_norm_key(norm_key)
+    tmap = f.tag_map[norm_key]
+    if hasattr(tmap.getter, '__call__'):
+        val = tmap.getter(f, norm_key)
+    elif norm_key.startswith('#'):
+        val = getattr(f.mfile.info, tmap.getter)
+        val = None if val is None else tmap.type(val)
+    elif isinstance(tmap.getter, (list, tuple)):
+        val = None
+        for getter in tmap.getter:
+            if val is not None:
+                break
+            if hasattr(getter, '__call__'):
+                val = getter(f, norm_key)
+            elif getter in f.mfile.tags:
+                val = f._ft_getter(getter)
+    else:
+        try:
+            val = f._ft_getter(tmap.getter)
+        except KeyError:
+            val = None
+    return MetadataItem(tmap.type, tmap.sanitizer, val)
+
+
+def _time(func, number):
+    return 1e6 * timeit.timeit(func, number=number) / number
+
+
+def _main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=20000)
+    parser.add_argument('--keys', nargs='+',
+                        default=['title', 'Album Artist', 'tracknumber',
+                                 'year', '#length'])
+    args = parser.parse_args()
+
+    fnames = sorted(os.path.join(sample_dir, f) for f in os.listdir(sample_dir)
+                    if f.startswith('440Hz'))
+
+    print("{0:16s} {1:14s} {2:>10s} {3:>10s} {4:>10s} {5:>8s}"
+          "".format('file', 'key', 'raw', 'uncompiled', 'compiled',
+                    'speedup'))
+    tot_raw, tot_old, tot_get = 0.0, 0.0, 0.0
+    for fname in fnames:
+        f = music_tag.load_file(fname)
+        # time the accessors, not hits in the read cache
+        f.cache_reads = False
+        for key in args.keys:
+            norm_key = f._normalize_norm_key(key)
+            t_raw = _time(_raw_getter(f, norm_key), args.number)
+            t_old = _time(lambda: _uncompiled_get(f, key), args.number)
+            t_get = _time(lambda: f.get(key), args.number)
+            tot_raw += t_raw
+            tot_old += t_old
+            tot_get += t_get
+            print("{0:16s} {1:14s} {2:7.2f} us {3:7.2f} us {4:7.2f} us "
+                  "{5:7.2f}x".format(os.path.basename(fname), key, t_raw,
+                                     t_old, t_get, t_old / t_get))
+    n = len(fnames) * len(args.keys)
+    print("{0:31s} {1:7.2f} us {2:7.2f} us {3:7.2f} us {4:7.2f}x"
+          "".format('mean', tot_raw / n, tot_old / n, tot_get / n,
+                    tot_old / tot_get))
+
+    print()
+    print("{0:16s} {1:14s} {2:>10s}".format('file', 'key', 'set'))
+    for fname in fnames:
+        f = music_tag.load_file(fname)
+        for key, val in (('title', 'bench title'), ('tracknumber', 3)):
+            t_set = _time(lambda: f.set(key, val), args.number // 4)
+            print("{0:16s} {1:14s} {2:7.2f} us".format(os.path.basename(fname),
+                                                       key, t_set))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_main())
+
+##
+## EOF
+##
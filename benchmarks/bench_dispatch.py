@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Benchmark the cost of picking the AudioFile class for a file
+
+Compares the old dispatch (mutagen.File scoring every format, then an
+isinstance check against every AudioFile subclass found by walking the
+class tree) with the registry based dispatch in load_file.
+
+    $ python benchmarks/bench_dispatch.py [-n NUMBER]
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import mutagen
+import music_tag
+from music_tag import registry
+
+
+sample_dir = os.path.join(os.path.dirname(__file__), '..', 'sample')
+
+
+def _subclass_spider_dfs(kls, _lst=None):
+    if _lst is None:
+        _lst = []
+    for sub in kls.__subclasses__():
+        _subclass_spider_dfs(sub, _lst=_lst)
+    _lst.append(kls)
+    return _lst
+
+
+def old_dispatch(fname):
+    mfile = mutagen.File(fname, easy=False)
+    for kls in _subclass_spider_dfs(music_tag.AudioFile):
+        if kls.mutagen_kls is not None and isinstance(mfile, kls.mutagen_kls):
+            return kls
+    return None
+
+
+def old_detect(fname):
+    # everything mutagen.File does up to (but not including) parsing
+    with open(fname, 'rb') as fileobj:
+        header = fileobj.read(128)
+        kind = registry.score(fname, fileobj, header)
+    for kls in _subclass_spider_dfs(music_tag.AudioFile):
+        if kls.mutagen_kls is not None and issubclass(kind, kls.mutagen_kls):
+            return kls
+    return None
+
+
+def new_dispatch(fname):
+    return type(music_tag.load_file(fname))
+
+
+def new_detect(fname):
+    return registry.audiofile_kls(registry.detect_mutagen_kls(fname))
+
+
+def _main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=200)
+    args = parser.parse_args()
+
+    fnames = sorted(os.path.join(sample_dir, f) for f in os.listdir(sample_dir)
+                    if f.startswith('440Hz'))
+
+    print("{0:16s} {1:>14s} {2:>14s} {3:>14s} {4:>14s}"
+          "".format('file', 'old detect', 'new detect', 'old load',
+                    'new load'))
+    for fname in fnames:
+        assert old_dispatch(fname) is new_dispatch(fname), fname
+        assert old_detect(fname) is new_detect(fname), fname
+
+        times = []
+        for func in (old_detect, new_detect, old_dispatch, new_dispatch):
+            t = timeit.timeit(lambda: func(fname), number=args.number)
+            times.append(1e6 * t / args.number)
+        print("{0:16s} {1:11.1f} us {2:11.1f} us {3:11.1f} us {4:11.1f} us"
+              "".format(os.path.basename(fname), *times))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_main())
+
+##
+## EOF
+##
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Benchmark load_file() with and without parsing audio stream info
+
+For each sample file, times loading the file and reading its tags with
+load_file(fname) and load_file(fname, info=False). Formats whose stream
+info can't be put off show about the same time for both.
+
+Also times an MP3 with 512KiB of junk between its ID3 tag and the first
+audio frame, which mutagen has to scan through looking for a frame sync
+(the same happens with MP3s that have broken first frames).
+
+    $ python benchmarks/bench_info.py [-n NUMBER] [--keys KEY ...]
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import music_tag
+
+
+sample_dir = os.path.join(os.path.dirname(__file__), '..', 'sample')
+
+
+def _make_junk_mp3(dest_dir):
+    src = os.path.join(sample_dir, '440Hz.mp3')
+    dest = os.path.join(dest_dir, '440Hz_junk.mp3')
+    offset = music_tag.load_file(src).mfile.tags.size
+    with open(src, 'rb') as fin:
+        data = fin.read()
+    with open(dest, 'wb') as fout:
+        fout.write(data[:offset])
+        # lots of false frame syncs
+        fout.write(b'\xff\x00' * (256 * 1024))
+        fout.write(data[offset:])
+    return dest
+
+
+def _time(fname, keys, info, number):
+    def _load():
+        f = music_tag.load_file(fname, info=info)
+        f.snapshot(keys)
+    timer = timeit.Timer(_load)
+    if number is None:
+        # as many loads as take about 0.2s, slow files get fewer
+        number, t = timer.autorange()
+    else:
+        t = timer.timeit(number=number)
+    return 1e6 * t / number
+
+
+def _run(fnames, args):
+    print("{0:18s} {1:>12s} {2:>12s} {3:>8s}"
+          "".format('file', 'info (us)', 'no info (us)', 'speedup'))
+    for fname in fnames:
+        t_info = _time(fname, args.keys, True, args.number)
+        t_noinfo = _time(fname, args.keys, False, args.number)
+        print("{0:18s} {1:12.1f} {2:12.1f} {3:7.2f}x"
+              "".format(os.path.basename(fname), t_info, t_noinfo,
+                        t_info / t_noinfo))
+
+
+def _main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=None,
+                        help='loads per file (default: enough for ~0.2s)')
+    parser.add_argument('--keys', nargs='+',
+                        default=['title', 'artist', 'album', 'tracknumber',
+                                 'year'])
+    args = parser.parse_args()
+
+    fnames = sorted(os.path.join(sample_dir, f) for f in os.listdir(sample_dir)
+                    if f.startswith('440Hz'))
+    tmp_dir = tempfile.mkdtemp(prefix='music_tag_bench_')
+    try:
+        fnames.append(_make_junk_mp3(tmp_dir))
+        _run(fnames, args)
+    finally:
+        shutil.rmtree(tmp_dir)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(_main())
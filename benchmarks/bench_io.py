@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Benchmark load_file() through regular file objects vs. memory maps
+
+For each sample file, counts the I/O syscalls made while parsing it
+(open / read / lseek / close on the file, plus mmap / munmap for the
+memory map), and times load_file(fname, io=...) with the file in the page
+cache.
+
+Syscalls are counted by wrapping the raw file object, which is where the
+buffered reader mutagen sees turns reads and seeks into syscalls; under
+strace the numbers match give or take the fstat / ioctl calls Python makes
+when opening a file.
+
+    $ python benchmarks/bench_io.py [-n NUMBER]
+"""
+
+from __future__ import print_function
+import argparse
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import music_tag
+from music_tag import fileops
+
+
+sample_dir = os.path.join(os.path.dirname(__file__), '..', 'sample')
+
+IO_MODES = ('file', 'mmap')
+
+
+class _Counter(object):
+    syscalls = 0
+
+
+class _CountingFileIO(io.FileIO):
+    def __init__(self, *args, **kwargs):
+        _Counter.syscalls += 1
+        super(_CountingFileIO, self).__init__(*args, **kwargs)
+
+    def readinto(self, b):
+        _Counter.syscalls += 1
+        return super(_CountingFileIO, self).readinto(b)
+
+    def readall(self):
+        _Counter.syscalls += 1
+        return super(_CountingFileIO, self).readall()
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        _Counter.syscalls += 1
+        return super(_CountingFileIO, self).seek(pos, whence)
+
+    def tell(self):
+        _Counter.syscalls += 1
+        return super(_CountingFileIO, self).tell()
+
+    def close(self):
+        if not self.closed:
+            _Counter.syscalls += 1
+        super(_CountingFileIO, self).close()
+
+
+class _CountingMmapReader(fileops.MmapReader):
+    def __new__(cls, *args, **kwargs):
+        _Counter.syscalls += 1
+        return super(_CountingMmapReader, cls).__new__(cls, *args, **kwargs)
+
+    def close(self):
+        if not self.closed:
+            _Counter.syscalls += 1
+        super(_CountingMmapReader, self).close()
+
+
+def _counting_open(filename, mode='rb'):
+    return io.BufferedReader(_CountingFileIO(filename, mode))
+
+
+def _count_syscalls(fname, io_mode):
+    # fileops looks up open() and MmapReader as globals when opening files
+    fileops.open = _counting_open
+    fileops.MmapReader = _CountingMmapReader
+    try:
+        _Counter.syscalls = 0
+        music_tag.load_file(fname, io=io_mode)
+        return _Counter.syscalls
+    finally:
+        del fileops.open
+        fileops.MmapReader = _CountingMmapReader.__bases__[0]
+
+
+def _time(fname, io_mode, number):
+    t = timeit.timeit(lambda: music_tag.load_file(fname, io=io_mode),
+                      number=number)
+    return 1e6 * t / number
+
+
+def _main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    fnames = sorted(os.path.join(sample_dir, f) for f in os.listdir(sample_dir)
+                    if f.startswith('440Hz'))
+
+    print("{0:18s} {1:>9s} {2:>9s} {3:>11s} {4:>11s} {5:>8s}"
+          "".format('file', 'sys file', 'sys mmap', 'file (us)', 'mmap (us)',
+                    'speedup'))
+    for fname in fnames:
+        counts = [_count_syscalls(fname, mode) for mode in IO_MODES]
+        times = [_time(fname, mode, args.number) for mode in IO_MODES]
+        print("{0:18s} {1:9d} {2:9d} {3:11.1f} {4:11.1f} {5:7.2f}x"
+              "".format(os.path.basename(fname), counts[0], counts[1],
+                        times[0], times[1], times[0] / times[1]))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(_main())
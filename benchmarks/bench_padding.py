@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Benchmark repeated small tag edits on large files by padding policy
+
+Builds large synthetic files from the samples (the sample with its audio
+data padded out to SIZE_MB), then saves a series of edits that each add a
+few hundred bytes of tags. For each padding policy, reports how many saves
+were in place vs rewrites, and the total time spent saving.
+
+    $ python benchmarks/bench_padding.py [--size-mb SIZE_MB] [-n EDITS]
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+from mutagen.ogg import OggPage
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import music_tag
+
+
+sample_dir = os.path.join(os.path.dirname(__file__), '..', 'sample')
+
+
+def _append_zeros(fout, nbytes):
+    chunk = b'\0' * (1 << 20)
+    while nbytes > 0:
+        fout.write(chunk[:nbytes])
+        nbytes -= len(chunk)
+
+def _grow_plain(fout, nbytes):
+    # mutagen doesn't look past the first frames / pages, so trailing
+    # zeros are as good as audio for these formats
+    _append_zeros(fout, nbytes)
+
+def _grow_mp4(fout, nbytes):
+    # trailing data in an mp4 has to be a valid atom
+    fout.write(struct.pack('>I4s', nbytes, b'free'))
+    _append_zeros(fout, nbytes - 8)
+
+
+def _make_large_ogg(src, dest, size):
+    # mutagen reads the last page of an ogg stream, so repeat the audio
+    # pages of the sample (with fixed up sequence numbers / positions)
+    # instead of appending junk
+    with open(src, 'rb') as fin:
+        pages = []
+        while True:
+            try:
+                pages.append(OggPage(fin))
+            except EOFError:
+                break
+    first_audio = min(i for i, p in enumerate(pages) if p.position > 0)
+    headers, audio = pages[:first_audio], pages[first_audio:]
+    span = max(p.position for p in audio)
+
+    with open(dest, 'wb') as fout:
+        for page in headers:
+            fout.write(page.write())
+        sequence = headers[-1].sequence + 1
+        offset = 0
+        while fout.tell() < size:
+            for page in audio:
+                page.sequence = sequence
+                page.last = False
+                if page.position > 0:
+                    page.position += span if offset else 0
+                sequence += 1
+                fout.write(page.write())
+            offset += span
+        page.last = True
+        fout.seek(-len(page.write()), os.SEEK_END)
+        fout.write(page.write())
+
+
+_FORMATS = (
+    ('440Hz.flac', _grow_plain),
+    ('440Hz.mp3', _grow_plain),
+    ('440Hz.m4a', _grow_mp4),
+    ('440Hz.ogg', None),
+)
+
+
+def _make_large(sample, grow, size, dest_dir):
+    src = os.path.join(sample_dir, sample)
+    dest = os.path.join(dest_dir, 'large_' + sample)
+    if grow is None:
+        _make_large_ogg(src, dest, size)
+    else:
+        shutil.copyfile(src, dest)
+        with open(dest, 'ab') as fout:
+            grow(fout, max(8, size - os.path.getsize(src)))
+    return dest
+
+
+def _run(fname, policy, edits):
+    in_place = 0
+    elapsed = 0.0
+    comment = ''
+    for i in range(edits):
+        f = music_tag.load_file(fname)
+        comment += 'edit {0}: '.format(i) + 'x' * 300
+        f['comment'] = comment
+        t0 = time.perf_counter()
+        report = f.save(padding=policy)
+        elapsed += time.perf_counter() - t0
+        in_place += bool(report.in_place)
+    return in_place, elapsed
+
+
+def _main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size-mb', type=int, default=128)
+    parser.add_argument('-n', '--edits', type=int, default=10)
+    parser.add_argument('--policies', nargs='+',
+                        default=['default', 'keep', 'compact'])
+    args = parser.parse_args()
+
+    size = args.size_mb << 20
+    tmp_dir = tempfile.mkdtemp(prefix='music_tag_bench_')
+    try:
+        print('{0:<16} {1:<10} {2:>10} {3:>10} {4:>10}'
+              ''.format('file', 'policy', 'in place', 'rewrites', 'time'))
+        for sample, grow in _FORMATS:
+            for policy in args.policies:
+                fname = _make_large(sample, grow, size, tmp_dir)
+                try:
+                    in_place, elapsed = _run(fname, policy, args.edits)
+                finally:
+                    os.remove(fname)
+                print('{0:<16} {1:<10} {2:>10} {3:>10} {4:>9.2f}s'
+                      ''.format(sample, policy, in_place,
+                                args.edits - in_place, elapsed))
+    finally:
+        shutil.rmtree(tmp_dir)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(_main())
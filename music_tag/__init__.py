@@ -14,15 +14,23 @@ from music_tag import aac
 from music_tag import aiff
 from music_tag import apev2
 from music_tag import asf
+from music_tag import batch
 from music_tag import dsf
+from music_tag import export
+from music_tag import fileops
 from music_tag import flac
 from music_tag import id3
+from music_tag import index
 from music_tag import mp4
+from music_tag import parallel
+from music_tag import registry
 from music_tag import smf
 from music_tag import vorbis
 from music_tag import wave
 
 from music_tag.file import Artwork, MetadataItem, NotAppendable, AudioFile
+from music_tag.file import TagSnapshot
+from music_tag.batch import batch_edit, BatchEditError
 
 
 __version__ = """0.4.7"""
@@ -31,20 +39,60 @@ __version__ = """0.4.7"""
 logger = logging.getLogger("music_tag")
 log = logger
 
-
-def _subclass_spider_dfs(kls, _lst=None):
-    if _lst is None:
-        _lst = []
-    for sub in kls.__subclasses__():
-        _subclass_spider_dfs(sub, _lst=_lst)
-    _lst.append(kls)
-    return _lst
-
-
-def load_file(file_spec, err="raise"):
-    if isinstance(file_spec, mutagen.FileType):
+# file contents load_file() takes in place of a path
+_BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+
+def load_file(file_spec, err="raise", lazy=False, io=None, info=True):
+    """Load an audio file
+
+    Args:
+        file_spec: path to an audio file, a ``mutagen.FileType``, a
+            readable and seekable binary file object (e.g., an
+            io.BytesIO), or the file's contents as a bytes-like object
+            (bytes, bytearray, memoryview, ...), which isn't copied
+        err (str): 'raise' to raise NotImplementedError for unsupported
+            formats, anything else to return None
+        lazy (bool): only detect the file's format now, and put off
+            parsing it with mutagen until a tag is first accessed
+        io (str): 'file' (the default) to parse the file through a regular
+            file object, or 'mmap' to parse it through a memory map, which
+            turns mutagen's many small reads into memory accesses instead
+            of syscalls; only used for paths
+        info (bool): if False, put off parsing the audio stream info (the
+            '#' keys) until it's first used; for MP3s this skips scanning
+            audio frames, which is most of the work of loading a file
+            when only its tags are needed
+
+    Returns:
+        AudioFile
+    """
+    if io not in (None, ) + fileops.IO_MODES:
+        raise ValueError("io must be one of {0}, not {1}"
+                         "".format(list(fileops.IO_MODES), repr(io)))
+
+    mutagen_kls = None
+    fileobj = None
+    # a mutagen object from outside may already have unsaved edits
+    external = isinstance(file_spec, mutagen.FileType)
+    if external:
         mfile = file_spec
         filename = mfile.filename
+        mutagen_kls = type(mfile)
+        lazy = False
+    elif hasattr(file_spec, 'read') or isinstance(file_spec, _BUFFER_TYPES):
+        if hasattr(file_spec, 'read'):
+            fileobj = file_spec
+        else:
+            fileobj = fileops.BufferReader(file_spec)
+        filename = fileops.fileobj_name(fileobj)
+        if lazy:
+            mfile = None
+            mutagen_kls = registry.detect_mutagen_kls(filename, fileobj)
+        else:
+            mfile = registry.open_mutagen_file(filename, fileobj=fileobj,
+                                               info=info)
+            mutagen_kls = type(mfile)
     else:
         filename = file_spec
         if not os.path.exists(filename):
@@ -52,24 +100,61 @@ def load_file(file_spec, err="raise"):
                 filename = os.path.expanduser(os.path.expandvars(filename))
             elif os.path.exists(os.path.expanduser(filename)):
                 filename = os.path.expanduser(filename)
-        mfile = mutagen.File(filename, easy=False)
+        if lazy:
+            mfile = None
+            mutagen_kls = registry.detect_mutagen_kls(filename)
+        else:
+            mfile = registry.open_mutagen_file(filename, io_mode=io,
+                                               info=info)
+            mutagen_kls = type(mfile)
 
     ret = None
 
-    for kls in _subclass_spider_dfs(file.AudioFile):
-        # print("checking against:", kls, kls.mutagen_kls)
-        if kls.mutagen_kls is not None and isinstance(mfile, kls.mutagen_kls):
-            ret = kls(filename, _mfile=mfile)
-            break
+    kls = registry.audiofile_kls(mutagen_kls)
+    if kls is not None:
+        ret = kls(filename, _mfile=mfile, _mutagen_kls=mutagen_kls,
+                  _lazy=lazy, _io_mode=io, _fileobj=fileobj, _info=info)
+        ret._force_dirty = external
 
     if ret is None and err == "raise":
         raise NotImplementedError(
-            "Mutagen type {0} not implemented" "".format(type(mfile))
+            "Mutagen type {0} not implemented" "".format(mutagen_kls)
         )
 
     return ret
 
 
+def _load_file_job(job):
+    file_spec, kwargs = job
+    return load_file(file_spec, **kwargs)
+
+
+def load_files(file_specs, workers=None, executor="process", ordered=True,
+               max_in_flight=None, **kwargs):
+    """Load many files using a pool of workers
+
+    Args:
+        file_specs (iterable): paths to load, consumed lazily
+        workers (int): number of workers, defaults to the number of cpus
+        executor: 'process', 'thread', or an existing
+            ``concurrent.futures.Executor``
+        ordered (bool): yield files in the same order as ``file_specs``
+            instead of as soon as they are loaded
+        max_in_flight (int): bound on the number of files being loaded
+            or waiting to be consumed, defaults to ``2 * workers``
+        **kwargs: passed to :py:func:`load_file`
+
+    Yields:
+        (file_spec, AudioFile) tuples; if a file can not be loaded,
+        the exception is yielded in place of the AudioFile
+    """
+    jobs = ((file_spec, kwargs) for file_spec in file_specs)
+    for job, ret in parallel.imap(_load_file_job, jobs, workers=workers,
+                                  executor=executor, ordered=ordered,
+                                  max_in_flight=max_in_flight):
+        yield job[0], ret
+
+
 def tags():
     return file.tags()
 
@@ -81,10 +166,16 @@ __all__ = [
     "aiff",
     "apev2",
     "asf",
+    "batch",
     "dsf",
+    "export",
+    "fileops",
     "flac",
     "id3",
+    "index",
     "mp4",
+    "parallel",
+    "registry",
     "smf",
     "vorbis",
     "wave",
@@ -94,7 +185,11 @@ __all__ = [
     "MetadataItem",
     "NotAppendable",
     "AudioFile",
+    "TagSnapshot",
+    "batch_edit",
+    "BatchEditError",
     "load_file",
+    "load_files",
     "tags",
 ]
 
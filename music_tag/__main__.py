@@ -18,6 +18,26 @@ Examples
         $ # Write specific tags from all audio files in sample directory to a csv file
         $ python -m music_tag --tags="Title : Album" --to-csv tags.csv ./sample
 
+        $ # Read the files on 8 worker processes (0 for one per cpu)
+        $ python -m music_tag --jobs 8 --to-csv tags.csv ./sample
+
+        $ # Write tags to a JSON Lines file, one object per audio file with
+        $ # typed values (lists except for single-valued tags)
+        $ python -m music_tag --to-jsonl tags.jsonl ./sample
+
+        $ # Write tags to a Parquet file, with typed and list columns
+        $ # (needs pyarrow)
+        $ python -m music_tag --to-parquet tags.parquet ./sample
+
+        $ # Write every embedded picture once, named by its sha256, with a
+        $ # manifest.jsonl of which files use which pictures; run it again
+        $ # to pick up where an interrupted run stopped
+        $ python -m music_tag --jobs 8 --extract-art covers ./sample
+
+        $ # Keep the tags in an index, so the next run only reads files
+        $ # that changed since
+        $ python -m music_tag --index library.sqlite --to-csv tags.csv ./sample
+
     Setting tags:
 
         $ # Set a couple tags for multiple files      
@@ -25,15 +45,31 @@ Examples
         $                       ./sample/440Hz.aac ./sample/440Hz.flac
 
         $ # Write tags from csv file to audio files (assuming file paths in
-        $ # the csv file are relative to the sample directory
+        $ # the csv file are relative to the sample directory); files whose
+        $ # tags already match the csv aren't saved
         $ python -m music_tag --from-csv tags.csv
+
+        $ # Write tags from a JSON Lines file made by --to-jsonl
+        $ python -m music_tag --from-jsonl tags.jsonl
+
+        $ # Estimate how much would be written by --set / --from-csv,
+        $ # without changing any files
+        $ python -m music_tag --plan --from-csv tags.csv
+
+        $ # Write tags from a csv file in parallel, journaling the original
+        $ # tags so an interrupted run can be finished or undone
+        $ python -m music_tag --from-csv tags.csv --journal tags.journal
+        $ python -m music_tag --resume tags.journal
+        $ python -m music_tag --rollback tags.journal
 """
 
 from __future__ import print_function
 import argparse
 from argparse import RawTextHelpFormatter
+import concurrent.futures
 import csv
-import fnmatch
+import hashlib
+import json
 import os
 import sys
 
@@ -41,28 +77,455 @@ import music_tag
 from music_tag import load_file
 
 
-_audio_pattern = ['*.wav', '*.aac', '*.aiff', '*.dsf', '*.flac',
-                  '*.m4a', '*.mp3', '*.ogg', '*.opus', '*.wv']
+_audio_suffixes = frozenset(['.wav', '.aac', '.aiff', '.dsf', '.flac',
+                             '.m4a', '.mp3', '.ogg', '.opus', '.wv'])
 
 _default_tags = ('Disc Number : Total Discs : Track Number : Total Tracks '
                  ': Title : Artist : Album : Album Artist '
                  ': Year : Genre : Comment')
 
 
-def _expand_files(files):
-    ret = []
+def _is_audio(name):
+    # same matching as fnmatch on '*.mp3' etc, i.e., case sensitive except
+    # on case insensitive platforms
+    i = name.rfind('.')
+    return i >= 0 and os.path.normcase(name[i:]) in _audio_suffixes
+
+
+def _scan_dir(path):
+    """Audio files and subdirectories of one directory, in directory order
+
+    File types come from the directory listing, so entries usually aren't
+    stat'ed. Like os.walk, symlinks to directories aren't followed and
+    directories that can't be listed are skipped.
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif _is_audio(entry.name):
+                    files.append(entry.path)
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def _walk(top, jobs=1):
+    """Yield audio files under top, depth first, in directory order
+
+    With jobs > 1, directories are listed ahead of the consumer on a pool
+    of threads; the order of the files is the same either way.
+    """
+    if jobs == 1:
+        stack = [top]
+        while stack:
+            files, subdirs = _scan_dir(stack.pop())
+            stack.extend(reversed(subdirs))
+            for fname in files:
+                yield fname
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        stack = [pool.submit(_scan_dir, top)]
+        try:
+            while stack:
+                files, subdirs = stack.pop().result()
+                stack.extend(reversed([pool.submit(_scan_dir, d)
+                                       for d in subdirs]))
+                for fname in files:
+                    yield fname
+        finally:
+            for future in stack:
+                future.cancel()
+
+
+def _expand_files(files, jobs=1):
+    """Yield the given files, with directories replaced by their audio files
+
+    Files are yielded as the directories are walked, so they can be
+    processed before the walk is done.
+    """
     for f in files:
         if os.path.isdir(f):
-            # walk directory looking for music files
-            for root, dirs, files in os.walk(f):
-                for pattern in _audio_pattern:
-                    for filename in fnmatch.filter(files, pattern):
-                        ret.append(os.path.join(root, filename))
+            for fname in _walk(f, jobs):
+                yield fname
+        else:
+            yield f
+
+
+def _n_jobs(jobs):
+    if jobs <= 0:
+        return music_tag.parallel.default_workers()
+    return jobs
+
+
+# data every job of an action needs (tags to read, values to set, ...),
+# sent to each worker once instead of with every file
+_shared = None
+
+
+def _init_shared(shared):
+    global _shared  # pylint: disable=global-statement
+    _shared = shared
+
+
+def _map_ordered(func, items, jobs, shared=None):
+    """Yield (item, func(item)) for each item, in order, using jobs processes
+
+    Workers run ahead of the consumer by a bounded number of items, so
+    results are held in a reorder buffer of a fixed size no matter how many
+    items there are. If func raises, the exception is yielded in place of
+    its result. ``shared`` is available to func as ``_shared``.
+    """
+    if jobs == 1:
+        _init_shared(shared)
+        for item in items:
+            try:
+                yield item, func(item)
+            except Exception as e:  # pylint: disable=broad-except
+                yield item, e
+        return
+
+    for item, ret in music_tag.parallel.imap(func, items, workers=jobs,
+                                             max_in_flight=4 * jobs,
+                                             initializer=_init_shared,
+                                             initargs=(shared, )):
+        yield item, ret
+
+
+def _report_errors(errors):
+    if not errors:
+        return 0
+    print('{0} file(s) failed:'.format(len(errors)), file=sys.stderr)
+    for fname, exc in errors:
+        print('  {0}: {1}: {2}'.format(fname, type(exc).__name__, exc),
+              file=sys.stderr)
+    return 1
+
+
+def _apply_to(mt_f, key_vals, plan):
+    mt_f.skip_clean_saves = True
+    for key, val in key_vals:
+        if val is None or val == '':
+            del mt_f[key]
         else:
-            ret.append(f)
+            mt_f[key] = val
+    if plan:
+        return mt_f.plan_save()
+    return mt_f.save()
+
+
+def _apply_edits(fname, key_vals, plan):
+    return _apply_to(music_tag.load_file(fname), key_vals, plan)
+
+
+def _print_job(fname):
+    tags, resolve = _shared
+    # stream info is still read if a '#' tag is asked for
+    mt_f = music_tag.load_file(fname, info=False)
+    return mt_f.info(tags=tags, show_empty=True, resolve=resolve)
+
+
+def _set_job(fname):
+    key_vals, plan = _shared
+    return _apply_edits(fname, key_vals, plan)
+
+
+def _edit_job(job):
+    fname, key_vals = job
+    return _apply_edits(fname, key_vals, _shared)
+
+
+def _diff_apply_job(job):
+    # diff and apply in one go, for edits that are streamed
+    fname, key_vals = job
+    mt_f = music_tag.load_file(fname, info=False)
+    changes = list(mt_f.diff(key_vals).items())
+    if not changes:
+        return changes, None
+    return changes, _apply_to(mt_f, changes, _shared)
+
+
+def _diff_job(job):
+    fname, key_vals = job
+    mt_f = music_tag.load_file(fname, info=False)
+    return list(mt_f.diff(key_vals).items())
+
+
+def _diff_edits(edits, jobs, errors):
+    """Keep only the --from-csv edits that change something
+
+    Files that can't be read are added to errors. Prints a summary.
+
+    Returns:
+        list of (filename, [(key, value or None), ...]) for files with
+        changes
+    """
+    changes = []
+    for (fname, _), ret in _map_ordered(_diff_job, edits, jobs):
+        if isinstance(ret, Exception):
+            errors.append((fname, ret))
+        elif ret:
+            changes.append((fname, ret))
+    _print_diff_summary([c for _, c in changes], len(edits), 'to edit')
+    return changes
+
+
+def _print_diff_summary(changes, n_files, verb):
+    n_removed = sum(1 for c in changes for _, val in c if val is None)
+    n_set = sum(len(c) for c in changes) - n_removed
+    if verb == 'to edit':
+        fmt = '{0} of {1} file(s) to edit: {2} tag(s) to set, {3} to remove'
+    else:
+        fmt = '{0} of {1} file(s) edited: {2} tag(s) set, {3} removed'
+    print(fmt.format(len(changes), n_files, n_set, n_removed))
+
+
+def _read_snapshot(fname, tags, resolve):
+    # tags the file's format doesn't know are left out of the snapshot,
+    # the same as with --index, and come out empty
+    mt_f = music_tag.load_file(fname, info=False)
+    return mt_f.snapshot(mt_f.known_keys(tags), resolve=resolve)
+
+
+def _snapshot_row(fname, tags, snap):
+    return [snap.text(k) if k in snap else '' for k in tags] + [fname]
+
+
+def _csv_row(fname):
+    tags, resolve = _shared
+    return _snapshot_row(fname, tags, _read_snapshot(fname, tags, resolve))
+
+
+def _json_value(tag, values):
+    """Values of a tag for --to-jsonl
+
+    None if the tag is missing, else a list of values, or the value itself
+    for keys that hold one value (as in export.to_arrow), so a key has
+    the same shape on every line. Artwork is described by its mime type,
+    size and digest.
+    """
+    ret = []
+    for val in values:
+        if isinstance(val, music_tag.Artwork):
+            val = music_tag.export.artwork_summary(val)
+        else:
+            val = music_tag.batch.encode_value(val)
+        ret.append(val)
+    if not ret:
+        return None
+    return ret[0] if music_tag.export.is_singular(tag) else ret
+
+
+def _snapshot_json(fname, tags, snap):
+    obj = {'filename': fname}
+    for tag in tags:
+        obj[tag] = _json_value(tag, snap.get(tag, ()))
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _jsonl_line(fname):
+    tags, resolve = _shared
+    return _snapshot_json(fname, tags, _read_snapshot(fname, tags, resolve))
+
+
+def _read_tags(args, fnames, tags, job, format_snapshot):
+    """Yield (fname, result) for --print / --to-csv, in order
+
+    With --index, snapshots come from the index and are formatted here;
+    otherwise each file is read and formatted by job.
+    """
+    jobs = _n_jobs(args.jobs)
+    if not args.index:
+        for item in _map_ordered(job, fnames, jobs,
+                                 shared=(tags, args.resolve)):
+            yield item
+        return
+
+    with music_tag.index.TagIndex(args.index) as idx:
+        for fname, snap in idx.snapshots(fnames, tags, resolve=args.resolve,
+                                         workers=jobs):
+            if isinstance(snap, Exception):
+                yield fname, snap
+                continue
+            try:
+                yield fname, format_snapshot(fname, snap)
+            except Exception as e:  # pylint: disable=broad-except
+                yield fname, e
+
+
+def _write_once(dest, data):
+    """Write data to dest unless it exists; True if it was written
+
+    The data goes to a temporary file that is renamed into place, so dest
+    is never left half written, even if several workers write it at once.
+    """
+    if os.path.exists(dest):
+        return False
+    temp = '{0}.{1}.tmp'.format(dest, os.getpid())
+    with open(temp, 'wb') as fout:
+        fout.write(data)
+    os.replace(temp, dest)
+    return True
+
+
+def _extract_art_job(fname):
+    art_dir = _shared
+    mt_f = music_tag.load_file(fname, info=False)
+    ret = []
+    if not mt_f.known_keys(['artwork']):
+        return ret
+    for art in mt_f['artwork'].values:
+        digest = hashlib.sha256(art.raw).hexdigest()
+        name = digest + (music_tag.util.image_ext(art.raw) or '.bin')
+        written = _write_once(os.path.join(art_dir, name), art.raw)
+        ret.append(({'file': name, 'sha256': digest,
+                     'pic_type': int(art.pic_type)}, written))
     return ret
 
 
+def _read_manifest(manifest):
+    """Files already in an --extract-art manifest
+
+    A line cut short by an interrupted run is dropped from the file.
+    """
+    if not os.path.exists(manifest):
+        return set()
+    with open(manifest, 'rb+') as fin:
+        data = fin.read()
+        end = data.rfind(b'\n') + 1
+        fin.truncate(end)
+    return set(json.loads(line)['filename']
+               for line in data[:end].decode('utf-8').splitlines()
+               if line.strip())
+
+
+def _base_dir(args):
+    # file paths in --from-csv / --from-jsonl are relative to this
+    if args.files and os.path.isdir(args.files[0]):
+        return args.files[0]
+    return ''
+
+
+def _read_csv_edits(args):
+    """Rows of the --from-csv file grouped by file, in order of appearance
+
+    Returns:
+        list of (filename, [(key, value), ...]), or None if a file is
+        missing and --ignore-missing wasn't given
+    """
+    pth0 = _base_dir(args)
+
+    edits = {}
+    with open(args.from_csv, newline='') as fin:
+        csvreader = csv.reader(fin, delimiter=',', quotechar='"',
+                               dialect=args.csv_dialect)
+        tags = []
+        for row in csvreader:
+            if not tags:
+                tags = row[:-1]
+                continue
+
+            fname = row[-1]
+            if pth0:
+                fname = os.path.join(pth0, fname)
+
+            if not os.path.isfile(fname):
+                if args.ignore_missing:
+                    print('missing file', fname, '; continuing anyway')
+                    continue
+                else:
+                    print('missing file', fname, '; stopping now')
+                    return None
+
+            # later rows for the same file win
+            edits.setdefault(fname, []).extend(zip(tags, row[:-1]))
+    return list(edits.items())
+
+
+def _from_json_value(val):
+    if val is None or val == []:
+        return None
+    if isinstance(val, list):
+        return [music_tag.batch.decode_value(v) for v in val]
+    return music_tag.batch.decode_value(val)
+
+
+def _is_artwork_json(val):
+    if isinstance(val, list):
+        return any(_is_artwork_json(v) for v in val)
+    return isinstance(val, dict) and 'sha256' in val
+
+
+def _read_jsonl_edits(args, missing):
+    """Yield (filename, [(key, value), ...]) for each line of --from-jsonl
+
+    The file is read as edits are consumed. Artwork is left alone since
+    only its digest is in the file. Stops early, adding the file to
+    missing, if a file is missing and --ignore-missing wasn't given.
+    """
+    pth0 = _base_dir(args)
+
+    with open(args.from_jsonl, encoding='utf-8') as fin:
+        for i, line in enumerate(fin):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+                fname = obj.pop('filename')
+            except (ValueError, KeyError) as e:
+                raise ValueError("{0}:{1}: bad line: {2}"
+                                 "".format(args.from_jsonl, i + 1, e))
+            if pth0:
+                fname = os.path.join(pth0, fname)
+
+            if not os.path.isfile(fname):
+                if args.ignore_missing:
+                    print('missing file', fname, '; continuing anyway')
+                    continue
+                else:
+                    print('missing file', fname, '; stopping now')
+                    missing.append(fname)
+                    return
+
+            yield fname, [(key, _from_json_value(val))
+                          for key, val in obj.items()
+                          if not _is_artwork_json(val)]
+
+
+def _format_bytes(n):
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if abs(n) < 1024 or unit == 'TiB':
+            break
+        n /= 1024.0
+    return '{0:.1f} {1}'.format(n, unit) if unit != 'B' else '{0} B'.format(n)
+
+
+def _print_plan_summary(plans):
+    unchanged = [p for p in plans if not p.written]
+    in_place = [p for p in plans if p.written and p.rewrite is False]
+    rewrites = [p for p in plans if p.written and p.rewrite]
+    unknown = [p for p in plans if p.written and p.rewrite is None]
+    total = sum(p.bytes_written for p in plans if p.bytes_written)
+
+    print()
+    print('files:     {0}'.format(len(plans)))
+    print('unchanged: {0}'.format(len(unchanged)))
+    print('in place:  {0}'.format(len(in_place)))
+    print('rewrites:  {0}'.format(len(rewrites)))
+    if unknown:
+        print('unknown:   {0} (format can not be planned)'.format(len(unknown)))
+    print('estimated bytes written: {0}'.format(_format_bytes(total)))
+
+
 def _main():
     parser = argparse.ArgumentParser(prog='python -m music_tag',
                                      description=__doc__,
@@ -78,34 +541,77 @@ def _main():
                               help='write tags to csv file')
     action_group.add_argument('--from-csv', action='store',
                               help='write tags from csv file')
+    action_group.add_argument('--to-jsonl', action='store',
+                              help='write tags to JSON Lines file')
+    action_group.add_argument('--from-jsonl', action='store',
+                              help='write tags from JSON Lines file')
+    action_group.add_argument('--to-parquet', action='store',
+                              help='write tags to Parquet file (needs '
+                                   'pyarrow)')
+    action_group.add_argument('--extract-art', action='store', metavar='DIR',
+                              help='write embedded pictures to DIR, once '
+                                   'each, with a manifest')
+    action_group.add_argument('--resume', action='store', metavar='JOURNAL',
+                              help='finish an interrupted --journal run')
+    action_group.add_argument('--rollback', action='store', metavar='JOURNAL',
+                              help='undo a --journal run')
 
     parser.add_argument('--tags', action='store', default=_default_tags,
                         help='tags to print')
     parser.add_argument('-I', '--ignore-missing', action='store_true',
-                        help='ignore missing audio files when using from-csv')
+                        help='ignore missing audio files when using '
+                             'from-csv / from-jsonl')
     parser.add_argument('-D', '--csv-dialect', action='store', default='excel',
                         help='csv file dialect (excel | excel_tab | unix)')
     parser.add_argument('--resolve', action='store_true',
                         help='Use resolve to discern missing tags')
+    parser.add_argument('--plan', action='store_true',
+                        help='with --set / --from-csv, estimate the bytes '
+                             'that would be written instead of saving')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes reading / saving '
+                             'files, and of threads listing directories '
+                             '(0 for one per cpu)')
+    parser.add_argument('--journal', action='store',
+                        help='with --from-csv / --from-jsonl, save files in '
+                             'parallel and journal their original tags to '
+                             'this file')
+    parser.add_argument('--index', action='store', metavar='PATH.sqlite',
+                        help='with --print / --to-csv / --to-jsonl / '
+                             '--to-parquet, keep tags in this index and only '
+                             'read files that changed')
     parser.add_argument('files', nargs='*')
 
     args = parser.parse_args()
+    jobs = _n_jobs(args.jobs)
+    plans = []
+    errors = []
+
+    if (args.journal and not args.plan and (args.from_csv or args.from_jsonl)
+            and os.path.exists(args.journal)):
+        print("journal {0} exists, resume or roll back that batch first"
+              "".format(args.journal), file=sys.stderr)
+        return 1
 
-    
     if args.print:
         print()
-        fnames = _expand_files(args.files)
+        fnames = _expand_files(args.files, jobs)
         tags = [t.strip() for t in args.tags.split(':')]
 
-        for fname in fnames:
-            f = music_tag.load_file(fname)
-            print(f.info(tags=tags, show_empty=True, resolve=args.resolve))
+        def _format(_, snap):
+            return snap.info(tags, show_empty=True)
+
+        for fname, ret in _read_tags(args, fnames, tags, _print_job, _format):
+            if isinstance(ret, Exception):
+                errors.append((fname, ret))
+                continue
+            print(ret)
             print()
-    
+
     if args.set:
         set_key_vals = [s.split(':') for s in args.set]
         set_key_vals = [(kv[0], ':'.join(kv[1:])) for kv in set_key_vals]
-        
+
         for ii, kv in enumerate(set_key_vals):
             if kv[1].startswith('file://'):
                 with open(kv[1][len('file://'):], 'r') as fin:
@@ -115,20 +621,17 @@ def _main():
                 with open(kv[1][len('bin://'):], 'rb') as fin:
                     print(fin.name)
                     set_key_vals[ii] = (kv[0], fin.read())
-        
-        fnames = _expand_files(args.files)
-        for fname in fnames:
-            mt_f = music_tag.load_file(fname)
-            for kv in set_key_vals:
-                key, val = kv[0], kv[1]
-                if val:
-                    mt_f[key] = val
-                else:
-                    del mt_f[key]
-            mt_f.save()
+
+        fnames = _expand_files(args.files, jobs)
+        for fname, ret in _map_ordered(_set_job, fnames, jobs,
+                                       shared=(set_key_vals, args.plan)):
+            if isinstance(ret, Exception):
+                errors.append((fname, ret))
+            elif args.plan:
+                plans.append(ret)
 
     if args.to_csv:
-        fnames = _expand_files(args.files)
+        fnames = _expand_files(args.files, jobs)
         tags = [t.strip() for t in args.tags.split(':')]
 
         with open(args.to_csv, 'w', newline='') as fout:
@@ -136,50 +639,142 @@ def _main():
                                    dialect=args.csv_dialect,
                                    quoting=csv.QUOTE_MINIMAL)
             csvwriter.writerow(tags + ['filename'])
-            for fname in fnames:
-                mt_f = music_tag.load_file(fname)
-                if args.resolve:
-                    row = [mt_f.resolve(k) for k in tags] + [fname]
-                else:
-                    row = [mt_f[k] for k in tags] + [fname]
+
+            def _format(fname, snap):
+                return _snapshot_row(fname, tags, snap)
+
+            for fname, row in _read_tags(args, fnames, tags, _csv_row,
+                                         _format):
+                if isinstance(row, Exception):
+                    errors.append((fname, row))
+                    continue
                 csvwriter.writerow(row)
 
-    if args.from_csv:
-        pth0 = ''
-        if args.files and os.path.isdir(args.files[0]):
-            pth0 = args.files[0]
-
-        with open(args.from_csv, newline='') as fin:
-            csvreader = csv.reader(fin, delimiter=',', quotechar='"',
-                                   dialect=args.csv_dialect)
-            tags = []
-            for row in csvreader:
-                if not tags:
-                    tags = row[:-1]
-                else:
-                    fname = row[-1]
-                    if pth0:
-                        fname = os.path.join(pth0, fname)
-
-                    if os.path.isfile(fname):
-                        print('editing', fname)
-                    else:
-                        if args.ignore_missing:
-                            print('missing file', fname, '; continuing anyway')
-                            continue
-                        else:
-                            print('missing file', fname, '; stopping now')
-                            return 1
-
-                    mt_f = music_tag.load_file(fname)
-                    for key, val in zip(tags, row[:-1]):
-                        if val:
-                            mt_f[key] = val
-                        else:
-                            del mt_f[key]
-                    mt_f.save()
-
-    return 0
+    if args.to_jsonl:
+        fnames = _expand_files(args.files, jobs)
+        tags = [t.strip() for t in args.tags.split(':')]
+
+        def _format(fname, snap):
+            return _snapshot_json(fname, tags, snap)
+
+        with open(args.to_jsonl, 'w', encoding='utf-8') as fout:
+            for fname, line in _read_tags(args, fnames, tags, _jsonl_line,
+                                          _format):
+                if isinstance(line, Exception):
+                    errors.append((fname, line))
+                    continue
+                fout.write(line + '\n')
+
+    if args.to_parquet:
+        fnames = _expand_files(args.files, jobs)
+        tags = [t.strip() for t in args.tags.split(':')]
+
+        idx = music_tag.index.TagIndex(args.index) if args.index else None
+        try:
+            music_tag.export.to_parquet(
+                fnames, tags, args.to_parquet, resolve=args.resolve,
+                workers=jobs, index=idx,
+                on_error=lambda fname, e: errors.append((fname, e)))
+        except ImportError as e:
+            print(e, file=sys.stderr)
+            return 1
+        finally:
+            if idx is not None:
+                idx.close()
+
+    if args.extract_art:
+        if not os.path.isdir(args.extract_art):
+            os.makedirs(args.extract_art)
+        manifest = os.path.join(args.extract_art, 'manifest.jsonl')
+        done = _read_manifest(manifest)
+        fnames = (f for f in _expand_files(args.files, jobs) if f not in done)
+        n_files = n_pics = n_new = 0
+
+        with open(manifest, 'a', encoding='utf-8') as fout:
+            for fname, ret in _map_ordered(_extract_art_job, fnames, jobs,
+                                           shared=args.extract_art):
+                if isinstance(ret, Exception):
+                    errors.append((fname, ret))
+                    continue
+                fout.write(json.dumps({'filename': fname,
+                                       'artwork': [e for e, _ in ret]},
+                                      ensure_ascii=False) + '\n')
+                fout.flush()
+                n_files += 1
+                n_pics += len(ret)
+                n_new += sum(1 for _, written in ret if written)
+        print('{0} file(s), {1} picture(s), {2} written; {3} file(s) were '
+              'already done'.format(n_files, n_pics, n_new, len(done)))
+
+    if args.from_jsonl and not args.journal:
+        # stream: each file is diffed and saved by the same job
+        missing = []
+        changes = []
+        n_files = 0
+        edits = _read_jsonl_edits(args, missing)
+        for (fname, _), ret in _map_ordered(_diff_apply_job, edits, jobs,
+                                            shared=args.plan):
+            n_files += 1
+            if isinstance(ret, Exception):
+                errors.append((fname, ret))
+                continue
+            file_changes, report = ret
+            if file_changes:
+                print('editing', fname)
+                changes.append(file_changes)
+                if args.plan:
+                    plans.append(report)
+        _print_diff_summary(changes, n_files,
+                            'to edit' if args.plan else 'edited')
+        if missing:
+            return 1
+
+    if args.from_csv or (args.from_jsonl and args.journal):
+        if args.from_csv:
+            edits = _read_csv_edits(args)
+        else:
+            missing = []
+            edits = list(_read_jsonl_edits(args, missing))
+            if missing:
+                edits = None
+        if edits is None:
+            return 1
+        edits = _diff_edits(edits, jobs, errors)
+
+        if args.journal and not args.plan:
+            batch = music_tag.batch_edit(args.journal, workers=jobs)
+            for fname, key_vals in edits:
+                print('editing', fname)
+                batch.update(fname, dict(key_vals))
+            try:
+                batch.apply()
+            except music_tag.BatchEditError as e:
+                print(e)
+                print('resume with --resume {0}, or undo with --rollback {0}'
+                      ''.format(e.journal))
+                return 1
+        else:
+            for (fname, _), ret in _map_ordered(_edit_job, edits, jobs,
+                                                shared=args.plan):
+                print('editing', fname)
+                if isinstance(ret, Exception):
+                    errors.append((fname, ret))
+                elif args.plan:
+                    plans.append(ret)
+
+    if args.resume or args.rollback:
+        func = music_tag.batch.resume if args.resume else \
+            music_tag.batch.rollback
+        try:
+            func(args.resume or args.rollback)
+        except (music_tag.BatchEditError, OSError) as e:
+            print(e)
+            return 1
+
+    if args.plan and (args.set or args.from_csv or args.from_jsonl):
+        _print_plan_summary(plans)
+
+    return _report_errors(errors)
 
 if __name__ == "__main__":
     sys.exit(_main())
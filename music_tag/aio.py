@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# asyncio front end for music_tag
+#
+# Loading and saving files is blocking I/O, so here it's run on an
+# executor and awaited, keeping the event loop free:
+#
+#     from music_tag import aio
+#
+#     f = await aio.load_file(path)
+#     f['title'] = 'Title'
+#     await f.save()
+#
+#     async for path, f in aio.load_many(paths, limit=64):
+#         ...
+#
+# Everything else (getting / setting tags etc.) works on the in-memory
+# file, so it's the same as for a regular AudioFile.
+
+import asyncio
+from collections import deque
+import concurrent.futures
+import functools
+
+import music_tag
+
+
+_default_executor = None
+
+
+def set_default_executor(executor):
+    """Set the executor used when none is passed explicitly
+
+    Args:
+        executor: a ``concurrent.futures.Executor`` (see
+            ``music_tag.parallel.make_executor`` for one whose workers have
+            music_tag preloaded), or None for the event loop's default
+    """
+    global _default_executor  # pylint: disable=global-statement
+    _default_executor = executor
+
+
+def _run(executor, func, *args, **kwargs):
+    if executor is None:
+        executor = _default_executor
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, functools.partial(func, *args,
+                                                            **kwargs))
+
+
+def _save_executor(executor):
+    # saving updates the AudioFile (dirty tracking etc.), so it has to run
+    # in this process, even if files are loaded on a process pool
+    if executor is None:
+        executor = _default_executor
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        executor = None
+    return executor
+
+
+class AsyncAudioFile(object):
+    """An AudioFile whose blocking methods are coroutines
+
+    Tag access is passed straight through to the wrapped AudioFile, which
+    is available as ``sync``.
+    """
+    def __init__(self, afile, executor=None):
+        self.sync = afile
+        self.executor = executor
+
+    def __getattr__(self, name):
+        return getattr(self.sync, name)
+
+    def __setattr__(self, name, val):
+        if name in ('sync', 'executor'):
+            object.__setattr__(self, name, val)
+        else:
+            setattr(self.sync, name, val)
+
+    def __getitem__(self, norm_key):
+        return self.sync[norm_key]
+
+    def __setitem__(self, norm_key, val):
+        self.sync[norm_key] = val
+
+    def __delitem__(self, norm_key):
+        del self.sync[norm_key]
+
+    def __contains__(self, key):
+        return key in self.sync
+
+    def __iter__(self):
+        return iter(self.sync)
+
+    def __str__(self):
+        return str(self.sync)
+
+    def __repr__(self):
+        return '<AsyncAudioFile: {0}>'.format(repr(self.sync))
+
+    async def save(self, *args, **kwargs):
+        """Same as AudioFile.save, run on the executor"""
+        return await _run(_save_executor(self.executor), self.sync.save,
+                          *args, **kwargs)
+
+    async def plan_save(self, *args, **kwargs):
+        """Same as AudioFile.plan_save, run on the executor"""
+        return await _run(_save_executor(self.executor), self.sync.plan_save,
+                          *args, **kwargs)
+
+
+async def load_file(file_spec, executor=None, **kwargs):
+    """Load an audio file without blocking the event loop
+
+    Args:
+        file_spec: as for ``music_tag.load_file``
+        executor: executor to load on, see set_default_executor
+        **kwargs: passed to ``music_tag.load_file``
+
+    Returns:
+        AsyncAudioFile, or None if ``err`` is not 'raise' and the format
+        isn't supported
+    """
+    afile = await _run(executor, music_tag.load_file, file_spec, **kwargs)
+    if afile is None:
+        return None
+    return AsyncAudioFile(afile, executor=executor)
+
+
+async def _aiter(items):
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def load_many(file_specs, limit=64, executor=None, ordered=True,
+                    **kwargs):
+    """Load many files concurrently, like ``music_tag.load_files``
+
+    At most ``limit`` files are being loaded or waiting to be consumed
+    at once, so a slow consumer holds up loading instead of letting
+    files pile up in memory. Closing the iterator early (or cancelling
+    the task consuming it) cancels the loads that haven't started yet.
+
+    Args:
+        file_specs: iterable or async iterable of paths, consumed lazily
+        limit (int): maximum number of loads in flight
+        executor: executor to load on, see set_default_executor
+        ordered (bool): yield files in the same order as ``file_specs``
+            instead of as soon as they are loaded
+        **kwargs: passed to ``music_tag.load_file``
+
+    Yields:
+        (file_spec, AsyncAudioFile) tuples; if a file can not be loaded,
+        the exception is yielded in place of the file
+    """
+    limit = max(1, limit)
+    specs = _aiter(file_specs)
+    pending = deque()
+
+    async def _submit_next():
+        async for spec in specs:
+            task = asyncio.ensure_future(load_file(spec, executor=executor,
+                                                   **kwargs))
+            pending.append((spec, task))
+            return True
+        return False
+
+    def _result(spec, task):
+        exc = task.exception()
+        return spec, task.result() if exc is None else exc
+
+    try:
+        while len(pending) < limit and await _submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                spec, task = pending.popleft()
+                await asyncio.wait([task])
+            else:
+                done, _ = await asyncio.wait(
+                    [t for _, t in pending],
+                    return_when=asyncio.FIRST_COMPLETED)
+                spec, task = next(p for p in pending if p[1] in done)
+                pending.remove((spec, task))
+            await _submit_next()
+            yield _result(spec, task)
+    finally:
+        for _, task in pending:
+            task.cancel()
+        await specs.aclose()
+
+
+##
+## EOF
+##
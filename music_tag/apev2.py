@@ -49,11 +49,10 @@ def get_pictures(afile, norm_key):
     for pic_tag, pic_type in pic_tag2type.items():
         if pic_tag in afile.mfile.tags:
             p = afile.mfile.tags[pic_tag].value
-            try:
-                artwork = Artwork(p, pic_type=pic_type)
-            except OSError:
-                artwork = Artwork(p.split(b'\0', 1)[1], pic_type=pic_type)
-            artworks.append(artwork)
+            if util.image_ext(p) is None and b'\0' in p:
+                # cover art items are usually '<file name>\0<image data>'
+                p = p.split(b'\0', 1)[1]
+            artworks.append(Artwork(p, pic_type=pic_type))
     return MetadataItem(Artwork, None, artworks)
 
 def set_pictures(afile, norm_key, artworks):
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Journaled edits of many files at once
+#
+#     with music_tag.batch_edit('edits.journal') as batch:
+#         batch.set('a.mp3', 'album', 'Album')
+#         batch.remove('b.flac', 'comment')
+#
+# Nothing is written until the with block exits. Then the current values
+# of every key being edited are read and written to the journal, and only
+# after that are the files saved, on a pool of workers. Each saved file is
+# marked done in the journal. If the run is interrupted (crash, Ctrl-C, a
+# file that can't be saved), the journal is left behind and the batch can
+# be finished with resume() or undone with rollback().
+#
+# The journal is a text file with one JSON object per line:
+#     {"op": "begin", "version": 1}
+#     {"op": "edit", "file": ..., "set": {key: values}, "original": {...}}
+#     {"op": "done", "file": ...}
+# where values are lists, or null for a removed key. Original values are
+# journaled as they are stored in the file (like ``f.raw``) and put back
+# typeless by rollback(), so they round-trip unchanged.
+
+import base64
+import json
+import os
+
+from mutagen.id3 import PictureType
+
+from music_tag import parallel
+from music_tag.file import Artwork
+
+
+JOURNAL_VERSION = 1
+
+
+class BatchEditError(Exception):
+    """Some files in a batch couldn't be edited
+
+    The journal is kept, so the batch can be resumed or rolled back.
+
+    Attributes:
+        journal (str): path of the journal
+        failures (dict): filename -> exception
+    """
+    def __init__(self, journal, failures):
+        self.journal = journal
+        self.failures = failures
+        super(BatchEditError, self).__init__(
+            "{0} file(s) failed, see journal {1}: {2}"
+            "".format(len(failures), journal,
+                      '; '.join('{0}: {1}'.format(k, v)
+                                for k, v in sorted(failures.items())[:5])))
+
+
+def encode_value(val):
+    if isinstance(val, Artwork):
+        return {'artwork': base64.b64encode(val.raw).decode('ascii'),
+                'pic_type': int(val.pic_type)}
+    if isinstance(val, (bytes, bytearray)):
+        return {'bytes': base64.b64encode(val).decode('ascii')}
+    if val is None or isinstance(val, (str, int, float, bool)):
+        return val
+    raise TypeError("can't journal a value of type {0}: {1}"
+                    "".format(type(val).__name__, repr(val)))
+
+def decode_value(val):
+    if isinstance(val, dict):
+        if 'artwork' in val:
+            return Artwork(base64.b64decode(val['artwork']),
+                           pic_type=PictureType(val['pic_type']))
+        return base64.b64decode(val['bytes'])
+    return val
+
+def encode_values(values):
+    """Values of a tag as a JSON-able list (None stays None)"""
+    if values is None:
+        return None
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    return [encode_value(v) for v in values]
+
+def decode_values(values):
+    """Inverse of encode_values()"""
+    if values is None:
+        return None
+    return [decode_value(v) for v in values]
+
+
+def _read_originals(job):
+    # runs on a worker; returns the encoded values of the keys to be edited
+    # as they are stored (like f.raw), so a rollback puts back exactly what
+    # was there, e.g. a year of '2019-05-01' rather than 2019
+    import music_tag
+
+    fname, keys = job
+    f = music_tag.load_file(fname, info=False)
+    original = {}
+    for key in keys:
+        values = f.raw[key].values
+        original[key] = encode_values(values) if values else None
+    return original
+
+
+def _apply_edits(job):
+    # runs on a worker; sets / removes keys and saves the file. Values are
+    # set typeless when restoring originals
+    import music_tag
+
+    fname, edits, save_kwargs = job[:3]
+    typeless = job[3] if len(job) > 3 else False
+    f = music_tag.load_file(fname, info=False)
+    f.skip_clean_saves = True
+    for key, values in edits.items():
+        values = decode_values(values)
+        if values is None:
+            if key in f:
+                del f[key]
+        else:
+            f.set(key, values, typeless=typeless)
+    return f.save(**save_kwargs)
+
+
+class _Journal(object):
+    def __init__(self, path, mode='a'):
+        if mode == 'a':
+            # drop a line cut short by a crash, so appended records don't
+            # run into it
+            with open(path, 'rb+') as fout:
+                data = fout.read()
+                fout.truncate(data.rfind(b'\n') + 1)
+        self._f = open(path, mode, encoding='utf-8')
+
+    def write(self, record):
+        self._f.write(json.dumps(record, sort_keys=True) + '\n')
+        self._f.flush()
+
+    def sync(self):
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+
+def read_journal(journal):
+    """Read a journal left by an interrupted batch
+
+    A line cut short by a crash at the end of the journal is ignored.
+
+    Returns:
+        list of (filename, edits, original, done) tuples, in the order the
+        files were journaled, where edits and original map keys to lists
+        of values (None for a removed / missing key)
+    """
+    entries = {}
+    with open(journal, encoding='utf-8') as fin:
+        lines = fin.read().split('\n')
+
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            if i == len(lines) - 1:
+                break
+            raise ValueError("{0}:{1}: corrupt journal line"
+                             "".format(journal, i + 1))
+        op = record.get('op')
+        if op == 'begin':
+            if record.get('version') != JOURNAL_VERSION:
+                raise ValueError("{0}: unsupported journal version {1}"
+                                 "".format(journal, record.get('version')))
+        elif op == 'edit':
+            entries[record['file']] = [record['file'], record['set'],
+                                       record['original'], False]
+        elif op == 'done' and record['file'] in entries:
+            entries[record['file']][3] = True
+    return [tuple(e) for e in entries.values()]
+
+
+def _run(journal, jobs, workers, executor, mark_done=True):
+    # apply jobs in parallel, marking each one done in the journal;
+    # returns filename -> SaveReport / exception
+    results = {}
+    failures = {}
+    jobs = list(jobs)
+    if jobs:
+        for job, ret in parallel.imap(_apply_edits, jobs, workers=workers,
+                                      executor=executor, ordered=False):
+            fname = job[0]
+            results[fname] = ret
+            if isinstance(ret, Exception):
+                failures[fname] = ret
+            elif mark_done:
+                journal.write({'op': 'done', 'file': fname})
+    return results, failures
+
+
+def _finish(journal, failures, keep_journal):
+    if failures:
+        raise BatchEditError(journal, failures)
+    if not keep_journal:
+        os.remove(journal)
+
+
+def resume(journal, workers=None, executor='process', keep_journal=False,
+           **save_kwargs):
+    """Finish an interrupted batch, saving the files that weren't done
+
+    Args:
+        journal (str): path of the journal
+        workers, executor: as for ``music_tag.load_files``
+        keep_journal (bool): keep the journal when the batch succeeds
+        **save_kwargs: passed to ``AudioFile.save``
+
+    Returns:
+        dict: filename -> SaveReport for the files that were saved
+
+    Raises:
+        BatchEditError: if any file still fails
+    """
+    entries = read_journal(journal)
+    jobs = [(fname, edits, save_kwargs)
+            for fname, edits, _, done in entries if not done]
+    jrnl = _Journal(journal)
+    try:
+        results, failures = _run(jrnl, jobs, workers, executor)
+    finally:
+        jrnl.close()
+    _finish(journal, failures, keep_journal)
+    return results
+
+
+def rollback(journal, workers=None, executor='process', keep_journal=False,
+             **save_kwargs):
+    """Undo a batch, putting back the original values of the edited keys
+
+    Files that weren't saved yet are checked too; since their values
+    didn't change, saving them is skipped.
+
+    Args:
+        journal (str): path of the journal
+        workers, executor: as for ``music_tag.load_files``
+        keep_journal (bool): keep the journal when the rollback succeeds
+        **save_kwargs: passed to ``AudioFile.save``
+
+    Returns:
+        dict: filename -> SaveReport
+
+    Raises:
+        BatchEditError: if any file can't be restored
+    """
+    entries = read_journal(journal)
+    jobs = [(fname, original, save_kwargs, True)
+            for fname, _, original, _ in entries]
+    results, failures = _run(None, jobs, workers, executor, mark_done=False)
+    _finish(journal, failures, keep_journal)
+    return results
+
+
+class BatchEdit(object):
+    """Collects edits to many files, see batch_edit()"""
+    def __init__(self, journal, workers=None, executor='process',
+                 keep_journal=False, **save_kwargs):
+        self.journal = journal
+        self.workers = workers
+        self.executor = executor
+        self.keep_journal = keep_journal
+        self.save_kwargs = save_kwargs
+        self.edits = {}
+        self.results = {}
+
+    def set(self, filename, norm_key, val):
+        """Set a key; val is a value or a list of values"""
+        self.edits.setdefault(filename, {})[norm_key] = encode_values(val)
+
+    def remove(self, filename, norm_key):
+        """Remove a key"""
+        self.edits.setdefault(filename, {})[norm_key] = None
+
+    def update(self, filename, edits):
+        """Set several keys of a file; None values remove the key"""
+        for norm_key, val in edits.items():
+            if val is None:
+                self.remove(filename, norm_key)
+            else:
+                self.set(filename, norm_key, val)
+
+    def __len__(self):
+        return len(self.edits)
+
+    def _check_journal(self):
+        if os.path.exists(self.journal):
+            raise FileExistsError("journal {0} exists, resume or roll back "
+                                  "that batch first".format(self.journal))
+
+    def __enter__(self):
+        self._check_journal()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.apply()
+        return False
+
+    def apply(self):
+        """Journal the original values and save every file
+
+        Returns:
+            dict: filename -> SaveReport
+
+        Raises:
+            FileExistsError: if the journal exists
+            BatchEditError: if some files couldn't be read or saved; the
+                journal is kept
+        """
+        self._check_journal()
+        failures = {}
+        jrnl = _Journal(self.journal, 'w')
+        try:
+            jrnl.write({'op': 'begin', 'version': JOURNAL_VERSION})
+            jobs = [(fname, sorted(edits)) for fname, edits
+                    in self.edits.items()]
+            # write ahead: every original value is on disk before the first
+            # file is touched
+            journaled = []
+            for job, original in parallel.imap(_read_originals, jobs,
+                                               workers=self.workers,
+                                               executor=self.executor):
+                fname = job[0]
+                if isinstance(original, Exception):
+                    failures[fname] = original
+                    continue
+                jrnl.write({'op': 'edit', 'file': fname,
+                            'set': self.edits[fname], 'original': original})
+                journaled.append(fname)
+            jrnl.sync()
+
+            jobs = [(fname, self.edits[fname], self.save_kwargs)
+                    for fname in journaled]
+            self.results, save_failures = _run(jrnl, jobs, self.workers,
+                                               self.executor)
+            failures.update(save_failures)
+            self.results.update(failures)
+        finally:
+            jrnl.close()
+        _finish(self.journal, failures, self.keep_journal)
+        return self.results
+
+
+def batch_edit(journal, workers=None, executor='process', keep_journal=False,
+               **save_kwargs):
+    """Edit many files, with parallel saves and a journal for recovery
+
+    Use as a context manager; edits are applied when the with block exits
+    without an exception, see BatchEdit.apply().
+
+    Args:
+        journal (str): path for the journal; it must not exist yet
+        workers (int): number of workers, defaults to the number of cpus
+        executor: 'process', 'thread', or an existing
+            ``concurrent.futures.Executor``
+        keep_journal (bool): keep the journal even if every file is saved
+        **save_kwargs: passed to ``AudioFile.save`` (e.g., padding)
+
+    Returns:
+        BatchEdit
+    """
+    return BatchEdit(journal, workers=workers, executor=executor,
+                     keep_journal=keep_journal, **save_kwargs)
+
+##
+## EOF
+##
@@ -10,12 +10,21 @@ from music_tag.id3 import Id3File
 class DsfFile(Id3File):
     tag_format = "DSF"
     mutagen_kls = mutagen.dsf.DSF
+    # the ID3 tag sits at the end of a DSF file, so saving never moves the
+    # audio data, and mutagen doesn't keep padding there anyway
+    padding_mechanism = None
 
-    def __init__(self, filename, **kwargs):
-        super(DsfFile, self).__init__(filename, **kwargs)
+    _HIDDEN_TAG_MAP = {
+        '#codec': TAG_MAP_ENTRY(getter=lambda afile, norm_key: 'dsf',
+                                type=str),
+    }
 
-        self.tag_map = self.tag_map.copy()
-        self.tag_map.update({
-            '#codec': TAG_MAP_ENTRY(getter=lambda afile, norm_key: 'dsf',
-                                    type=str),
-        })
+    def __getstate__(self):
+        state = super(DsfFile, self).__getstate__()
+        # mutagen leaves the (closed) file handle it parsed the format
+        # chunk from on the info object, and file objects can't be pickled
+        info = getattr(self._mfile, 'info', None)
+        fmt_chunk = getattr(info, 'fmt_chunk', None)
+        if fmt_chunk is not None:
+            fmt_chunk.fileobj = None
+        return state
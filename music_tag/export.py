@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Columnar export of tags with pyarrow (optional)
+#
+#     from music_tag import export
+#
+#     for batch in export.to_arrow(paths, ['title', 'artist', '#length']):
+#         ...  # pyarrow.RecordBatch
+#
+#     export.to_parquet(paths, ['title', 'artist'], 'tags.parquet')
+#
+# Every batch has the same schema, which comes from the keys alone: a
+# 'filename' column, then one column per key typed after the key's entry
+# in the default tag map. Keys that hold one value (track numbers, year,
+# compilation and the '#' stream info) are plain columns, other keys are
+# list columns, and artwork is a struct of mime, size and sha256 digest.
+# A key a file doesn't have, or its format doesn't know, is null.
+#
+# pyarrow is imported the first time it's needed, since importing it
+# takes longer than importing the rest of music_tag.
+
+import hashlib
+
+from music_tag import file
+from music_tag.file import Artwork
+from music_tag.index import read_snapshots
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        raise ImportError("pyarrow not installed, it's needed for columnar "
+                          "export (pip install music-tag[arrow])")
+    return pyarrow
+
+
+def is_singular(key):
+    """True if a key is exported as one value rather than a list
+
+    These are the keys that can only hold one value (track numbers, year,
+    compilation, ...) and the '#' stream info.
+    """
+    norm_key = file.normalize_key(key)
+    return norm_key.startswith('#') or norm_key in file._DEFAULT_SINGULAR_KEYS
+
+
+def artwork_summary(art):
+    """Mime type, size and sha256 digest of an Artwork, as a dict"""
+    return {'mime': art.mime if art.format else None,
+            'width': art.width, 'height': art.height,
+            'sha256': hashlib.sha256(art.data).hexdigest()}
+
+
+def _column(pa, key):
+    # (arrow type, converter for one value, True if it's a list column)
+    norm_key = file.normalize_key(key)
+    entry = file._DEFAULT_TAG_MAP.get(norm_key, None)
+    typ = str if entry is None else entry.type
+
+    if typ is Artwork:
+        arrow_type = pa.struct([('mime', pa.string()),
+                                ('width', pa.int64()),
+                                ('height', pa.int64()),
+                                ('sha256', pa.string())])
+        convert = artwork_summary
+    elif typ is bool:
+        arrow_type, convert = pa.bool_(), bool
+    elif typ is int:
+        arrow_type, convert = pa.int64(), int
+    elif typ is float:
+        arrow_type, convert = pa.float64(), float
+    else:
+        arrow_type, convert = pa.string(), str
+
+    is_list = not is_singular(key)
+    if is_list:
+        arrow_type = pa.list_(arrow_type)
+    return arrow_type, convert, is_list
+
+
+def arrow_schema(keys):
+    """The pyarrow.Schema of batches from to_arrow() for these keys
+
+    Raises:
+        ImportError: if pyarrow isn't installed
+    """
+    pa = _import_pyarrow()
+    return pa.schema([('filename', pa.string())]
+                     + [(key, _column(pa, key)[0]) for key in keys])
+
+
+def _convert(values, convert, is_list):
+    # (cell, [(value, exception), ...] for values that were dropped)
+    ret = []
+    bad = []
+    for val in values:
+        try:
+            ret.append(convert(val))
+        except (TypeError, ValueError) as e:
+            bad.append((val, e))
+    if is_list:
+        return ret or None, bad
+    return (ret[0] if ret else None), bad
+
+
+def to_arrow(paths, keys, batch_size=1024, resolve=False, workers=1,
+             executor='process', index=None, on_error=None):
+    """Yield tags of many files as pyarrow.RecordBatch-es
+
+    Files are read lazily, in order, and at most ``batch_size`` rows are
+    held at once, so any number of files can be exported.
+
+    Args:
+        paths (iterable): file paths
+        keys (list): keys to export, one column each
+        batch_size (int): rows per batch
+        resolve (bool): as for ``AudioFile.snapshot``
+        workers (int): number of workers reading files
+        executor: as for ``music_tag.parallel.imap``
+        index (music_tag.index.TagIndex): read snapshots through this
+            index, so unchanged files aren't parsed again
+        on_error (callable): called as ``on_error(path, exception)`` for
+            files that can't be read, which are left out, and with a
+            ValueError for values that don't fit their column's type,
+            which are dropped from the cell; if None, the exception is
+            raised
+
+    Yields:
+        pyarrow.RecordBatch with the schema of arrow_schema(keys)
+
+    Raises:
+        ImportError: if pyarrow isn't installed
+    """
+    pa = _import_pyarrow()
+    keys = list(keys)
+    schema = arrow_schema(keys)
+    columns = [_column(pa, key) for key in keys]
+    batch_size = max(1, batch_size)
+
+    if index is None:
+        snaps = read_snapshots(paths, keys, resolve=resolve, workers=workers,
+                               executor=executor)
+    else:
+        snaps = index.snapshots(paths, keys, resolve=resolve, workers=workers,
+                                executor=executor)
+
+    def _batch(rows):
+        arrays = [pa.array(col, type=field.type)
+                  for col, field in zip(zip(*rows), schema)]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    rows = []
+    try:
+        for path, snap in snaps:
+            if isinstance(snap, Exception):
+                if on_error is None:
+                    raise snap
+                on_error(path, snap)
+                continue
+            row = [path]
+            for key, (_, convert, is_list) in zip(keys, columns):
+                cell, bad = _convert(snap.get(key, ()), convert, is_list)
+                for val, e in bad:
+                    err = ValueError("{0}: can't export {1!r} as {2}: {3}"
+                                     "".format(key, val, convert.__name__, e))
+                    if on_error is None:
+                        raise err
+                    on_error(path, err)
+                row.append(cell)
+            rows.append(row)
+            if len(rows) == batch_size:
+                yield _batch(rows)
+                rows = []
+        if rows:
+            yield _batch(rows)
+    finally:
+        snaps.close()
+
+
+def to_parquet(paths, keys, dest, batch_size=1024, **kwargs):
+    """Write tags of many files to a Parquet file, one batch at a time
+
+    Args:
+        paths, keys, batch_size: as for to_arrow()
+        dest (str): path of the Parquet file
+        **kwargs: passed to to_arrow()
+
+    Returns:
+        int: number of rows written
+
+    Raises:
+        ImportError: if pyarrow isn't installed
+    """
+    _import_pyarrow()
+    import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+    n_rows = 0
+    with pq.ParquetWriter(dest, arrow_schema(keys)) as writer:
+        for batch in to_arrow(paths, keys, batch_size=batch_size, **kwargs):
+            writer.write_batch(batch)
+            n_rows += batch.num_rows
+    return n_rows
+
+##
+## EOF
+##
@@ -1,10 +1,12 @@
 #!/usr/bin/env python
 
 from collections import namedtuple
+from collections.abc import Mapping
+import contextlib
 import hashlib
 import binascii
 import io
-import shutil
+from types import MappingProxyType
 
 import mutagen
 from mutagen.id3 import PictureType
@@ -17,6 +19,8 @@ except ImportError:
     BICUBIC = None
     _HAS_PIL = False
 
+from music_tag import fileops
+from music_tag import registry
 from music_tag import util
 
 def getter_not_implemented(afile, norm_key):
@@ -48,6 +52,27 @@ def tags():
     return(list(_DEFAULT_TAG_MAP.keys()))
 
 
+def _to_values(typ, sanitizer, val):
+    """Sanitize and type-cast a raw tag value into a tuple of values"""
+    if isinstance(val, MetadataItem):
+        return tuple(val.values)
+    if isinstance(val, (list, tuple)):
+        values = val
+    elif val is None:
+        return ()
+    else:
+        values = (val, )
+
+    ret = []
+    for v in values:
+        if sanitizer is not None:
+            v = sanitizer(v)
+        if not (typ is None or v is None or isinstance(v, typ)):
+            v = typ(v)
+        ret.append(v)
+    return tuple(ret)
+
+
 class MetadataItem(object):
     def __init__(self, typ, sanitizer, val):
         self._values = None
@@ -59,6 +84,15 @@ class MetadataItem(object):
         self.sanitizer = sanitizer
         self.values = val
 
+    @classmethod
+    def _from_values(cls, typ, sanitizer, values):
+        # values are already sanitized / type-cast, e.g. from _to_values()
+        item = cls.__new__(cls)
+        item.type = typ
+        item.sanitizer = sanitizer
+        item._values = list(values)
+        return item
+
     @property
     def ismissing(self):
         return not bool(self.values)
@@ -71,19 +105,7 @@ class MetadataItem(object):
         return self._values
     @values.setter
     def values(self, val):
-        if isinstance(val, (list, tuple)):
-            self._values = list(val)
-        elif val is None:
-            self._values = []
-        else:
-            self._values = [val]
-
-        for i, v in enumerate(self._values):
-            if self.sanitizer is not None:
-                v = self.sanitizer(v)
-            if not (self.type is None or v is None or isinstance(v, self.type)):
-                v = self.type(v)
-            self._values[i] = v
+        self._values = list(_to_values(self.type, self.sanitizer, val))
 
     @property
     def value(self):
@@ -128,6 +150,15 @@ class MetadataItem(object):
     def __len__(self):
         return len(self._values)
 
+    def __eq__(self, other):
+        # values are compared after sanitization / type normalization, so
+        # e.g. '01' and 1 are the same track number
+        if not isinstance(other, MetadataItem):
+            return NotImplemented
+        return self._values == other._values
+
+    __hash__ = None
+
     def __str__(self):
         return ', '.join(str(li) for li in self._values)
 
@@ -159,8 +190,8 @@ class Artwork(object):
         if isinstance(raw, Artwork):
             orig = raw
             raw = orig.raw
-            width, height = orig.width, orig.height
-            fmt, depth = orig.fmt, orig.depth
+            width, height = orig._width, orig._height
+            fmt, depth = orig._format, orig._depth
             pic_type = orig.pic_type
             del orig
 
@@ -169,32 +200,83 @@ class Artwork(object):
 
         self.raw = raw
 
-        if any(v is None for v in (width, height, fmt, depth)):
-            try:
-                img = self.image
-                width = img.width
-                height = img.height
-                fmt = img.format.lower()
-                mode2depth = {'1': 1, 'L': 8, 'P': 8, 'RGB': 24, 'RGBA': 32,
-                              'CMYK': 32, 'YCbCr': 24, 'I': 32, 'F': 32}
-                depth = mode2depth[img.mode]
-            except ImportError:
-                width = None
-                height = None
-                fmt = None
-                depth = None
-
-        self.width = width
-        self.height = height
-        self.depth = depth
-        self.format = fmt
-        self.mime = "image/{0}".format(self.format)
+        # the image is only decoded (with PIL) the first time one of these
+        # is needed, so passing artwork around or saving it doesn't cost a
+        # decode
+        self._width = width
+        self._height = height
+        self._depth = depth
+        self._format = fmt
+        self._probed = not any(v is None for v in (width, height, fmt, depth))
 
         # ``pic_type`` should be one of ``mutagen.id3.PictureType.*``
         self.pic_type = pic_type
 
         # Image.open(io.BytesIO(self.data))  # for testing
 
+    def _probe(self):
+        if self._probed:
+            return
+        try:
+            img = self.image
+            width = img.width
+            height = img.height
+            fmt = img.format.lower()
+            mode2depth = {'1': 1, 'L': 8, 'P': 8, 'RGB': 24, 'RGBA': 32,
+                          'CMYK': 32, 'YCbCr': 24, 'I': 32, 'F': 32}
+            depth = mode2depth[img.mode]
+        except ImportError:
+            width = None
+            height = None
+            fmt = None
+            depth = None
+        self._probed = True
+
+        if self._width is None:
+            self._width = width
+        if self._height is None:
+            self._height = height
+        if self._format is None:
+            self._format = fmt
+        if self._depth is None:
+            self._depth = depth
+
+    @property
+    def width(self):
+        self._probe()
+        return self._width
+    @width.setter
+    def width(self, val):
+        self._width = val
+
+    @property
+    def height(self):
+        self._probe()
+        return self._height
+    @height.setter
+    def height(self, val):
+        self._height = val
+
+    @property
+    def depth(self):
+        self._probe()
+        return self._depth
+    @depth.setter
+    def depth(self, val):
+        self._depth = val
+
+    @property
+    def format(self):
+        self._probe()
+        return self._format
+    @format.setter
+    def format(self, val):
+        self._format = val
+
+    @property
+    def mime(self):
+        return "image/{0}".format(self.format)
+
     @property
     def data(self):
         return self.raw
@@ -266,6 +348,7 @@ class RawProxy(object):
             self.parent.set(norm_key, val, typeless=True)
         else:
             self.parent.mfile[raw_key] = val
+            self.parent.clear_cache()
 
     def __getitem__(self, norm_key):
         return self.get(norm_key, default=None)
@@ -273,10 +356,106 @@ class RawProxy(object):
         self.set(norm_key, val)
 
 
+# stands in for the original value of a tag that couldn't be read
+_UNKNOWN = object()
+
+
+class TagSnapshot(Mapping):
+    """Immutable record of tag values read from a file by snapshot()
+
+    Maps each requested key, spelled as it was requested, to a tuple of
+    plain values (an empty tuple if the tag is missing). Snapshots don't
+    reference the file they were read from, so they are cheap to keep
+    around and can be pickled.
+    """
+    __slots__ = ('filename', '_keys', '_values')
+
+    def __init__(self, filename, keys, values):
+        self.filename = filename
+        self._keys = tuple(keys)
+        self._values = dict(zip(self._keys, values))
+
+    def __reduce__(self):
+        return (TagSnapshot, (self.filename, self._keys,
+                              tuple(self._values[k] for k in self._keys)))
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def first(self, key, default=None):
+        """First value of ``key``, or default if it's missing"""
+        values = self._values[key]
+        return values[0] if values else default
+
+    def text(self, key):
+        """Values of ``key`` as a string, the same as str(MetadataItem)"""
+        return ', '.join(str(v) for v in self._values[key])
+
+    def present(self):
+        """Keys that have at least one value"""
+        return [k for k in self._keys if self._values[k]]
+
+    def info(self, tags=None, show_empty=False):
+        """Format tags one per line, like AudioFile.info()
+
+        Tags that aren't in the snapshot are shown as None if show_empty.
+        """
+        if tags is None:
+            tags = self._keys
+
+        t_lst = []
+        for tag in tags:
+            if tag not in self._values:
+                if show_empty:
+                    t_lst.append('{0}: {1}'.format(tag, None))
+            elif show_empty or self._values[tag]:
+                t_lst.append('{0}: {1}'.format(tag, self.text(tag)))
+
+        return '\n'.join(t_lst)
+
+    def __repr__(self):
+        return '<TagSnapshot: {0} {1}>'.format(self.filename,
+                                                dict(self.items()))
+
+
 class NotAppendable(Exception):
     pass
 
 
+# Upper bound on the number of key spellings remembered per class. Keys
+# are normalized on every get / set, and the same handful of spellings
+# (e.g. csv headers) tend to be used over and over.
+_NORM_KEY_CACHE_SIZE = 1024
+
+def _seed_norm_key_cache(tag_map, tag_aliases):
+    """Map the canonical spelling of every key and alias to its norm_key"""
+    cache = {}
+    for key in tag_map:
+        cache[key] = tag_aliases.get(key, key)
+    for alias, key in tag_aliases.items():
+        cache[alias] = key
+    return cache
+
+
+def normalize_key(key, tag_aliases=None):
+    """Spell a key the way tag maps do, e.g. 'Album Artist' -> 'albumartist'
+
+    Args:
+        key (str): key as given by the user
+        tag_aliases (dict): alias -> norm_key, the default aliases if None
+    """
+    if tag_aliases is None:
+        tag_aliases = _DEFAULT_TAG_ALIASES
+    key = key.replace(' ', '').replace('_', '').replace('-', '').lower()
+    return tag_aliases.get(key, key)
+
+
 
 
 class AudioFile(object):
@@ -285,59 +464,476 @@ class AudioFile(object):
 
     appendable = True
 
-
-    # these 3 attributes may be overridden in subclasses
+    # how the format keeps free space after its tags (e.g. 'ID3v2 padding'),
+    # None if it can't, in which case padding policies are ignored
+    padding_mechanism = None
+    # default padding policy for save(), see fileops.padding_func; None
+    # leaves it up to mutagen
+    padding_policy = None
+
+    # lookup table from _build_read_index(), only set during snapshot()
+    _read_index = None
+
+    # Decoded tag values are cached per file; set / append_tag / remove_tag
+    # invalidate just the keys they touch. Set this to False (on the class
+    # or a single file) if you edit tags through ``mfile`` directly, or
+    # call clear_cache() after doing so.
+    cache_reads = True
+    # If True, save() in place does nothing when no tag effectively changed
+    # (see is_dirty). It's off by default since edits made through
+    # ``mfile`` can't be seen; turn it on for files that are only edited
+    # through set() / remove_tag().
+    skip_clean_saves = False
+
+    # these 4 attributes may be overridden in subclasses
     _TAG_ALIASES = {}
     _TAG_MAP = {}
     _RESOLVERS = {}
     _SINGULAR_KEYS = []
+    # entries added to tag_map like those in _TAG_MAP, but that aren't
+    # listed by keys() / items() / info()
+    _HIDDEN_TAG_MAP = {}
+
+    # groups of keys that are stored in the same raw tag by callable
+    # getters / setters (e.g. track number and total tracks in 'TRCK');
+    # keys that share a raw tag name in the tag map are linked automatically
+    _LINKED_KEYS = []
+
+    # the defaults merged with the 4 attributes above; these are built once
+    # per class and are read-only, use customize() to change them for a
+    # single file
+    tag_aliases = None
+    tag_map = None
+    resolvers = None
+    singular_keys = None
+
+    # arguments of customize() calls on this file, merged; the customized
+    # maps are rebuilt from these when the file is unpickled
+    _customized = None
+
+    # how the file is read when it's parsed, see fileops.IO_MODES
+    _io_mode = None
+    # file object the file was loaded from, for files not loaded by path
+    _source = None
+    # False to put off parsing stream info (the '#' keys) until it's used
+    _load_info = True
+
+    def __init_subclass__(cls, **kwargs):
+        super(AudioFile, cls).__init_subclass__(**kwargs)
+        cls._build_tag_maps()
+        registry.register(cls)
+
+    @classmethod
+    def _build_tag_maps(cls):
+        tag_aliases = _DEFAULT_TAG_ALIASES.copy()
+        tag_aliases.update(cls._TAG_ALIASES)
+        cls.tag_aliases = MappingProxyType(tag_aliases)
+
+        tag_map = _DEFAULT_TAG_MAP.copy()
+        tag_map.update(cls._TAG_MAP)
+        tag_map.update(cls._HIDDEN_TAG_MAP)
+        cls.tag_map = MappingProxyType(tag_map)
+
+        resolvers = _DEFAULT_RESOLVERS.copy()
+        resolvers.update(cls._RESOLVERS)
+        cls.resolvers = MappingProxyType(resolvers)
+
+        cls.singular_keys = frozenset(_DEFAULT_SINGULAR_KEYS +
+                                      list(cls._SINGULAR_KEYS))
+
+        cls._norm_key_cache = _seed_norm_key_cache(cls.tag_map,
+                                                   cls.tag_aliases)
+        cls._accessors = compile_tag_map(cls.tag_map)
+        cls._linked_keys = _link_keys(cls.tag_map, _DEFAULT_LINKED_KEYS +
+                                      list(cls._LINKED_KEYS))
+
+    def __init__(self, filename, _mfile=None, _mutagen_kls=None, _lazy=False,
+                 _io_mode=None, _fileobj=None, _info=True):
+        self.filename = filename
+        self._mutagen_kls = _mutagen_kls
+        self._io_mode = _io_mode
+        self._source = _fileobj
+        self._load_info = _info
+        self._mfile = _mfile
+        self._read_cache = {}
+        # values of edited keys as they were when loaded / last saved
+        self._originals = {}
+        # set when tags may have changed in ways _originals can't see
+        self._force_dirty = False
+
+        if not _lazy:
+            self._load_mfile()
+
+    def customize(self, tag_map=None, tag_aliases=None, resolvers=None,
+                  singular_keys=None):
+        """Change how tags are handled for just this file
+
+        The class-wide maps are shared by every file of a given format, so
+        the first customization copies them onto this instance.
+
+        Args:
+            tag_map (dict): norm_key -> TAG_MAP_ENTRY items to add / replace
+            tag_aliases (dict): alias -> norm_key items to add / replace
+            resolvers (dict): norm_key -> resolver tuples to add / replace
+            singular_keys (iterable): additional keys that can only hold
+                a single value
+        """
+        custom = dict(self._customized or {})
+        for name, val in (('tag_map', tag_map), ('tag_aliases', tag_aliases),
+                          ('resolvers', resolvers)):
+            if val:
+                custom[name] = dict(custom.get(name, {}), **val)
+        if singular_keys:
+            custom['singular_keys'] = (custom.get('singular_keys', frozenset())
+                                       | frozenset(singular_keys))
+        self._customized = custom
+
+        if tag_map:
+            self.tag_map = MappingProxyType(dict(self.tag_map, **tag_map))
+        if tag_aliases:
+            self.tag_aliases = MappingProxyType(dict(self.tag_aliases,
+                                                     **tag_aliases))
+        if resolvers:
+            self.resolvers = MappingProxyType(dict(self.resolvers,
+                                                   **resolvers))
+        if singular_keys:
+            self.singular_keys = self.singular_keys | frozenset(singular_keys)
+        if tag_map or tag_aliases:
+            self._norm_key_cache = _seed_norm_key_cache(self.tag_map,
+                                                        self.tag_aliases)
+        if tag_map:
+            self._accessors = compile_tag_map(self.tag_map)
+            self._linked_keys = _link_keys(self.tag_map,
+                                           _DEFAULT_LINKED_KEYS +
+                                           list(self._LINKED_KEYS))
+        self._read_cache.clear()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # maps from customize() hold the class maps' getters (often
+        # lambdas) and compiled accessors are closures, so only the
+        # customizations are pickled and the maps are rebuilt from them
+        for attr in ('tag_aliases', 'tag_map', 'resolvers', 'singular_keys',
+                     '_norm_key_cache', '_accessors', '_linked_keys'):
+            state.pop(attr, None)
+        state['_read_cache'] = {}
+        return state
+
+    def __setstate__(self, state):
+        custom = state.pop('_customized', None)
+        self.__dict__.update(state)
+        if custom:
+            self.customize(**custom)
 
-    def __init__(self, filename, _mfile=None):
-        self.tag_aliases = _DEFAULT_TAG_ALIASES.copy()
-        self.tag_aliases.update(self._TAG_ALIASES)
-
-        self.tag_map = _DEFAULT_TAG_MAP.copy()
-        self.tag_map.update(self._TAG_MAP)
-
-        self.resolvers = _DEFAULT_RESOLVERS.copy()
-        self.resolvers.update(self._RESOLVERS)
+    @property
+    def mfile(self):
+        if self._mfile is None:
+            self._load_mfile()
+        return self._mfile
+    @mfile.setter
+    def mfile(self, val):
+        self._mfile = val
+        self._read_cache.clear()
+        self._force_dirty = True
+
+    def clear_cache(self, keys=None):
+        """Forget cached tag values
+
+        Since this is how edits made through ``mfile`` are picked up, the
+        file is also considered dirty afterwards.
+
+        Args:
+            keys (iterable): keys to forget (along with the keys that share
+                their raw tags), or everything if None
+        """
+        self._force_dirty = True
+        if keys is None:
+            self._read_cache.clear()
+        else:
+            for key in keys:
+                self._invalidate(self._normalize_norm_key(key))
 
-        self.singular_keys = _DEFAULT_SINGULAR_KEYS.copy()
-        self.singular_keys += self._SINGULAR_KEYS
+    def _invalidate(self, norm_key):
+        cache = self._read_cache
+        if not cache:
+            return
+        for key in self._linked_keys.get(norm_key, (norm_key, )):
+            cache.pop((key, False), None)
+            cache.pop((key, True), None)
 
-        self.filename = filename
-        if _mfile is None:
-            self.mfile = mutagen.File(filename)
+    @property
+    def loaded(self):
+        """False until a lazily loaded file has been parsed by mutagen"""
+        return self._mfile is not None
+
+    def _load_mfile(self):
+        mfile = self._mfile
+        if mfile is None:
+            mfile = registry.open_mutagen_file(self.filename,
+                                               self._mutagen_kls,
+                                               self._io_mode,
+                                               fileobj=self._source,
+                                               info=self._load_info)
+
+        self._check_mfile(mfile)
+
+        if mfile.tags is None:
+            mfile.add_tags()
+        self._mfile = mfile
+
+    def _check_mfile(self, mfile):
+        """Hook to validate a freshly parsed mutagen file"""
+        pass
+
+    @contextlib.contextmanager
+    def _open_source(self):
+        """Open the file's current contents for reading
+
+        Files loaded from a file object yield that object, rewound; it
+        isn't closed afterwards.
+        """
+        if self._source is None:
+            with open(self.filename, 'rb') as fin:
+                yield fin
         else:
-            self.mfile = _mfile
-
-        if self.mfile.tags is None:
-            self.mfile.add_tags()
+            self._source.seek(0)
+            yield self._source
 
     @property
     def raw(self):
         return RawProxy(self)
 
-    def save(self, filename=None, **kwargs):
-        """BE CAREFUL, I doubt I did a good job testing tag editing"""
-        if filename is None:
-            self.mfile.save(**kwargs)
-            filename = self.filename
-        else:
-            shutil.copyfile(self.filename, filename)
+    def _dirty_values(self, norm_key, cache):
+        # raw values of a key in a form that doesn't change when the values
+        # handed out are edited; artwork is compared by data and pic_type
+        values = self._read_values(norm_key, True, cache)
+        if values is None:
+            return None
+        return tuple((v.raw, v.pic_type) if isinstance(v, Artwork) else v
+                     for v in values)
+
+    def _remember_originals(self, norm_key):
+        # called before a key is changed, keeps the loaded values of the
+        # key and the keys that share its raw tags to check for changes
+        cache = self._read_cache if self.cache_reads else None
+        for key in self._linked_keys.get(norm_key, (norm_key, )):
+            if key in self._originals:
+                continue
+            try:
+                self._originals[key] = self._dirty_values(key, cache)
+            except Exception:  # pylint: disable=broad-except
+                self._originals[key] = _UNKNOWN
+
+    def changed_keys(self):
+        """Keys whose values differ from when the file was loaded / saved
+
+        Setting a tag to the value it already has doesn't count as a change.
+        Values are compared as they are stored (like ``f.raw``), so setting
+        a value that only reads back the same after type normalization
+        does count.
+        """
+        cache = self._read_cache if self.cache_reads else None
+        ret = []
+        for key, orig in self._originals.items():
+            try:
+                changed = self._dirty_values(key, cache) != orig
+            except Exception:  # pylint: disable=broad-except
+                changed = True
+            if changed or orig is _UNKNOWN:
+                ret.append(key)
+        return sorted(ret)
+
+    def diff(self, edits):
+        """Edits that would really change this file
+
+        A value is unchanged if, as a MetadataItem of the key's type, it
+        equals the current item. A string that is the same as str() of the
+        current item is unchanged too, so text exports (e.g., --to-csv)
+        can be written back without changing anything.
+
+        Args:
+            edits (dict): key -> value to set, or None / '' to remove the
+                key; an iterable of (key, value) pairs also works, and later
+                pairs win
+
+        Returns:
+            dict: the edits that differ from the file, with removals as None
+        """
+        ret = {}
+        for key, val in dict(edits).items():
+            current = self.get(key)
+            if val is None or (isinstance(val, util.string_types) and val == ''):
+                if current.values:
+                    ret[key] = None
+                continue
+            if isinstance(val, util.string_types) and val == str(current):
+                continue
+            accessor = self._accessors[self._normalize_norm_key(key)]
+            try:
+                new = MetadataItem(accessor.type, accessor.sanitizer, val)
+            except (TypeError, ValueError):
+                # let set() raise when the edit is applied
+                ret[key] = val
+                continue
+            if new != current:
+                ret[key] = val
+        return ret
+
+    @property
+    def is_dirty(self):
+        """True if save() has something to write
+
+        Only changes made through set() / remove_tag() can be seen; files
+        whose mutagen object was edited or handed in from outside are
+        always dirty.
+        """
+        return (self._force_dirty or not self.cache_reads
+                or bool(self.changed_keys()))
+
+    def _skips_save(self, force):
+        return self.skip_clean_saves and not (force or self.is_dirty)
+
+    def _mark_clean(self):
+        self._originals = {}
+        self._force_dirty = False
+
+    def save(self, filename=None, force=False, padding=None, fileobj=None,
+             **kwargs):
+        """BE CAREFUL, I doubt I did a good job testing tag editing
+
+        With ``skip_clean_saves`` on, saving in place does nothing if no
+        tag effectively changed, see is_dirty. Turning off ``cache_reads``
+        turns off this check, since changes made through ``mfile`` can't
+        be seen.
+
+        Files loaded from a file object are saved in place into that
+        object, which has to be writable (e.g., an io.BytesIO); files
+        loaded from a read-only buffer can only be saved as a copy.
+
+        Args:
+            filename (str): save a copy to this file instead; the copy is
+                always written
+            force (bool): write the file even if nothing changed and
+                ``skip_clean_saves`` is on
+            padding: padding policy (see fileops.padding_func), defaults
+                to ``self.padding_policy``
+            fileobj: save a copy into this file object instead (e.g., an
+                io.BytesIO), replacing its contents; the copy is always
+                written. Saving to the file object the file was loaded from
+                is the same as saving in place.
+
+        Returns:
+            fileops.SaveReport
+        """
+        if filename is not None and fileobj is not None:
+            raise ValueError("save to a filename or a fileobj, not both")
+        if fileobj is not None and fileobj is self._source:
+            fileobj = None
+
+        recorder = None
+        if self.padding_mechanism is not None:
+            if padding is None:
+                padding = self.padding_policy
+            recorder = fileops.PaddingRecorder(fileops.padding_func(padding))
+            kwargs['padding'] = recorder
+
+        copy_strategy = None
+        if fileobj is not None:
+            with self._open_source() as fsrc:
+                copy_strategy = fileops.copy_fileobj(fsrc, fileobj)
+            fileobj.seek(0)
+            self.mfile.save(fileobj, **kwargs)
+            filename = fileops.fileobj_name(fileobj)
+        elif filename is not None:
+            if self._source is None:
+                copy_strategy = fileops.copy_file(self.filename, filename)
+            else:
+                with open(filename, 'wb') as fdst:
+                    copy_strategy = fileops.copy_fileobj(self._source, fdst)
             self.mfile.save(filename, **kwargs)
+        else:
+            if self._skips_save(force):
+                return fileops.SaveReport(self.filename, False, None)
+            # stream info that was put off is read relative to where the
+            # tags were, which changes once they're written
+            registry.resolve_info(self.mfile)
+            if self._source is None:
+                self.mfile.save(**kwargs)
+            elif self._source.writable():
+                self._source.seek(0)
+                self.mfile.save(self._source, **kwargs)
+            else:
+                raise ValueError("file was loaded from a read-only file "
+                                 "object, save it with filename= or fileobj=")
+            filename = self.filename
+            # only the file itself is clean now, not after saving a copy
+            self._mark_clean()
+
+        if recorder is None:
+            return fileops.SaveReport(filename, True, copy_strategy)
+        return fileops.SaveReport(filename, True, copy_strategy,
+                                  in_place=recorder.in_place,
+                                  padding=recorder.padding)
+
+    def _tag_space(self):
+        # bytes the tags (and their padding) take up in the file on disk,
+        # which mutagen's padding info is relative to; None if unknown
+        return None
+
+    # True if mutagen's PaddingInfo.size includes the tags themselves
+    _padding_size_has_tags = False
+
+    def plan_save(self, force=False, padding=None):
+        """Predict what save() would do, without writing anything
+
+        mutagen is run up to the point where it has laid out the new tags
+        and picked their padding, and stopped there. Formats without a
+        padding mechanism can't be predicted and get a plan of Nones.
+
+        Args:
+            force (bool): plan as if for ``save(force=True)``
+            padding: padding policy, as for save()
+
+        Returns:
+            fileops.SavePlan
+        """
+        if self._skips_save(force):
+            return fileops.SavePlan(self.filename, False, None, None, None,
+                                    False, 0)
+        if self.padding_mechanism is None:
+            return fileops.SavePlan(self.filename, True, None, None, None,
+                                    None, None)
+
+        if padding is None:
+            padding = self.padding_policy
+        recorder = fileops.PaddingRecorder(fileops.padding_func(padding),
+                                           abort=True)
+        tag_space = self._tag_space()
+        with fileops.ReadOnlyFile(self.filename, self._source) as fileobj:
+            try:
+                self.mfile.save(fileobj, padding=recorder)
+            except fileops.SaveAborted:
+                pass
+        return fileops.plan_from_padding(self.filename, recorder, tag_space,
+                                         self._padding_size_has_tags)
 
     def _normalize_norm_key(self, norm_key):
-        norm_key = norm_key.replace(' ', '').replace('_', '').replace('-', '').lower()
-        if self.tag_aliases and norm_key in self.tag_aliases:
-            norm_key = self.tag_aliases[norm_key]
-        return norm_key
+        cache = self._norm_key_cache
+        try:
+            return cache[norm_key]
+        except KeyError:
+            pass
+
+        key = normalize_key(norm_key, self.tag_aliases)
+        if len(cache) < _NORM_KEY_CACHE_SIZE:
+            cache[norm_key] = key
+        return key
 
     def resolve(self, norm_key, default=None, typeless=False):
         norm_key = self._normalize_norm_key(norm_key)
-        tmap = self.tag_map[norm_key]
-        md_type = None if typeless else tmap.type
-        md_sanitizer = None if typeless else tmap.sanitizer
+        accessor = self._accessors[norm_key]
+        md_type = None if typeless else accessor.type
+        md_sanitizer = None if typeless else accessor.sanitizer
 
         ret = None
         if norm_key in self.resolvers:
@@ -361,50 +957,30 @@ class AudioFile(object):
 
         return ret
 
+    def _build_read_index(self):
+        # Formats where looking up a single tag is slow can return a
+        # lookup table here, _ft_getter then uses it while snapshot()
+        # reads many tags at once
+        return None
+
     def _ft_getter(self, key):
         return self.mfile.tags.get(key, None)
 
     def get(self, norm_key, default=None, _raw_default=False, typeless=False):
         norm_key = self._normalize_norm_key(norm_key)
-        tmap = self.tag_map[norm_key]
-        md_type = None if typeless else tmap.type
-        md_sanitizer = None if typeless else tmap.sanitizer
+        accessor = self._accessors[norm_key]
+        md_type = None if typeless else accessor.type
+        md_sanitizer = None if typeless else accessor.sanitizer
 
-        ret = None
-        if hasattr(tmap.getter, '__call__'):
-            val = tmap.getter(self, norm_key)
-            ret = None if val is None else MetadataItem(md_type, md_sanitizer,
-                                                        val)
-        elif norm_key.startswith('#'):
-            val = getattr(self.mfile.info, tmap.getter)
-            if not typeless:
-                val = tmap.type(val)
-            ret = None if val is None else MetadataItem(md_type, md_sanitizer,
-                                                        val)
-        elif isinstance(tmap.getter, (list, tuple)):
-            val = None
-            for getter in tmap.getter:
-                if val is not None:
-                    break
-                if hasattr(getter, '__call__'):
-                    val = getter(self, norm_key)
-                elif getter in self.mfile.tags:
-                    val = self._ft_getter(getter)
-            ret = None if val is None else MetadataItem(md_type, md_sanitizer,
-                                                        val)
-        else:
-            try:
-                val = self._ft_getter(tmap.getter)
-            except KeyError:
-                val = None
-            ret = None if val is None else MetadataItem(md_type, md_sanitizer,
-                                                        val)
+        val = self._read_values(norm_key, typeless,
+                                self._read_cache if self.cache_reads else None)
 
-        if ret is None:
-            if _raw_default:
-                ret = default
-            else:
-                ret = MetadataItem(md_type, md_sanitizer, default)
+        if val is not None:
+            ret = MetadataItem._from_values(md_type, md_sanitizer, val)
+        elif _raw_default:
+            ret = default
+        else:
+            ret = MetadataItem(md_type, md_sanitizer, default)
 
         return ret
 
@@ -442,32 +1018,17 @@ class AudioFile(object):
 
     def set(self, norm_key, val, typeless=False):
         norm_key = self._normalize_norm_key(norm_key)
-        tmap = self.tag_map[norm_key]
-        md_type = None if typeless else tmap.type
-        md_sanitizer = None if typeless else tmap.sanitizer
+        accessor = self._accessors[norm_key]
 
         if not isinstance(val, MetadataItem):
-            val = MetadataItem(md_type, md_sanitizer, val)
+            if typeless:
+                val = MetadataItem(None, None, val)
+            else:
+                val = MetadataItem(accessor.type, accessor.sanitizer, val)
 
-        if hasattr(tmap.setter, '__call__'):
-            tmap.setter(self, norm_key, val)
-        elif norm_key.startswith('#'):
-            raise KeyError("Can not set file info (tags that begin with #)")
-        elif isinstance(tmap.setter, (list, tuple)):
-            value_set = False
-            for setter in tmap.setter:
-                if value_set:
-                    break
-                if hasattr(tmap.setter, '__call__'):
-                    tmap.setter(self, norm_key, val)
-                    value_set = True
-                elif setter in self.mfile.tags:
-                    self.set_raw(norm_key, setter, val)
-                    value_set = True
-            if not value_set:
-                self.set_raw(norm_key, tmap.setter[0], val)
-        else:
-            self.set_raw(norm_key, tmap.setter, val)
+        self._remember_originals(norm_key)
+        self._invalidate(norm_key)
+        accessor.setter(self, norm_key, val)
 
     def append_tag(self, norm_key, val):
         norm_key = self._normalize_norm_key(norm_key)
@@ -502,57 +1063,104 @@ class AudioFile(object):
             raise KeyError("Can not remove tags that start with '#' since "
                            "they are not real tags")
 
-        tmap = self.tag_map[norm_key]
-
-        remover = None
-        if tmap.remover:
-            remover = tmap.remover
-
-        if not remover:
-            if isinstance(tmap.getter, (list, tuple)):
-                remover = [g for g in tmap.getter if isinstance(g, util.string_types)]
-            if isinstance(tmap.getter, util.string_types):
-                remover = [tmap.getter]
-
-        if not remover:
-            if isinstance(tmap.setter, (list, tuple)):
-                remover = [s for s in tmap.setter if isinstance(g, util.string_types)]
-            if isinstance(tmap.setter, util.string_types):
-                remover = [tmap.setter]
-
-        if remover is not None:
-            if hasattr(remover, '__call__'):
-                remover(self, norm_key)
-            elif isinstance(remover, (list, tuple)):
-                for key in remover:
-                    self._ft_rmtag(key)
-            elif isinstance(remover, util.string_types):
-                self._ft_rmtag(remover)
+        self._remember_originals(norm_key)
+        self._invalidate(norm_key)
+        self._accessors[norm_key].remover(self, norm_key)
 
     def tags(self):
         return sorted(list(self.tag_map.keys()))
 
-    def info(self, tags=None, show_empty=False, resolve=False):
-        if not tags:
-            tags = self._TAG_MAP.keys()
-        
-        t_lst = []
-        for tag in tags:
+    def _read_values(self, norm_key, typeless, memo):
+        # plain-value version of get(); returns None if the tag is missing.
+        # memo is a dict of values that were already read, or None
+        if memo is not None:
             try:
-                #print("-- " + tag + " ", end="")
+                return memo[(norm_key, typeless)]
+            except KeyError:
+                pass
+
+        accessor = self._accessors[norm_key]
+        val = accessor.getter(self, norm_key)
+        if val is not None:
+            if typeless:
+                val = _to_values(None, None, val)
+            else:
+                val = _to_values(accessor.type, accessor.sanitizer, val)
+
+        if memo is not None:
+            memo[(norm_key, typeless)] = val
+        return val
+
+    def _resolve_values(self, norm_key, typ, sanitizer, typeless, memo):
+        # plain-value version of resolve()
+        if norm_key not in self.resolvers:
+            return self._read_values(norm_key, typeless, memo)
+
+        for resolver in self.resolvers[norm_key]:
+            if hasattr(resolver, '__call__'):
+                ret = resolver(self, norm_key)
+                if ret is not None:
+                    return _to_values(typ, sanitizer, ret)
+            else:
+                ret = self._read_values(self._normalize_norm_key(resolver),
+                                        typeless, memo)
+                if ret is not None:
+                    return ret
+        return None
+
+    def snapshot(self, keys=None, resolve=False, typeless=False):
+        """Read many tags at once into a TagSnapshot of plain values
+
+        This skips building a MetadataItem for every key, and each tag is
+        read at most once, even if several resolvers fall back on it.
+
+        Args:
+            keys (iterable): keys to read, all keys in the tag map if None
+            resolve (bool): use resolve() instead of get() semantics
+            typeless (bool): skip type normalization, like ``f.raw``
+
+        Returns:
+            TagSnapshot mapping each key (as given) to a tuple of values
+
+        Raises:
+            KeyError: if a key isn't in the tag map
+        """
+        if keys is None:
+            keys = list(self.tag_map.keys())
+        else:
+            keys = list(keys)
+
+        memo = self._read_cache if self.cache_reads else {}
+        values = []
+        self._read_index = self._build_read_index()
+        try:
+            for key in keys:
+                norm_key = self._normalize_norm_key(key)
+                accessor = self._accessors[norm_key]
+                typ = None if typeless else accessor.type
+                sanitizer = None if typeless else accessor.sanitizer
                 if resolve:
-                    mdi = self.resolve(tag, None)
+                    val = self._resolve_values(norm_key, typ, sanitizer,
+                                               typeless, memo)
                 else:
-                    mdi = self.get(tag, None)
-                #print(mdi)
-            except KeyError:
-                #print(None)
-                mdi = None
+                    val = self._read_values(norm_key, typeless, memo)
+                values.append(() if val is None else val)
+        finally:
+            self._read_index = None
 
-            if show_empty or not mdi.ismissing:
-                t_lst.append('{0}: {1}'.format(tag, str(mdi)))
+        return TagSnapshot(self.filename, keys, values)
 
-        return '\n'.join(t_lst)
+    def known_keys(self, keys):
+        """Keys from ``keys`` that are in this file's tag map, in order"""
+        return [k for k in keys if self._normalize_norm_key(k) in self._accessors]
+
+    def info(self, tags=None, show_empty=False, resolve=False):
+        if not tags:
+            tags = self._TAG_MAP.keys()
+        tags = list(tags)
+
+        snap = self.snapshot(self.known_keys(tags), resolve=resolve)
+        return snap.info(tags, show_empty=show_empty)
 
 
     def __getitem__(self, norm_key):
@@ -571,16 +1179,20 @@ class AudioFile(object):
         return self.info(show_empty=True)
 
     def __iter__(self):
-        return (k for k in self._TAG_MAP.keys() if not self[k].ismissing)
+        return iter(self.snapshot(self._TAG_MAP.keys()).present())
 
     def keys(self):
         return self.__iter__()
 
     def items(self):
-        return ((k, self[k]) for k in self)
+        snap = self.snapshot(self._TAG_MAP.keys())
+        for k in snap.present():
+            accessor = self._accessors[self._normalize_norm_key(k)]
+            yield k, MetadataItem(accessor.type, accessor.sanitizer,
+                                  list(snap[k]))
 
     def values(self):
-        return (self[k]  for k in self)
+        return (v for _, v in self.items())
 
     def remove_all(self):
         for k in list(self.keys()):
@@ -597,6 +1209,141 @@ TAG_MAP_ENTRY.__new__.__defaults__ = (getter_not_implemented,  # getter
                                       str,  # type
                                       None,  # sanitizer
                                       )
+
+# A TAG_MAP_ENTRY compiled into callables, so that get / set / remove_tag
+# don't have to work out what kind of getter / setter / remover they have
+# on every call.
+#     getter(afile, norm_key) -> raw value or None
+#     setter(afile, norm_key, md_val)
+#     remover(afile, norm_key)
+TAG_ACCESSOR = namedtuple('TAG_ACCESSOR', ('getter', 'setter', 'remover',
+                                           'type', 'sanitizer'))
+
+def _compile_getter(norm_key, getter):
+    if hasattr(getter, '__call__'):
+        return getter
+
+    if norm_key.startswith('#'):
+        def _info_getter(afile, norm_key):
+            return getattr(afile.mfile.info, getter)
+        return _info_getter
+
+    if isinstance(getter, (list, tuple)):
+        getters = tuple(getter)
+        def _first_getter(afile, norm_key):
+            val = None
+            for g in getters:
+                if val is not None:
+                    break
+                if hasattr(g, '__call__'):
+                    val = g(afile, norm_key)
+                elif g in afile.mfile.tags:
+                    val = afile._ft_getter(g)
+            return val
+        return _first_getter
+
+    def _tag_getter(afile, norm_key):
+        try:
+            return afile._ft_getter(getter)
+        except KeyError:
+            return None
+    return _tag_getter
+
+def _compile_setter(norm_key, setter):
+    if hasattr(setter, '__call__'):
+        return setter
+
+    if norm_key.startswith('#'):
+        def _info_setter(afile, norm_key, md_val):
+            raise KeyError("Can not set file info (tags that begin with #)")
+        return _info_setter
+
+    if isinstance(setter, (list, tuple)):
+        setters = tuple(setter)
+        def _first_setter(afile, norm_key, md_val):
+            # overwrite the first tag that already exists, if any
+            for key in setters:
+                if key in afile.mfile.tags:
+                    break
+            else:
+                key = setters[0]
+            afile.set_raw(norm_key, key, md_val)
+        return _first_setter
+
+    def _tag_setter(afile, norm_key, md_val):
+        afile.set_raw(norm_key, setter, md_val)
+    return _tag_setter
+
+def _compile_remover(norm_key, tmap):
+    remover = tmap.remover
+
+    if not remover:
+        if isinstance(tmap.getter, (list, tuple)):
+            remover = [g for g in tmap.getter if isinstance(g, util.string_types)]
+        if isinstance(tmap.getter, util.string_types):
+            remover = [tmap.getter]
+
+    if not remover:
+        if isinstance(tmap.setter, (list, tuple)):
+            remover = [s for s in tmap.setter if isinstance(s, util.string_types)]
+        if isinstance(tmap.setter, util.string_types):
+            remover = [tmap.setter]
+
+    if hasattr(remover, '__call__'):
+        return remover
+
+    if isinstance(remover, util.string_types):
+        remover = [remover]
+    keys = tuple(remover or ())
+
+    def _tag_remover(afile, norm_key):
+        for key in keys:
+            afile._ft_rmtag(key)
+    return _tag_remover
+
+def compile_tag_map_entry(norm_key, tmap):
+    """Compile a TAG_MAP_ENTRY into a TAG_ACCESSOR"""
+    return TAG_ACCESSOR(getter=_compile_getter(norm_key, tmap.getter),
+                        setter=_compile_setter(norm_key, tmap.setter),
+                        remover=_compile_remover(norm_key, tmap),
+                        type=tmap.type,
+                        sanitizer=tmap.sanitizer)
+
+def compile_tag_map(tag_map):
+    """Compile every entry of a tag map, see compile_tag_map_entry"""
+    return MappingProxyType({norm_key: compile_tag_map_entry(norm_key, tmap)
+                             for norm_key, tmap in tag_map.items()})
+
+def _raw_tag_names(tmap):
+    names = set()
+    for spec in (tmap.getter, tmap.setter, tmap.remover):
+        if isinstance(spec, util.string_types):
+            spec = [spec]
+        if isinstance(spec, (list, tuple)):
+            names.update(s for s in spec if isinstance(s, util.string_types))
+    return names
+
+def _link_keys(tag_map, linked_groups):
+    """Map each norm_key to the keys a change to it can also change"""
+    by_name = {}
+    for norm_key, tmap in tag_map.items():
+        if norm_key.startswith('#'):
+            continue
+        for name in _raw_tag_names(tmap):
+            by_name.setdefault(name, set()).add(norm_key)
+
+    linked = {}
+    for norm_key, tmap in tag_map.items():
+        keys = {norm_key}
+        for name in _raw_tag_names(tmap):
+            keys.update(by_name.get(name, ()))
+        linked[norm_key] = keys
+    for group in linked_groups:
+        for norm_key in group:
+            linked.setdefault(norm_key, {norm_key}).update(group)
+
+    return MappingProxyType({k: tuple(sorted(v)) for k, v in linked.items()})
+
 _DEFAULT_TAG_ALIASES = {
     'tracktitle': 'title',
     'name': 'title',
@@ -688,6 +1435,13 @@ _DEFAULT_SINGULAR_KEYS = ['tracknumber', 'totaltracks',
                           'discnumber', 'totaldiscs',
                           'year', 'compilation',
                           ]
+
+# keys that share a raw tag in (almost) every format
+_DEFAULT_LINKED_KEYS = [('tracknumber', 'totaltracks'),
+                        ('discnumber', 'totaldiscs'),
+                        ]
+
+AudioFile._build_tag_maps()
 ##
 ## EOF
 ##
@@ -0,0 +1,520 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Helpers for reading and saving files
+#
+# - Reading files through a memory map (load_file(..., io='mmap')), so the
+#   many small reads and seeks mutagen does while parsing tags are memory
+#   accesses instead of syscalls.
+# - Reading files that are already in memory (BufferReader) and copying
+#   them for a save, without copying the audio data more than necessary.
+# - Copying files for save(filename=...). The fastest way the platform /
+#   filesystem supports is used, and reported back so it can be checked
+#   (e.g. that copies on btrfs / xfs really are reflinks).
+# - Padding policies, which decide how much free space is left after the
+#   tags so that later edits can be written in place instead of moving
+#   all the audio data that follows the tags.
+# - Planning saves: running mutagen's save up to the point where it has
+#   decided on the layout of the new tags, and stopping before it writes.
+
+from collections import namedtuple
+import errno
+import io
+import mmap
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# from linux/fs.h, _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# errors that mean "this way of copying isn't supported here, try the
+# next one", as opposed to real I/O errors
+_UNSUPPORTED_ERRNOS = frozenset(getattr(errno, name) for name in
+                                ('EXDEV', 'ENOSYS', 'EINVAL', 'EOPNOTSUPP',
+                                 'ENOTSUP', 'ENOTTY', 'EBADF', 'EPERM')
+                                if hasattr(errno, name))
+
+_CHUNK_SIZE = 1 << 30
+
+
+SaveReport = namedtuple('SaveReport', ('filename', 'written', 'copy_strategy',
+                                       'in_place', 'padding'))
+SaveReport.__new__.__defaults__ = (None,  # in_place
+                                   None,  # padding
+                                   )
+SaveReport.__doc__ = """What AudioFile.save() did
+
+Attributes:
+    filename (str): file that was saved
+    written (bool): False if nothing changed so the file wasn't touched
+    copy_strategy (str): how the source was copied for a save-as (one of
+        COPY_STRATEGIES), None when saving in place
+    in_place (bool): True if the tags fit in the space they had, False
+        if the data after them had to be moved, None if the format
+        doesn't say (formats without padding)
+    padding (int): bytes of padding left after the tags, if known
+"""
+
+
+SavePlan = namedtuple('SavePlan', ('filename', 'written', 'tag_size',
+                                   'padding_available', 'padding', 'rewrite',
+                                   'bytes_written'))
+SavePlan.__doc__ = """What AudioFile.save() would do, see AudioFile.plan_save()
+
+Fields that can't be predicted for a format are None.
+
+Attributes:
+    filename (str): file that would be saved
+    written (bool): False if save() would skip the file (nothing changed)
+    tag_size (int): size of the new tags, not counting padding
+    padding_available (int): padding that would be left if the new tags
+        were written in place (negative if they don't fit)
+    padding (int): padding the padding policy picked
+    rewrite (bool): True if the data after the tags (i.e., the audio)
+        would have to be moved
+    bytes_written (int): estimated number of bytes written
+"""
+
+
+class SaveAborted(Exception):
+    """Raised to stop a save before anything is written"""
+    pass
+
+
+class PaddingPolicy(object):
+    """Pick how much padding to leave after the tags
+
+    Existing padding is kept as long as the new tags fit, so the save is
+    in place. When they don't fit the file has to be rewritten anyway, and
+    generous padding is left for the next edit.
+
+    Instances are called with a mutagen ``PaddingInfo``, so they can be
+    passed straight to mutagen's ``save(padding=...)``.
+
+    Args:
+        min_padding (int): bytes of padding to leave after a rewrite
+        fraction (float): on a rewrite, leave at least this fraction of the
+            size of the data after the tags (i.e., the audio) as padding
+        max_padding (int): shrink padding larger than this (which means
+            a rewrite), or None to never shrink it
+    """
+    def __init__(self, min_padding=16384, fraction=0.001, max_padding=None):
+        self.min_padding = min_padding
+        self.fraction = fraction
+        self.max_padding = max_padding
+
+    def __call__(self, info):
+        if info.padding >= 0 and (self.max_padding is None
+                                  or info.padding <= self.max_padding):
+            return info.padding
+
+        ret = max(self.min_padding, int(info.size * self.fraction))
+        if self.max_padding is not None:
+            ret = min(ret, self.max_padding)
+        return ret
+
+    def __repr__(self):
+        return ('PaddingPolicy(min_padding={0}, fraction={1}, max_padding={2})'
+                ''.format(self.min_padding, self.fraction, self.max_padding))
+
+
+def _default_padding(info):
+    return info.get_default_padding()
+
+def _no_padding(info):
+    return 0
+
+
+# names that can be used for AudioFile.padding_policy / save(padding=...)
+PADDING_POLICIES = {
+    'default': _default_padding,  # whatever mutagen does
+    'keep': PaddingPolicy(),  # prefer in place saves
+    'compact': _no_padding,  # smallest file, always rewrites
+}
+
+
+def padding_func(policy):
+    """Turn a padding policy into a callable for mutagen
+
+    Args:
+        policy: None or 'default' for mutagen's default, 'keep' or
+            'compact', an int for a PaddingPolicy with that min_padding,
+            or a callable taking a mutagen ``PaddingInfo``
+
+    Returns:
+        callable(PaddingInfo) -> int
+    """
+    if policy is None:
+        return _default_padding
+    if isinstance(policy, str):
+        try:
+            return PADDING_POLICIES[policy]
+        except KeyError:
+            raise ValueError("padding policy must be one of {0}, not {1}"
+                             "".format(sorted(PADDING_POLICIES), repr(policy)))
+    if isinstance(policy, int) and not isinstance(policy, bool):
+        return PaddingPolicy(min_padding=policy)
+    if hasattr(policy, '__call__'):
+        return policy
+    raise TypeError("bad padding policy: {0}".format(repr(policy)))
+
+
+class PaddingRecorder(object):
+    """Wraps a padding callable to record what mutagen decided
+
+    Attributes:
+        info: the mutagen ``PaddingInfo`` of the last call, or None if
+            mutagen never asked (i.e., the format has no padding)
+        padding (int): padding returned for the last call
+    """
+    def __init__(self, func, abort=False):
+        self.func = func
+        self.abort = abort
+        self.info = None
+        self.padding = None
+
+    def __call__(self, info):
+        self.info = info
+        self.padding = max(0, int(self.func(info)))
+        if self.abort:
+            raise SaveAborted("save stopped after choosing padding")
+        return self.padding
+
+    @property
+    def in_place(self):
+        """True if the tags were rewritten without moving the audio data"""
+        if self.info is None:
+            return None
+        return self.padding == self.info.padding
+
+
+def plan_from_padding(filename, recorder, tag_space, size_has_tags=False):
+    """Make a SavePlan from what a PaddingRecorder saw
+
+    Args:
+        filename (str): file being saved
+        recorder (PaddingRecorder): recorder passed to an aborted save
+        tag_space (int): bytes the current tags and padding take up in
+            the file, None if unknown
+        size_has_tags (bool): True if ``PaddingInfo.size`` counts from
+            the start of the current tags rather than from their end
+            (ID3 does), so it includes ``tag_space``
+    """
+    info = recorder.info
+    if info is None:
+        return SavePlan(filename, True, None, None, None, None, None)
+
+    rewrite = not recorder.in_place
+    tag_size = None
+    # data after the tags, which is moved when they are rewritten
+    trailing = info.size
+    if size_has_tags and tag_space is not None:
+        trailing -= tag_space
+    bytes_written = recorder.padding + (trailing if rewrite else 0)
+    if tag_space is not None:
+        tag_size = tag_space - info.padding
+        bytes_written += tag_size
+    return SavePlan(filename, True, tag_size, info.padding, recorder.padding,
+                    rewrite, bytes_written)
+
+
+class ReadOnlyFile(io.RawIOBase):
+    """A file that mutagen can "save" to, but that never changes
+
+    Any attempt to write data raises SaveAborted. The underlying file
+    descriptor isn't exposed, so mutagen can't write through mmap either.
+
+    Args:
+        filename (str): file to open
+        fileobj: readable file object to use instead of opening
+            ``filename``; it's left open on close()
+    """
+    def __init__(self, filename, fileobj=None):
+        super(ReadOnlyFile, self).__init__()
+        self.name = filename
+        self._owned = fileobj is None
+        if fileobj is None:
+            fileobj = open(filename, 'rb')
+        else:
+            fileobj.seek(0)
+        self._f = fileobj
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        return self._f.readinto(b)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._f.seek(offset, whence)
+
+    def tell(self):
+        return self._f.tell()
+
+    def write(self, b):
+        if len(b):
+            raise SaveAborted("attempted to write to {0}".format(self.name))
+        return 0
+
+    def truncate(self, size=None):
+        raise SaveAborted("attempted to truncate {0}".format(self.name))
+
+    def fileno(self):
+        raise io.UnsupportedOperation("fileno")
+
+    def close(self):
+        if not self.closed and self._owned:
+            self._f.close()
+        super(ReadOnlyFile, self).close()
+
+
+class MmapReader(mmap.mmap):
+    """A read-only memory map that behaves like a file opened in 'rb' mode
+
+    mmap objects already have read() / tell(), but seeking outside of the
+    map raises ValueError where a file raises OSError (or allows seeking
+    past the end); mutagen expects the latter when probing for tags at the
+    end of short files.
+    """
+    name = None
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            pos += self.tell()
+        elif whence == io.SEEK_END:
+            pos += len(self)
+        if pos < 0:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        # reads past the end return b"" either way
+        pos = min(pos, len(self))
+        mmap.mmap.seek(self, pos)
+        return pos
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return False
+
+    def seekable(self):
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BufferReader(io.RawIOBase):
+    """A read-only file object over a bytes-like object
+
+    Unlike io.BytesIO, the data isn't copied; reads copy just the bytes
+    asked for.
+
+    Args:
+        data: bytes, bytearray, memoryview or anything else with the
+            buffer protocol, which must not change while it's being read
+    """
+    name = None
+
+    def __init__(self, data):
+        super(BufferReader, self).__init__()
+        self.view = memoryview(data).cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        end = min(self._pos + len(b), len(self.view))
+        n = max(0, end - self._pos)
+        b[:n] = self.view[self._pos:end]
+        self._pos += n
+        return n
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += len(self.view)
+        if pos < 0:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self.view.release()
+        super(BufferReader, self).close()
+
+
+def fileobj_name(fileobj):
+    """The path of the file behind a file object, or None"""
+    name = getattr(fileobj, 'name', None)
+    return name if isinstance(name, str) else None
+
+
+def copy_fileobj(fsrc, fdst):
+    """Replace the contents of fdst with all of fsrc
+
+    In-memory sources (BufferReader, io.BytesIO) are written straight from
+    their buffer, without an intermediate copy.
+
+    Returns:
+        str: 'copy', the strategy used (see COPY_STRATEGIES)
+    """
+    fdst.seek(0)
+    if isinstance(fsrc, BufferReader):
+        fdst.write(fsrc.view)
+    elif hasattr(fsrc, 'getbuffer'):
+        with fsrc.getbuffer() as view:
+            fdst.write(view)
+    else:
+        fsrc.seek(0)
+        shutil.copyfileobj(fsrc, fdst)
+    fdst.truncate()
+    return 'copy'
+
+
+# how load_file() can read files
+IO_MODES = ('file', 'mmap')
+
+
+def open_for_reading(filename, io_mode=None):
+    """Open a file to be parsed by mutagen
+
+    Args:
+        filename (str): file to open
+        io_mode (str): one of IO_MODES, None for 'file'; empty files and
+            files that can't be mapped are opened as regular files
+
+    Returns:
+        a file object open for reading in binary mode
+    """
+    if io_mode not in (None, ) + IO_MODES:
+        raise ValueError("io must be one of {0}, not {1}"
+                         "".format(list(IO_MODES), repr(io_mode)))
+
+    f = open(filename, 'rb')
+    if io_mode != 'mmap':
+        return f
+
+    try:
+        ret = MmapReader(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        # empty files can't be mapped, neither can some special files
+        return f
+    # the map doesn't need the file to stay open
+    f.close()
+    ret.name = filename
+    return ret
+
+
+def _reflink(fsrc, fdst, size):
+    if fcntl is None:
+        return False
+    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    return True
+
+def _copy_file_range(fsrc, fdst, size):
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+    offset = 0
+    while offset < size:
+        n = os.copy_file_range(src_fd, dst_fd, min(_CHUNK_SIZE, size - offset),
+                               offset, offset)
+        if n == 0:
+            break
+        offset += n
+    return offset == size
+
+def _sendfile(fsrc, fdst, size):
+    if not hasattr(os, 'sendfile'):
+        return False
+    src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+    offset = 0
+    while offset < size:
+        n = os.sendfile(dst_fd, src_fd, offset, min(_CHUNK_SIZE, size - offset))
+        if n == 0:
+            break
+        offset += n
+    return offset == size
+
+def _plain_copy(fsrc, fdst, size):
+    shutil.copyfileobj(fsrc, fdst)
+    return True
+
+
+_STRATEGY_FUNCS = {
+    'reflink': _reflink,
+    'copy_file_range': _copy_file_range,
+    'sendfile': _sendfile,
+    'copy': _plain_copy,
+}
+
+# in the order they're tried
+COPY_STRATEGIES = ('reflink', 'copy_file_range', 'sendfile', 'copy')
+
+
+def copy_file(src, dst, strategies=COPY_STRATEGIES):
+    """Copy the contents of src to dst, like shutil.copyfile
+
+    Each strategy is tried in turn until one is supported for this pair
+    of files; the plain copy always is.
+
+    Args:
+        src (str): source filename
+        dst (str): destination filename, overwritten if it exists
+        strategies (sequence): names from COPY_STRATEGIES to try, in order
+
+    Returns:
+        str: name of the strategy that did the copy
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError("{0} and {1} are the same file"
+                                   "".format(src, dst))
+
+    for name in strategies:
+        if name not in _STRATEGY_FUNCS:
+            raise ValueError("unknown copy strategy: {0}".format(repr(name)))
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        for name in strategies:
+            try:
+                if _STRATEGY_FUNCS[name](fsrc, fdst, size):
+                    return name
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+            # start over with the next strategy
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+
+    raise OSError("none of the copy strategies {0} could copy {1}"
+                  "".format(list(strategies), src))
+
+##
+## EOF
+##
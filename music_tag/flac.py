@@ -39,6 +39,29 @@ def rm_pictures(afile, norm_key):
 class FlacFile(AudioFile):
     tag_format = "FLAC"
     mutagen_kls = mutagen.flac.FLAC
+    padding_mechanism = 'PADDING block'
+
+    def _tag_space(self):
+        # all metadata blocks between the "fLaC" marker and the audio
+        with self._open_source() as fin:
+            offset = 0
+            header = fin.read(10)
+            if header[:3] == b'ID3':
+                offset = 10 + sum((b & 0x7f) << (7 * (3 - i))
+                                  for i, b in enumerate(header[6:10]))
+                if header[5] & 0x10:
+                    offset += 10  # footer
+            offset += 4
+            start = offset
+            is_last = False
+            while not is_last:
+                fin.seek(offset)
+                block_header = fin.read(4)
+                if len(block_header) < 4:
+                    return None
+                is_last = bool(block_header[0] & 0x80)
+                offset += 4 + int.from_bytes(block_header[1:], 'big')
+        return offset - start
 
     _TAG_MAP = {
         'title': TAG_MAP_ENTRY(getter='title', setter='title', type=str),
@@ -114,6 +137,14 @@ class FlacFile(AudioFile):
                                 type=str),
     }
 
+    def _build_read_index(self):
+        return util.vcomment_index(self.mfile.tags)
+
+    def _ft_getter(self, key):
+        if self._read_index is not None:
+            return self._read_index.get(key.lower(), None)
+        return super(FlacFile, self)._ft_getter(key)
+
     def _ft_setter(self, key, md_val, appendable=True):
         if self.appendable and appendable:
             self.mfile.tags[key] = [str(v) for v in md_val.values]
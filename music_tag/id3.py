@@ -296,33 +296,28 @@ _TAG_MAP_ID3_2_4 = {
 class Id3File(AudioFile):
     tag_format = "Id3"
     mutagen_kls = mutagen.id3.ID3FileType
+    padding_mechanism = 'ID3v2 padding'
 
-    def __init__(self, filename, **kwargs):
-        mfile = kwargs.get('_mfile', None)
-        if mfile is None:
-            mfile = mutagen.File(filename)
-            kwargs['_mfile'] = mfile
+    def _tag_space(self):
+        # the ID3v2 tag as it was loaded, header included
+        return getattr(self.mfile.tags, 'size', None)
 
+    # mutagen's PaddingInfo.size is everything from the start of the tag
+    _padding_size_has_tags = True
+
+    # by default, mutagen presents all files using id3v2.4
+    _TAG_MAP = _TAG_MAP_ID3_2_4
+
+    def _check_mfile(self, mfile):
         if mfile.tags:
             id3_ver = mfile.tags.version[:2]
         else:
             id3_ver = (2, 4)
 
-        # by default, mutagen presents all files using id3v2.4
-        if id3_ver[0] == 1:
-            self._TAG_MAP = _TAG_MAP_ID3_2_4
-        elif id3_ver == (2, 2):
-            self._TAG_MAP = _TAG_MAP_ID3_2_4
-        elif id3_ver == (2, 3):
-            self._TAG_MAP = _TAG_MAP_ID3_2_4
-        elif id3_ver == (2, 4):
-            self._TAG_MAP = _TAG_MAP_ID3_2_4
-        else:
+        if not (id3_ver[0] == 1 or id3_ver in ((2, 2), (2, 3), (2, 4))):
             raise NotImplementedError("Unexpected id3 tag version: {0}"
                                       "".format(mfile.tags.version))
 
-        super(Id3File, self).__init__(filename, **kwargs)
-
     def _ft_getter(self, key):
         vals = self.mfile.tags.getall(key)
         ret = []
@@ -356,16 +351,12 @@ class Mp3File(Id3File):
     tag_format = "Mp3"
     mutagen_kls = mutagen.mp3.MP3
 
-    def __init__(self, filename, **kwargs):
-        super(Mp3File, self).__init__(filename, **kwargs)
-
-        self.tag_map = self.tag_map.copy()
-        self.tag_map.update({
-            '#codec': TAG_MAP_ENTRY(getter=lambda afile, norm_key: 'mp3',
-                                    type=str),
-            '#bitspersample': TAG_MAP_ENTRY(getter=lambda afile, norm_key: None,
-                                    type=int),
-        })
+    _HIDDEN_TAG_MAP = {
+        '#codec': TAG_MAP_ENTRY(getter=lambda afile, norm_key: 'mp3',
+                                type=str),
+        '#bitspersample': TAG_MAP_ENTRY(getter=lambda afile, norm_key: None,
+                                type=int),
+    }
 
 
 class EasyMp3File(AudioFile):
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Persistent index of tag snapshots, for re-scanning big libraries
+#
+#     with music_tag.index.TagIndex('library.sqlite') as idx:
+#         for path, snap in idx.snapshots(paths, ['title', 'artist']):
+#             ...
+#
+# Each file's snapshot is stored in an SQLite database along with the
+# file's inode, size and mtime. The next scan only parses files whose
+# stat changed (or that were read with different keys / resolve), and
+# serves the rest straight from the database.
+#
+# The database is in WAL mode and new rows are written with executemany
+# in batches, so a scan over a mostly unchanged library is a stat and an
+# indexed SELECT per file.
+
+from collections import deque
+import json
+import os
+import sqlite3
+
+from music_tag import parallel
+from music_tag.batch import encode_values, decode_values
+from music_tag.file import Artwork, TagSnapshot
+
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    path TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    resolve INTEGER NOT NULL,
+    keys TEXT,
+    tags TEXT NOT NULL
+)
+"""
+
+# paths per SELECT; well under SQLite's limit on bound parameters
+_LOOKUP_CHUNK = 500
+
+
+def _stat_key(st):
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _snapshot_job(job):
+    # runs on a worker; keys that the file's format doesn't know are left
+    # out of the snapshot, like AudioFile.info() does. Without keys, every
+    # key but artwork is read, so whole images don't end up in the index
+    import music_tag
+
+    fname, keys, resolve = job
+    f = music_tag.load_file(fname, info=False)
+    if keys is None:
+        keys = [k for k in f.tag_map
+                if f._accessors[f._normalize_norm_key(k)].type is not Artwork]
+    else:
+        keys = f.known_keys(keys)
+    return f.snapshot(keys, resolve=resolve)
+
+
+def read_snapshots(paths, keys=None, resolve=False, workers=1,
+                   executor='process'):
+    """Snapshots of many files, without an index
+
+    Args and yields are the same as for TagIndex.snapshots(), except
+    that every file is read.
+    """
+    jobs = ((path, keys, resolve) for path in paths)
+    if workers == 1:
+        for job in jobs:
+            try:
+                yield job[0], _snapshot_job(job)
+            except Exception as e:  # pylint: disable=broad-except
+                yield job[0], e
+    else:
+        for job, snap in parallel.imap(_snapshot_job, jobs, workers=workers,
+                                       executor=executor):
+            yield job[0], snap
+
+
+class TagIndex(object):
+    """Tag snapshots stored in an SQLite database, keyed by file path
+
+    Args:
+        path (str): database file, created if it doesn't exist
+        batch_size (int): number of new snapshots written per transaction
+    """
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            self._db.close()
+            raise ValueError("{0}: unsupported index version {1}"
+                             "".format(path, version))
+        with self._db:
+            self._db.execute(_SCHEMA)
+            self._db.execute('PRAGMA user_version={0}'.format(SCHEMA_VERSION))
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+
+    @staticmethod
+    def _to_snapshot(path, keys, tags):
+        tags = json.loads(tags)
+        if keys is None:
+            keys = list(tags)
+        else:
+            keys = [k for k in keys if k in tags]
+        return TagSnapshot(path, keys,
+                           [tuple(decode_values(tags[k])) for k in keys])
+
+    def _lookup(self, entries, keys, resolve):
+        # entries are (path, stat) tuples; returns path -> TagSnapshot for
+        # the ones whose stored snapshot is still good
+        hits = {}
+        stats = dict(entries)
+        paths = list(stats)
+        for i in range(0, len(paths), _LOOKUP_CHUNK):
+            chunk = paths[i:i + _LOOKUP_CHUNK]
+            rows = self._db.execute(
+                'SELECT path, inode, size, mtime_ns, resolve, keys, tags '
+                'FROM snapshots WHERE path IN ({0})'
+                ''.format(', '.join('?' * len(chunk))), chunk)
+            for path, inode, size, mtime_ns, rslv, skeys, tags in rows:
+                if (inode, size, mtime_ns) != _stat_key(stats[path]):
+                    continue
+                if bool(rslv) != bool(resolve):
+                    continue
+                skeys = None if skeys is None else json.loads(skeys)
+                if keys is None or skeys is None:
+                    if keys != skeys:
+                        continue
+                elif not set(keys) <= set(skeys):
+                    continue
+                hits[path] = self._to_snapshot(path, keys, tags)
+        return hits
+
+    def _store(self, rows):
+        if rows:
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO snapshots '
+                    '(path, inode, size, mtime_ns, resolve, keys, tags) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            del rows[:]
+
+    @staticmethod
+    def _row(path, st, keys, resolve, snap):
+        tags = {k: encode_values(v) for k, v in snap.items()}
+        return (path, ) + _stat_key(st) + (
+            int(bool(resolve)), None if keys is None else json.dumps(keys),
+            json.dumps(tags, sort_keys=True))
+
+    def snapshots(self, paths, keys=None, resolve=False, workers=1,
+                  executor='process'):
+        """Snapshots of many files, parsing only the ones that changed
+
+        A file is parsed again if its inode, size or mtime changed, or if
+        its stored snapshot was read with different ``resolve`` or doesn't
+        have all of ``keys``. Keys the file's format doesn't know are left
+        out of its snapshot.
+
+        Args:
+            paths (iterable): file paths, consumed lazily
+            keys (list): keys to read; if None, the whole tag map except
+                for artwork, which has to be asked for by name
+            resolve (bool): as for ``AudioFile.snapshot``
+            workers (int): number of workers parsing changed files
+            executor: as for ``music_tag.parallel.imap``
+
+        Yields:
+            (path, TagSnapshot) tuples in the order of ``paths``; if a file
+            can't be read, the exception is yielded in place of the snapshot
+        """
+        if keys is not None:
+            keys = list(keys)
+        paths = iter(paths)
+        pending = deque()  # [path, stat, snapshot / exception / None]
+        misses = deque()
+        new_rows = []
+
+        def _fill():
+            # stat and look up the next chunk of paths; False once they
+            # are used up
+            chunk = []
+            for path in paths:
+                try:
+                    chunk.append((path, os.stat(path)))
+                except OSError as e:
+                    chunk.append((path, e))
+                if len(chunk) == _LOOKUP_CHUNK:
+                    break
+            hits = self._lookup([(path, st) for path, st in chunk
+                                 if not isinstance(st, Exception)],
+                                keys, resolve)
+            for path, st in chunk:
+                if isinstance(st, Exception):
+                    pending.append([path, None, st])
+                elif path in hits:
+                    pending.append([path, st, hits[path]])
+                else:
+                    pending.append([path, st, None])
+                    misses.append(path)
+            return bool(chunk)
+
+        def _misses():
+            while misses or _fill():
+                while misses:
+                    yield misses.popleft()
+
+        results = read_snapshots(_misses(), keys, resolve, workers=workers,
+                                 executor=executor)
+
+        try:
+            while pending or _fill():
+                path, st, snap = pending.popleft()
+                if snap is None:
+                    _, snap = next(results)
+                    if not isinstance(snap, Exception):
+                        new_rows.append(self._row(path, st, keys, resolve,
+                                                  snap))
+                        if len(new_rows) >= self.batch_size:
+                            self._store(new_rows)
+                yield path, snap
+        finally:
+            results.close()
+            self._store(new_rows)
+
+    def snapshot(self, path, keys=None, resolve=False):
+        """Snapshot of one file, see snapshots()
+
+        Raises:
+            Exception: whatever loading the file raised
+        """
+        for _, snap in self.snapshots([path], keys=keys, resolve=resolve):
+            if isinstance(snap, Exception):
+                raise snap
+            return snap
+
+    def items(self):
+        """Yield (path, TagSnapshot) for every file in the index
+
+        Snapshots are returned as stored, without checking the files.
+        """
+        rows = self._db.execute('SELECT path, keys, tags FROM snapshots '
+                                'ORDER BY path')
+        for path, keys, tags in rows:
+            keys = None if keys is None else json.loads(keys)
+            yield path, self._to_snapshot(path, keys, tags)
+
+    def prune(self):
+        """Remove files that no longer exist from the index
+
+        Returns:
+            int: number of files removed
+        """
+        gone = [(path, ) for path, in
+                self._db.execute('SELECT path FROM snapshots')
+                if not os.path.isfile(path)]
+        with self._db:
+            self._db.executemany('DELETE FROM snapshots WHERE path = ?', gone)
+        return len(gone)
+
+##
+## EOF
+##
@@ -152,6 +152,26 @@ def rm_totaldiscs(afile, norm_key):
 class Mp4File(AudioFile):
     tag_format = "mp4"
     mutagen_kls = mutagen.mp4.MP4
+    padding_mechanism = 'free atom'
+
+    def _tag_space(self):
+        # the ilst atom, plus a free atom right next to it (which is where
+        # mutagen keeps padding)
+        with self._open_source() as fin:
+            atoms = mutagen.mp4.Atoms(fin)
+        try:
+            path = atoms.path(b'moov', b'udta', b'meta', b'ilst')
+        except KeyError:
+            return 0
+        meta, ilst = path[-2:]
+        space = ilst.length
+        index = meta.children.index(ilst)
+        for neighbor in (index - 1, index + 1):
+            if (0 <= neighbor < len(meta.children)
+                    and meta.children[neighbor].name == b'free'):
+                space += meta.children[neighbor].length
+                break
+        return space
 
     _TAG_MAP = {
         'title': TAG_MAP_ENTRY(getter='©nam', setter='©nam', type=str),
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Bounded worker pools for processing many audio files at once
+
+from collections import deque
+import concurrent.futures
+import os
+
+
+_EXECUTOR_KINDS = {
+    'process': concurrent.futures.ProcessPoolExecutor,
+    'thread': concurrent.futures.ThreadPoolExecutor,
+}
+
+
+def _init_worker(initializer=None, initargs=()):
+    # pay the import cost of music_tag and all the mutagen format modules
+    # once per worker instead of on the first file each worker sees
+    import mutagen  # pylint: disable=unused-import
+    import music_tag  # pylint: disable=unused-import
+
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def make_executor(executor='process', workers=None, initializer=None,
+                  initargs=()):
+    """Create an executor whose workers have music_tag preloaded
+
+    Args:
+        executor (str): 'process' or 'thread'
+        workers (int): number of workers, defaults to the number of cpus
+        initializer (callable): extra per-worker setup, called with
+            ``initargs`` after music_tag is imported
+    """
+    try:
+        kls = _EXECUTOR_KINDS[executor]
+    except KeyError:
+        raise ValueError("executor must be one of {0}, not {1}"
+                         "".format(sorted(_EXECUTOR_KINDS), repr(executor)))
+    if workers is None:
+        workers = default_workers()
+    return kls(max_workers=workers, initializer=_init_worker,
+               initargs=(initializer, initargs))
+
+
+def imap(func, items, workers=None, executor='process', ordered=True,
+         max_in_flight=None, initializer=None, initargs=()):
+    """Map func over items using a pool with a bounded number of pending jobs
+
+    Items are consumed lazily, so ``items`` can be an arbitrarily long
+    iterator; at most ``max_in_flight`` results are ever held in memory.
+
+    Args:
+        func (callable): called as ``func(item)``; must be picklable if
+            ``executor`` is 'process'
+        items (iterable): arguments for func
+        workers (int): number of workers, defaults to the number of cpus
+        executor: 'process', 'thread', or an existing
+            ``concurrent.futures.Executor``; an existing executor is not
+            shut down when the generator finishes
+        ordered (bool): if True, yield results in the same order as
+            ``items``, otherwise yield them as they complete
+        max_in_flight (int): maximum number of submitted but not yet
+            yielded jobs, defaults to ``2 * workers``
+        initializer (callable): per-worker setup for pools created here
+
+    Yields:
+        (item, result) tuples, where result is the exception instance
+        if func raised
+    """
+    if workers is None:
+        workers = getattr(executor, '_max_workers', None) or default_workers()
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    max_in_flight = max(1, max_in_flight)
+
+    if isinstance(executor, concurrent.futures.Executor):
+        pool = executor
+        owns_pool = False
+    else:
+        pool = make_executor(executor, workers=workers,
+                             initializer=initializer, initargs=initargs)
+        owns_pool = True
+
+    items = iter(items)
+    pending = deque()
+
+    def _submit_next():
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            return True
+        return False
+
+    def _result(item, future):
+        exc = future.exception()
+        return item, future.result() if exc is None else exc
+
+    try:
+        while len(pending) < max_in_flight and _submit_next():
+            pass
+
+        if ordered:
+            while pending:
+                item, future = pending.popleft()
+                concurrent.futures.wait([future])
+                _submit_next()
+                yield _result(item, future)
+        else:
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    [fut for _, fut in pending],
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for item, future in [p for p in pending if p[1] in done]:
+                    pending.remove((item, future))
+                    _submit_next()
+                    yield _result(item, future)
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if owns_pool:
+            pool.shutdown(wait=True)
+
+##
+## EOF
+##
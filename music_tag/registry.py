@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Maps mutagen file types, file extensions and magic bytes to AudioFile
+# subclasses. AudioFile subclasses register themselves when they are
+# defined, so picking the class for a file is a dictionary lookup.
+
+import importlib
+import os
+
+import mutagen
+
+from music_tag import fileops
+
+
+# the same candidates mutagen.File scores when guessing a file's type
+_MUTAGEN_KIND_NAMES = (
+    'mp3.MP3', 'trueaudio.TrueAudio', 'oggtheora.OggTheora',
+    'oggspeex.OggSpeex', 'oggvorbis.OggVorbis', 'oggflac.OggFLAC',
+    'flac.FLAC', 'aiff.AIFF', 'apev2.APEv2File', 'mp4.MP4',
+    'id3.ID3FileType', 'wavpack.WavPack', 'musepack.Musepack',
+    'monkeysaudio.MonkeysAudio', 'optimfrog.OptimFROG', 'asf.ASF',
+    'oggopus.OggOpus', 'aac.AAC', 'ac3.AC3', 'smf.SMF', 'tak.TAK',
+    'dsf.DSF', 'dsdiff.DSDIFF', 'wave.WAVE',
+)
+
+_ASF_GUID = b"\x30\x26\xB2\x75\x8E\x66\xCF\x11\xA6\xD9\x00\xAA\x00\x62\xCE\x6C"
+
+# (extensions, header test, mutagen kind) for files whose extension and
+# magic bytes agree. In these cases no other kind can outscore the given
+# one in mutagen.File, so it's safe to skip scoring every known kind
+# (which includes a seek to the end of the file to look for APEv2 tags).
+_SNIFF_RULES = (
+    (('.mp3', ), lambda h: h.startswith((b'ID3', b'\xFF\xF2', b'\xFF\xF3',
+                                         b'\xFF\xFA', b'\xFF\xFB')),
+     'mp3.MP3'),
+    (('.flac', ), lambda h: h.startswith(b'fLaC'), 'flac.FLAC'),
+    (('.m4a', '.m4b', '.m4p', '.m4v', '.mp4'), lambda h: h[4:8] == b'ftyp',
+     'mp4.MP4'),
+    (('.ogg', '.oga'), lambda h: h.startswith(b'OggS') and b'\x01vorbis' in h,
+     'oggvorbis.OggVorbis'),
+    (('.opus', '.ogg'), lambda h: h.startswith(b'OggS') and b'OpusHead' in h,
+     'oggopus.OggOpus'),
+    (('.wv', ), lambda h: h.startswith(b'wvpk'), 'wavpack.WavPack'),
+    (('.aif', '.aiff', '.aifc'), lambda h: h.startswith(b'FORM'), 'aiff.AIFF'),
+    (('.dsf', ), lambda h: h.startswith(b'DSD '), 'dsf.DSF'),
+    (('.wav', '.wave'), lambda h: h.startswith(b'RIFF') and h[8:12] == b'WAVE',
+     'wave.WAVE'),
+    (('.wma', '.wmv', '.asf'), lambda h: h.startswith(_ASF_GUID), 'asf.ASF'),
+)
+
+
+def _import_mutagen_kind(name):
+    mod_name, kls_name = name.rsplit('.', 1)
+    try:
+        mod = importlib.import_module('mutagen.' + mod_name)
+    except ImportError:
+        # older versions of mutagen don't know every format
+        return None
+    return getattr(mod, kls_name)
+
+
+MUTAGEN_KINDS = tuple(k for k in (_import_mutagen_kind(name)
+                                  for name in _MUTAGEN_KIND_NAMES)
+                      if k is not None)
+
+
+def _build_sniff_table(rules):
+    table = {}
+    for exts, test, name in rules:
+        kind = _import_mutagen_kind(name)
+        if kind is None:
+            continue
+        for ext in exts:
+            table.setdefault(ext, []).append((test, kind))
+    return table
+
+
+_SNIFF_BY_EXT = _build_sniff_table(_SNIFF_RULES)
+
+# mutagen FileType -> AudioFile subclass
+_AUDIOFILE_KLS = {}
+# cache of lookups through the mutagen class hierarchy, cleared whenever
+# a new AudioFile subclass is registered
+_AUDIOFILE_KLS_CACHE = {}
+
+
+def register(audiofile_kls):
+    """Register an AudioFile subclass for its ``mutagen_kls``
+
+    Subclasses register themselves when they are defined, so the most
+    recently defined (most derived) class wins for a given mutagen type.
+    """
+    if audiofile_kls.mutagen_kls is not None:
+        _AUDIOFILE_KLS[audiofile_kls.mutagen_kls] = audiofile_kls
+        _AUDIOFILE_KLS_CACHE.clear()
+
+
+def audiofile_kls(mutagen_kls):
+    """Get the AudioFile subclass for a mutagen FileType, or None"""
+    try:
+        return _AUDIOFILE_KLS_CACHE[mutagen_kls]
+    except KeyError:
+        pass
+
+    ret = None
+    for kls in getattr(mutagen_kls, '__mro__', ()):
+        if kls in _AUDIOFILE_KLS:
+            ret = _AUDIOFILE_KLS[kls]
+            break
+    _AUDIOFILE_KLS_CACHE[mutagen_kls] = ret
+    return ret
+
+
+def sniff(filename, header):
+    """Guess the mutagen kind from the extension and magic bytes alone
+
+    Returns:
+        a mutagen FileType subclass, or None if the guess would not
+        be conclusive
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    for test, kind in _SNIFF_BY_EXT.get(ext, ()):
+        if test(header):
+            return kind
+    return None
+
+
+def score(filename, fileobj, header):
+    """Pick the kind mutagen.File would pick by scoring every kind"""
+    results = [(Kind.score(filename, fileobj, header), Kind.__name__, Kind)
+               for Kind in MUTAGEN_KINDS]
+    best, _, Kind = max(results, key=lambda r: r[:2])
+    return Kind if best > 0 else None
+
+
+def guess_mutagen_kls(filename, fileobj):
+    """Pick the mutagen class mutagen.File would use, without parsing
+
+    Args:
+        filename (str): path of the file, used for its extension; may be
+            None for file objects that don't have one
+        fileobj: file object open in 'rb' mode, positioned anywhere
+    """
+    filename = filename or ''
+    try:
+        fileobj.seek(0, 0)
+        header = fileobj.read(128)
+    except IOError:
+        header = b""
+
+    kind = sniff(filename, header)
+    if kind is None:
+        kind = score(filename, fileobj, header)
+    return kind
+
+
+# kinds whose stream info isn't needed to read the tags (unlike e.g. Ogg,
+# where the tags are found through the stream's serial number)
+_DEFERRABLE_INFO = tuple(k for k in (_import_mutagen_kind(name) for name in
+                                     ('id3.ID3FileType', 'apev2.APEv2File'))
+                         if k is not None)
+
+
+class DeferredInfo(object):
+    """Stands in for a mutagen StreamInfo until one of its attributes is used
+
+    For kinds whose stream info is parsed separately from the tags
+    (ID3 based files like MP3, and APEv2 based ones like WavPack),
+    parsing it can be put off; for MP3s that means not reading audio
+    frames, which without a Xing header can mean scanning the file.
+
+    Args:
+        info_kls: the mutagen StreamInfo class
+        args (tuple): arguments mutagen passed after the file object
+        source: path or file object to read the info from
+    """
+    def __init__(self, info_kls, args, source):
+        self.info_kls = info_kls
+        self.args = args
+        self.source = source
+        self._info = None
+
+    def resolve(self):
+        """Parse the stream info now, if it hasn't been yet
+
+        Returns:
+            the mutagen StreamInfo
+        """
+        if self._info is None:
+            if isinstance(self.source, str):
+                with open(self.source, 'rb') as fileobj:
+                    self._info = self.info_kls(fileobj, *self.args)
+            else:
+                self.source.seek(0, 0)
+                self._info = self.info_kls(self.source, *self.args)
+        return self._info
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return '<DeferredInfo: {0}>'.format(repr(self._info) if self._info
+                                            else self.info_kls.__name__)
+
+
+def resolve_info(mfile):
+    """Replace a DeferredInfo on a mutagen file with the parsed info"""
+    if isinstance(mfile.info, DeferredInfo):
+        mfile.info = mfile.info.resolve()
+
+
+def _parse(filename, fileobj, mutagen_kls, info_source=None):
+    # info_source: where a DeferredInfo reads the stream info from, None
+    # to parse it right away
+    if mutagen_kls is None:
+        mutagen_kls = guess_mutagen_kls(filename, fileobj)
+    if mutagen_kls is None:
+        return None
+    fileobj.seek(0, 0)
+
+    if info_source is None or not issubclass(mutagen_kls, _DEFERRABLE_INFO):
+        return mutagen_kls(fileobj, filename=filename)
+
+    # these kinds build their stream info with self._Info(fileobj, ...),
+    # so shadow it for the duration of the load
+    info_kls = mutagen_kls._Info
+    def _defer(fileobj, *args):
+        return DeferredInfo(info_kls, args, info_source)
+
+    mfile = mutagen_kls.__new__(mutagen_kls)
+    mfile._Info = _defer
+    try:
+        mfile.__init__(fileobj, filename=filename)
+    finally:
+        del mfile._Info
+    return mfile
+
+
+def open_mutagen_file(filename, mutagen_kls=None, io_mode=None, fileobj=None,
+                      info=True):
+    """Load ``filename`` with mutagen, opening it just once
+
+    Args:
+        filename (str): path to the file
+        mutagen_kls: mutagen FileType to parse the file as, sniffed
+            from the file if not given
+        io_mode (str): how to read the file, see ``fileops.IO_MODES``
+        fileobj: file object to parse instead of opening ``filename``,
+            which is then only used to guess the format; it's left open
+        info (bool): if False, put off parsing the stream info until it's
+            used, where the format allows (see DeferredInfo)
+
+    Returns:
+        mutagen.FileType instance, or None if the type is unknown
+    """
+    if fileobj is not None:
+        return _parse(filename, fileobj, mutagen_kls,
+                      info_source=None if info else fileobj)
+
+    try:
+        fileobj = fileops.open_for_reading(filename, io_mode)
+    except IOError as e:
+        raise mutagen.MutagenError(e)
+
+    with fileobj:
+        return _parse(filename, fileobj, mutagen_kls,
+                      info_source=None if info else filename)
+
+
+def detect_mutagen_kls(filename, fileobj=None):
+    """Pick the mutagen class for a file without parsing it"""
+    if fileobj is not None:
+        return guess_mutagen_kls(filename, fileobj)
+
+    try:
+        fileobj = open(filename, 'rb')
+    except IOError as e:
+        raise mutagen.MutagenError(e)
+
+    with fileobj:
+        return guess_mutagen_kls(filename, fileobj)
+
+##
+## EOF
+##
@@ -193,6 +193,33 @@ PICTURE_TYPE_LUT = {0: 'other', 1: 'icon', 2: 'other icon', 3: 'front cover',
                     16: 'screen capture', 17: 'coloured fish', 18: 'illustration',
                     19: 'artist logo', 20: 'publisher logo'}
 
+_IMAGE_MAGIC = ((b'\xff\xd8\xff', '.jpg'), (b'\x89PNG\r\n\x1a\n', '.png'),
+                (b'GIF87a', '.gif'), (b'GIF89a', '.gif'), (b'BM', '.bmp'),
+                (b'II*\0', '.tif'), (b'MM\0*', '.tif'))
+
+def image_ext(data):
+    """File extension for image data from its magic number, or None
+
+    This doesn't decode the image, so it works without PIL.
+    """
+    for magic, ext in _IMAGE_MAGIC:
+        if data.startswith(magic):
+            return ext
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+def vcomment_index(tags):
+    """Index Vorbis comments by lower-case key in a single pass
+
+    Looking up a key in a mutagen VCommentDict scans every comment, so
+    reading many keys at once is quicker through this index.
+    """
+    index = {}
+    for key, val in tags:
+        index.setdefault(key.lower(), []).append(val)
+    return index
+
 def _split(it, i):
     return it[:i], it[i:]
 
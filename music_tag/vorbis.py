@@ -63,6 +63,20 @@ def rm_pictures(afile, norm_key):
 class OggFile(AudioFile):
     tag_format = "Ogg"
     mutagen_kls = mutagen.ogg.OggFileType
+    padding_mechanism = 'comment packet'
+
+    def _tag_space(self):
+        # the comment packet, which is the 2nd packet of the stream
+        with self._open_source() as fin:
+            pages = [mutagen.ogg.OggPage(fin)]
+            while True:
+                packets = mutagen.ogg.OggPage.to_packets(pages, strict=False)
+                complete = len(packets) - (0 if pages[-1].complete else 1)
+                if complete >= 2:
+                    return len(packets[1])
+                page = mutagen.ogg.OggPage(fin)
+                if page.serial == pages[0].serial:
+                    pages.append(page)
 
     _TAG_MAP = {
         'title': TAG_MAP_ENTRY(getter='title', setter='title', type=str),
@@ -140,6 +154,14 @@ class OggFile(AudioFile):
         'replaygainalbumpeak': TAG_MAP_ENTRY(getter='replaygain_album_peak', setter='replaygain_album_peak', type=float, sanitizer=util.sanitize_replaygain_peak),
     }
 
+    def _build_read_index(self):
+        return util.vcomment_index(self.mfile.tags)
+
+    def _ft_getter(self, key):
+        if self._read_index is not None:
+            return self._read_index.get(key.lower(), None)
+        return super(OggFile, self)._ft_getter(key)
+
     def _ft_setter(self, key, md_val, appendable=True):
         if self.appendable and appendable:
             self.mfile.tags[key] = [str(v) for v in md_val.values]
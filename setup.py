@@ -74,6 +74,7 @@ def _main():
           install_requires=['mutagen'],
           extras_require={
               'artwork': 'Pillow',
+              'arrow': 'pyarrow',
           },
           packages=pkgs,
           cmdclass=cmdclass,
@@ -0,0 +1,76 @@
+import asyncio
+import concurrent.futures
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import aio
+
+
+def _make_temp_fname(fname):
+    return os.path.join(os.path.dirname(fname),
+                        '_test_' + os.path.basename(fname))
+
+
+async def _test_load_save():
+    for fname in test_common.sample_files:
+        temp_fname = _make_temp_fname(fname)
+        shutil.copy(fname, temp_fname)
+        rel_fname = os.path.relpath(temp_fname, test_common.sample_dir)
+        try:
+            f = await aio.load_file(temp_fname)
+            test_common.check_tags(f, rel_fname, test_common.sample_tags)
+            f.padding_policy = 'keep'
+            assert f.sync.padding_policy == 'keep', rel_fname
+            f.skip_clean_saves = True
+
+            f['album'] = 'async album'
+            report = await f.save()
+            assert report.written, rel_fname
+            report = await f.save()
+            assert not report.written, rel_fname
+
+            g = music_tag.load_file(temp_fname)
+            assert str(g['album']) == 'async album', rel_fname
+        finally:
+            os.remove(temp_fname)
+
+
+async def _test_load_many(executor):
+    fnames = test_common.sample_files + [os.path.join(test_common.sample_dir,
+                                                      'imgA.jpg')]
+
+    ret = [(fname, f) async for fname, f in aio.load_many(fnames, limit=3,
+                                                          executor=executor)]
+    assert [fname for fname, _ in ret] == fnames
+    for fname, f in ret[:-1]:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        test_common.check_tags(f, rel_fname, test_common.sample_tags)
+    assert isinstance(ret[-1][1], Exception)
+
+    async def _specs():
+        for fname in fnames:
+            yield fname
+    ret = [fname async for fname, _ in aio.load_many(_specs(), limit=2,
+                                                     ordered=False,
+                                                     executor=executor)]
+    assert sorted(ret) == sorted(fnames)
+
+    # stopping early cancels whatever is still queued
+    async for fname, f in aio.load_many(fnames, limit=2, executor=executor):
+        break
+
+
+def _main():
+    asyncio.run(_test_load_save())
+    asyncio.run(_test_load_many(None))
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        asyncio.run(_test_load_many(executor))
+    with music_tag.parallel.make_executor('process', workers=2) as executor:
+        asyncio.run(_test_load_many(executor))
+
+if __name__ == '__main__':
+    _main()
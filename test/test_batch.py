@@ -0,0 +1,159 @@
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import batch
+
+
+def _copy_samples(tmp_dir):
+    ret = []
+    for fname in test_common.sample_files:
+        temp_fname = os.path.join(tmp_dir, os.path.basename(fname))
+        shutil.copy(fname, temp_fname)
+        ret.append(temp_fname)
+    return ret
+
+
+def _album(fname):
+    return str(music_tag.load_file(fname)['album'])
+
+
+def _test_apply(tmp_dir, executor):
+    fnames = _copy_samples(tmp_dir)
+    journal = os.path.join(tmp_dir, 'edits.journal')
+
+    with music_tag.batch_edit(journal, workers=2, executor=executor) as b:
+        for fname in fnames:
+            b.update(fname, {'album': 'batch album', 'comment': None,
+                             'genre': ['a', 'b']})
+    assert not os.path.exists(journal)
+    assert len(b.results) == len(fnames)
+    for fname in fnames:
+        assert b.results[fname].written, fname
+        f = music_tag.load_file(fname)
+        assert str(f['album']) == 'batch album', fname
+        assert f['comment'].values == [], fname
+        assert str(f['genre'].values[0]).startswith('a'), fname
+
+    # nothing is applied if the with block raises
+    try:
+        with music_tag.batch_edit(journal) as b:
+            b.set(fnames[0], 'album', 'not applied')
+            raise RuntimeError()
+    except RuntimeError:
+        pass
+    assert _album(fnames[0]) == 'batch album'
+    assert not os.path.exists(journal)
+
+    # a failure keeps the journal, which can roll everything back
+    missing = os.path.join(tmp_dir, 'missing.mp3')
+    try:
+        with music_tag.batch_edit(journal, workers=2,
+                                  executor=executor) as b:
+            for fname in fnames + [missing]:
+                b.set(fname, 'album', 'second album')
+    except music_tag.BatchEditError as e:
+        assert list(e.failures) == [missing], e.failures
+    else:
+        assert False, 'missing file should fail the batch'
+    assert os.path.exists(journal)
+    assert all(_album(fname) == 'second album' for fname in fnames)
+
+    try:
+        with music_tag.batch_edit(journal) as b:
+            pass
+    except FileExistsError:
+        pass
+    else:
+        assert False, 'an existing journal should not be overwritten'
+
+    batch.rollback(journal, workers=2, executor=executor)
+    assert not os.path.exists(journal)
+    assert all(_album(fname) == 'batch album' for fname in fnames)
+
+
+def _test_resume(tmp_dir):
+    fnames = _copy_samples(tmp_dir)
+    journal = os.path.join(tmp_dir, 'resume.journal')
+    with music_tag.batch_edit(journal, executor='thread',
+                              keep_journal=True) as b:
+        for fname in fnames:
+            b.set(fname, 'album', 'resumed album')
+
+    # pretend the run died after journaling, while saving the first file
+    with open(journal) as fin:
+        lines = [l for l in fin if '"done"' not in l]
+    with open(journal, 'w') as fout:
+        fout.writelines(lines)
+        fout.write('{"file": "' + fnames[0])
+    shutil.copy(test_common.sample_files[0], fnames[0])
+
+    entries = batch.read_journal(journal)
+    assert [e[0] for e in entries] == fnames
+    assert not any(e[3] for e in entries)
+
+    results = batch.resume(journal, executor='thread')
+    assert not os.path.exists(journal)
+    assert results[fnames[0]].written
+    assert all(_album(fname) == 'resumed album' for fname in fnames)
+
+
+def _test_rollback_raw(tmp_dir):
+    # values that don't read back the same after type normalization are
+    # restored exactly as they were stored
+    fnames = [f for f in _copy_samples(tmp_dir)
+              if f.endswith(('.mp3', '.aiff', '.flac'))]
+    before = {}
+    comments = {}
+    for fname in fnames:
+        f = music_tag.load_file(fname)
+        f.raw['year'] = '2019-05-01'
+        f.raw['tracknumber'] = '03'
+        f.save()
+        comments[fname] = sorted(f.mfile.tags)
+        with open(fname, 'rb') as fin:
+            before[fname] = fin.read()
+
+    journal = os.path.join(tmp_dir, 'raw.journal')
+    with music_tag.batch_edit(journal, workers=2, executor='thread',
+                              keep_journal=True) as b:
+        for fname in fnames:
+            b.update(fname, {'year': 2020, 'tracknumber': 5})
+    for fname in fnames:
+        assert music_tag.load_file(fname)['year'].value == 2020, fname
+
+    batch.rollback(journal, keep_journal=True, workers=2, executor='thread')
+    for fname in fnames:
+        f = music_tag.load_file(fname)
+        assert f.raw['year'].values == ['2019-05-01'], fname
+        assert f.raw['tracknumber'].values == ['03'], fname
+        with open(fname, 'rb') as fin:
+            data = fin.read()
+        if fname.endswith('.flac'):
+            # vorbis comments that were set again move to the end
+            assert len(data) == len(before[fname]), fname
+            assert sorted(f.mfile.tags) == comments[fname], fname
+        else:
+            assert data == before[fname], fname
+
+    # files that already have their original values aren't saved again
+    results = batch.rollback(journal, workers=2, executor='thread')
+    assert not any(r.written for r in results.values()), results
+
+
+def _main():
+    tmp_dir = tempfile.mkdtemp(prefix='music_tag_test_')
+    try:
+        _test_apply(tmp_dir, 'thread')
+        _test_apply(tmp_dir, 'process')
+        _test_resume(tmp_dir)
+        _test_rollback_raw(tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,311 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import __main__ as cli
+
+
+def _run(*argv):
+    orig_argv = sys.argv
+    sys.argv = ['music_tag'] + list(argv)
+    try:
+        return cli._main()
+    finally:
+        sys.argv = orig_argv
+
+
+def _run_captured(*argv):
+    out, err = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        ret = _run(*argv)
+    return ret, out.getvalue(), err.getvalue()
+
+
+def _copy_samples(tmp_dir):
+    ret = []
+    for fname in test_common.sample_files:
+        temp_fname = os.path.join(tmp_dir, os.path.basename(fname))
+        shutil.copy(fname, temp_fname)
+        ret.append(temp_fname)
+    return ret
+
+
+def _read(fname):
+    with open(fname, newline='') as fin:
+        return fin.read()
+
+
+def _test_expand_files(tmp_dir):
+    top = os.path.join(tmp_dir, 'tree')
+    expected = []
+    for i in range(3):
+        for j in range(4):
+            dname = os.path.join(top, 'd{0}'.format(i), 'e{0}'.format(j))
+            os.makedirs(dname)
+            for name in ('a.mp3', 'b.flac', 'c.txt', 'mp3', 'd.mp3.bak'):
+                with open(os.path.join(dname, name), 'w'):
+                    pass
+            expected += [os.path.join(dname, n) for n in ('a.mp3', 'b.flac')]
+    if hasattr(os, 'symlink'):
+        os.symlink(os.path.join(top, 'd0'), os.path.join(top, 'link'))
+
+    serial = list(cli._expand_files([top, 'x.txt']))
+    assert serial[-1] == 'x.txt'
+    assert sorted(serial[:-1]) == sorted(expected), serial
+    # depth first: each directory's files are together
+    dirs = [os.path.dirname(f) for f in serial[:-1]]
+    assert dirs == sorted(dirs, key=dirs.index)
+    for jobs in (2, 8):
+        assert list(cli._expand_files([top, 'x.txt'], jobs)) == serial
+
+    # files are yielded before the walk is done
+    walk = cli._expand_files([top], 2)
+    assert next(walk) in expected
+    walk.close()
+    shutil.rmtree(top)
+
+
+def _test_to_csv(tmp_dir):
+    serial = os.path.join(tmp_dir, 'serial.csv')
+    assert _run('--to-csv', serial, test_common.sample_dir) == 0
+    rows = _read(serial).splitlines()
+    assert len(rows) == len(test_common.sample_files) + 1, rows
+
+    for jobs in ('2', '0'):
+        out = os.path.join(tmp_dir, 'jobs{0}.csv'.format(jobs))
+        assert _run('--jobs', jobs, '--to-csv', out,
+                    test_common.sample_dir) == 0
+        assert _read(out) == _read(serial), jobs
+
+
+def _test_unknown_keys(tmp_dir):
+    # a key only FLAC knows is empty for the other formats, with or
+    # without --index
+    kls = music_tag.flac.FlacFile
+    orig_map = kls._TAG_MAP
+    kls._TAG_MAP = dict(orig_map, flaconly=music_tag.file.TAG_MAP_ENTRY(
+        getter='flaconly', setter='flaconly', type=str))
+    kls._build_tag_maps()
+    try:
+        fnames = _copy_samples(tmp_dir)
+        flac = [f for f in fnames if f.endswith('.flac')][0]
+        f = music_tag.load_file(flac)
+        f['flaconly'] = 'only here'
+        f.save()
+
+        db = os.path.join(tmp_dir, 'unknown.sqlite')
+        for ext in ('csv', 'jsonl'):
+            outs = []
+            for argv in ((), ('--index', db), ('--index', db)):
+                out = os.path.join(tmp_dir, 'unknown{0}.{1}'
+                                   ''.format(len(outs), ext))
+                assert _run('--tags', 'Title : flaconly',
+                            '--to-' + ext, out, *(argv + tuple(fnames))) == 0
+                outs.append(_read(out))
+            assert outs[1] == outs[0] and outs[2] == outs[0], ext
+
+        lines = outs[0].splitlines()
+        assert len(lines) == len(fnames), lines
+        for fname, line in zip(fnames, lines):
+            obj = json.loads(line)
+            if fname == flac:
+                assert obj['flaconly'] == ['only here'], obj
+            else:
+                assert obj['flaconly'] is None, obj
+    finally:
+        kls._TAG_MAP = orig_map
+        kls._build_tag_maps()
+
+
+def _test_print():
+    not_audio = os.path.join(test_common.sample_dir, 'cover.jpg')
+    argv = ('--print', '--tags', 'Title : Album', test_common.sample_dir,
+            not_audio)
+    serial = _run_captured(*argv)
+    assert serial[0] == 1, serial
+    assert 'cover.jpg' in serial[2], serial
+    assert serial[1].count('Album: Source of Sound') == \
+        len(test_common.sample_files), serial
+    assert _run_captured('--jobs', '2', *argv) == serial
+
+
+def _test_set(tmp_dir):
+    fnames = _copy_samples(tmp_dir)
+    comment = os.path.join(tmp_dir, 'comment.txt')
+    with open(comment, 'w') as fout:
+        fout.write('comment from a file')
+
+    ret, out, _ = _run_captured('--jobs', '2', '--set', 'album:jobs album',
+                                '--set', 'comment:file://' + comment, *fnames)
+    assert ret == 0, out
+    for fname in fnames:
+        f = music_tag.load_file(fname)
+        assert str(f['album']) == 'jobs album', fname
+        assert str(f['comment']) == 'comment from a file', fname
+
+
+def _test_from_csv(tmp_dir):
+    fnames = _copy_samples(tmp_dir)
+    csv_fname = os.path.join(tmp_dir, 'edits.csv')
+    with open(csv_fname, 'w', newline='') as fout:
+        fout.write('Album,Genre,filename\n')
+        for fname in fnames:
+            fout.write('first album,first genre,{0}\n'.format(fname))
+        # a second row for the same file wins
+        for fname in fnames:
+            fout.write('second album,,{0}\n'.format(fname))
+
+    ret, out, err = _run_captured('--jobs', '2', '--from-csv', csv_fname)
+    assert ret == 0, (out, err)
+    lines = out.splitlines()
+    assert lines[0] == '{0} of {0} file(s) to edit: {0} tag(s) to set, {0} ' \
+        'to remove'.format(len(fnames)), lines
+    assert lines[1:] == ['editing ' + fname for fname in fnames], lines
+    for fname in fnames:
+        f = music_tag.load_file(fname)
+        assert str(f['album']) == 'second album', fname
+        assert f['genre'].values == [], fname
+
+    # writing back an export changes nothing
+    export = os.path.join(tmp_dir, 'export.csv')
+    assert _run('--to-csv', export, *fnames) == 0
+    for fname in fnames:
+        os.utime(fname, ns=(0, 0))
+    for argv in (('--from-csv', export),
+                 ('--from-csv', export, '--journal', export + '.journal')):
+        ret, out, err = _run_captured('--jobs', '2', *argv)
+        assert ret == 0, (out, err)
+        assert out.splitlines() == [
+            '0 of {0} file(s) to edit: 0 tag(s) to set, 0 to remove'
+            ''.format(len(fnames))], out
+        for fname in fnames:
+            assert os.stat(fname).st_mtime_ns == 0, fname
+
+    # a journal left by an earlier run stops the batch before any work
+    journal = export + '.journal'
+    with open(journal, 'w') as fout:
+        fout.write('{}\n')
+    ret, out, err = _run_captured('--from-csv', export, '--journal', journal)
+    assert ret == 1 and out == '', (out, err)
+    assert err.strip() == ('journal {0} exists, resume or roll back that '
+                           'batch first'.format(journal)), err
+    os.remove(journal)
+
+
+def _test_jsonl(tmp_dir):
+    fnames = _copy_samples(tmp_dir)
+    tags = 'Title : Track Number : Compilation : Artwork : Disc Number'
+    export = os.path.join(tmp_dir, 'export.jsonl')
+    assert _run('--tags', tags, '--to-jsonl', export, *fnames) == 0
+    for argv in (('--jobs', '2'),
+                 ('--index', os.path.join(tmp_dir, 'index.sqlite')),
+                 ('--index', os.path.join(tmp_dir, 'index.sqlite'))):
+        out = os.path.join(tmp_dir, 'export2.jsonl')
+        assert _run('--tags', tags, '--to-jsonl', out,
+                    *(argv + tuple(fnames))) == 0
+        assert _read(out) == _read(export), argv
+
+    with open(export, encoding='utf-8') as fin:
+        objs = [json.loads(line) for line in fin]
+    assert [obj['filename'] for obj in objs] == fnames
+    for obj in objs:
+        # lists for keys that can hold many values, even if there's one
+        assert obj['Title'] == ['440Hz'], obj
+        assert obj['Track Number'] == 1, obj
+        assert obj['Compilation'] is True, obj
+        assert obj['Disc Number'] is None, obj
+        assert len(obj['Artwork'][0]['sha256']) == 64, obj
+
+    # writing back an export changes nothing
+    for fname in fnames:
+        os.utime(fname, ns=(0, 0))
+    ret, out, err = _run_captured('--jobs', '2', '--from-jsonl', export)
+    assert ret == 0, (out, err)
+    assert out.splitlines() == ['0 of {0} file(s) edited: 0 tag(s) set, '
+                                '0 removed'.format(len(fnames))], out
+    for fname in fnames:
+        assert os.stat(fname).st_mtime_ns == 0, fname
+
+    edits = os.path.join(tmp_dir, 'edits.jsonl')
+    with open(edits, 'w', encoding='utf-8') as fout:
+        for obj in objs:
+            obj['Track Number'] = 7
+            obj['Compilation'] = False
+            obj['Title'] = None
+            fout.write(json.dumps(obj) + '\n')
+    ret, out, err = _run_captured('--jobs', '2', '--from-jsonl', edits)
+    assert ret == 0, (out, err)
+    assert out.splitlines()[-1] == '{0} of {0} file(s) edited: {1} tag(s) ' \
+        'set, {0} removed'.format(len(fnames), 2 * len(fnames)), out
+    for fname in fnames:
+        f = music_tag.load_file(fname)
+        assert f['tracknumber'].value == 7, fname
+        assert f['compilation'].values == [False], fname
+        assert f['title'].values == [], fname
+        assert f['artwork'].values, fname
+
+
+def _test_extract_art(tmp_dir):
+    fnames = _copy_samples(tmp_dir)
+    art_dir = os.path.join(tmp_dir, 'covers')
+    manifest = os.path.join(art_dir, 'manifest.jsonl')
+
+    # pictures are copied without being decoded
+    image_open = music_tag.file.Image.open
+    music_tag.file.Image.open = None
+    try:
+        ret, out, err = _run_captured('--extract-art', art_dir, *fnames[:3])
+    finally:
+        music_tag.file.Image.open = image_open
+    assert ret == 0, (out, err)
+
+    # an interrupted run is picked up where it stopped
+    with open(manifest, 'a') as fout:
+        fout.write('{"filename": "')
+    ret, out, err = _run_captured('--jobs', '2', '--extract-art', art_dir,
+                                  *fnames)
+    assert ret == 0, (out, err)
+    assert out.strip().endswith('3 file(s) were already done'), out
+
+    with open(manifest, encoding='utf-8') as fin:
+        entries = [json.loads(line) for line in fin]
+    assert [e['filename'] for e in entries] == fnames
+    digests = set()
+    for fname, entry in zip(fnames, entries):
+        raws = [art.raw for art in music_tag.load_file(fname)['artwork']
+                .values]
+        assert [a['sha256'] for a in entry['artwork']] == \
+            [hashlib.sha256(raw).hexdigest() for raw in raws], entry
+        for art, raw in zip(entry['artwork'], raws):
+            assert art['pic_type'] == 3, entry
+            with open(os.path.join(art_dir, art['file']), 'rb') as fin:
+                assert fin.read() == raw
+            digests.add(art['file'])
+    # each picture is written once
+    assert sorted(os.listdir(art_dir)) == sorted(digests) + ['manifest.jsonl']
+
+
+def _main():
+    tmp_dir = tempfile.mkdtemp(prefix='music_tag_test_')
+    try:
+        _test_expand_files(tmp_dir)
+        _test_to_csv(tmp_dir)
+        _test_unknown_keys(tmp_dir)
+        _test_print()
+        _test_set(tmp_dir)
+        _test_from_csv(tmp_dir)
+        _test_jsonl(tmp_dir)
+        _test_extract_art(tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag.file import MetadataItem
+from music_tag.util import sanitize_int
+
+
+def _main():
+    assert MetadataItem(int, sanitize_int, '01') == MetadataItem(int, None, 1)
+    assert MetadataItem(str, None, ['a', 'b']) != MetadataItem(str, None, 'a')
+    assert MetadataItem(str, None, 'a') != 'a'
+
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        f = music_tag.load_file(fname)
+
+        missing = [k for k in ('isrc', 'compilation', 'discnumber')
+                   if not f[k].values]
+        assert missing, rel_fname
+
+        # the current values, in any spelling, are no change, and neither
+        # is removing a missing tag
+        edits = {'title': '440Hz', 'Track Number': '01', 'year': 2019,
+                 'artist': str(f['artist'])}
+        edits.update((k, '') for k in missing)
+        assert f.diff(edits) == {}, rel_fname
+        # ... and nothing was set or loaded for it
+        assert not f.is_dirty, rel_fname
+
+        changes = f.diff([('title', 'other'), ('album', ''),
+                          ('tracknumber', '2'), ('tracknumber', 1),
+                          ('genre', 'Pop')])
+        assert changes == {'title': 'other', 'album': None,
+                           'genre': 'Pop'}, (rel_fname, changes)
+
+        # bad values are passed on, to fail when they're set
+        assert f.diff({'tracknumber': 'x'}) == {'tracknumber': 'x'}
+
+if __name__ == '__main__':
+    _main()
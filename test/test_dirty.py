@@ -0,0 +1,127 @@
+import os
+import shutil
+import sys
+
+import mutagen
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+
+
+def _make_temp_fname(fname):
+    return os.path.join(os.path.dirname(fname),
+                        '_test_' + os.path.basename(fname))
+
+
+def _mtime(fname):
+    return os.stat(fname).st_mtime_ns
+
+
+def _main():
+    for fname in test_common.sample_files:
+        temp_fname = _make_temp_fname(fname)
+        shutil.copy(fname, temp_fname)
+        rel_fname = os.path.relpath(temp_fname, test_common.sample_dir)
+        try:
+            os.utime(temp_fname, ns=(0, 0))
+
+            f = music_tag.load_file(temp_fname)
+            f.skip_clean_saves = True
+            assert not f.is_dirty, rel_fname
+
+            # writing back what's already there is not a change
+            f['title'] = '440Hz'
+            f['tracknumber'] = '1'
+            f['year'] = 2019
+            assert f.changed_keys() == [], rel_fname
+            f.save()
+            assert _mtime(temp_fname) == 0, rel_fname
+
+            # ... and neither is changing a tag then changing it back
+            f['title'] = 'something else'
+            assert f.changed_keys() == ['title'], rel_fname
+            f['title'] = '440Hz'
+            assert not f.is_dirty, rel_fname
+
+            f['album'] = 'new album'
+            del f['composer']
+            assert f.is_dirty, rel_fname
+            assert f.changed_keys() == ['album', 'composer'], rel_fname
+            f.save()
+            assert _mtime(temp_fname) != 0, rel_fname
+            assert not f.is_dirty, rel_fname
+
+            f = music_tag.load_file(temp_fname)
+            assert str(f['album']) == 'new album', rel_fname
+            assert 'composer' not in f, rel_fname
+
+            os.utime(temp_fname, ns=(0, 0))
+            f.save(force=True)
+            assert _mtime(temp_fname) != 0, rel_fname
+
+            # values are compared as stored, not after type normalization
+            f['year'] = 2019
+            f.raw['year'] = '2019-05-01'
+            assert f.changed_keys() == ['year'], rel_fname
+
+            # a new picture type is a change where the format stores it
+            f = music_tag.load_file(temp_fname)
+            f.skip_clean_saves = True
+            art = f['artwork'].first
+            art.pic_type = 4
+            f['artwork'] = art
+            if str(f['artwork']) == str(art) and \
+                    int(f['artwork'].first.pic_type) == 4:
+                assert f.changed_keys() == ['artwork'], rel_fname
+                assert f.save().written, rel_fname
+                g = music_tag.load_file(temp_fname)
+                assert int(g['artwork'].first.pic_type) == 4, rel_fname
+
+            # edits that set() doesn't see are saved by default, and files
+            # made from a mutagen object from outside are always dirty
+            os.utime(temp_fname, ns=(0, 0))
+            f = music_tag.load_file(temp_fname)
+            assert f.save().written, rel_fname
+            assert _mtime(temp_fname) != 0, rel_fname
+            mfile = mutagen.File(temp_fname)
+            f = music_tag.load_file(mfile)
+            f.skip_clean_saves = True
+            assert f.is_dirty, rel_fname
+        finally:
+            os.remove(temp_fname)
+
+    # saving a copy doesn't make the file itself clean
+    for fname in test_common.sample_files:
+        temp_fname = _make_temp_fname(fname)
+        copy_fname = _make_temp_fname(temp_fname)
+        shutil.copy(fname, temp_fname)
+        rel_fname = os.path.relpath(temp_fname, test_common.sample_dir)
+        try:
+            f = music_tag.load_file(temp_fname)
+            f.skip_clean_saves = True
+            f['title'] = 'saved as'
+            assert f.save(copy_fname).written, rel_fname
+            assert f.is_dirty, rel_fname
+            assert f.save().written, rel_fname
+            assert str(music_tag.load_file(temp_fname)['title']) == 'saved as'
+            assert str(music_tag.load_file(copy_fname)['title']) == 'saved as'
+        finally:
+            os.remove(temp_fname)
+            if os.path.exists(copy_fname):
+                os.remove(copy_fname)
+
+    # edits through mfile aren't lost
+    fname = os.path.join(test_common.sample_dir, '440Hz.flac')
+    temp_fname = _make_temp_fname(fname)
+    shutil.copy(fname, temp_fname)
+    try:
+        f = music_tag.load_file(temp_fname)
+        f.mfile.tags['title'] = 'direct'
+        assert f.save().written
+        assert str(music_tag.load_file(temp_fname)['title']) == 'direct'
+    finally:
+        os.remove(temp_fname)
+
+if __name__ == '__main__':
+    _main()
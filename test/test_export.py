@@ -0,0 +1,147 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import export
+from music_tag import __main__ as cli
+
+
+_KEYS = ['Title', 'tracknumber', 'compilation', 'artwork', '#length',
+         '#bitrate', 'bogus']
+
+
+def _test_no_pyarrow(tmp_dir):
+    # a None entry in sys.modules makes the import fail
+    saved = {k: v for k, v in sys.modules.items() if k.startswith('pyarrow')}
+    sys.modules['pyarrow'] = None
+    try:
+        try:
+            next(export.to_arrow(test_common.sample_files, _KEYS))
+        except ImportError:
+            pass
+        else:
+            assert False, 'expected ImportError'
+
+        # the install hint goes to stderr, not stdout
+        orig_argv, orig_stdout, orig_stderr = sys.argv, sys.stdout, sys.stderr
+        sys.argv = ['music_tag', '--to-parquet',
+                    os.path.join(tmp_dir, 'x.parquet'), test_common.sample_dir]
+        sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+        try:
+            assert cli._main() == 1
+            out, err = sys.stdout.getvalue(), sys.stderr.getvalue()
+        finally:
+            sys.argv, sys.stdout, sys.stderr = (orig_argv, orig_stdout,
+                                                orig_stderr)
+        assert out == '', out
+        assert 'pyarrow' in err, err
+    finally:
+        del sys.modules['pyarrow']
+        sys.modules.update(saved)
+
+
+def _test_convert():
+    # a value that doesn't fit the column is dropped on its own
+    cell, bad = export._convert(['1', '3/12', '5'], int, True)
+    assert cell == [1, 5] and [v for v, _ in bad] == ['3/12'], (cell, bad)
+    cell, bad = export._convert(['x', '2'], int, False)
+    assert cell == 2 and len(bad) == 1, (cell, bad)
+    assert export._convert([], int, True) == (None, [])
+
+
+def _test_arrow(tmp_dir):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fnames = list(test_common.sample_files)
+    missing = os.path.join(tmp_dir, 'missing.mp3')
+    errors = []
+    batches = list(export.to_arrow(fnames + [missing], _KEYS, batch_size=4,
+                                   on_error=lambda f, e: errors.append(f)))
+    assert errors == [missing]
+    assert [b.num_rows for b in batches] == [4, 4, len(fnames) - 8]
+    schema = export.arrow_schema(_KEYS)
+    assert all(b.schema == schema for b in batches)
+    assert schema.field('Title').type == pa.list_(pa.string())
+    assert schema.field('tracknumber').type == pa.int64()
+    assert schema.field('compilation').type == pa.bool_()
+    assert schema.field('#length').type == pa.float64()
+
+    rows = pa.Table.from_batches(batches).to_pylist()
+    assert [r['filename'] for r in rows] == fnames
+    for fname, row in zip(fnames, rows):
+        f = music_tag.load_file(fname)
+        assert row['Title'] == ['440Hz'], row
+        assert row['tracknumber'] == 1, row
+        assert row['compilation'] is True, row
+        assert abs(row['#length'] - f['#length'].value) < 1e-6, row
+        assert row['bogus'] is None, row
+        art = f['artwork'].values
+        assert len(row['artwork'] or []) == len(art), row
+        if art:
+            assert row['artwork'][0] == export.artwork_summary(art[0])
+
+    try:
+        next(export.to_arrow([missing], _KEYS))
+    except music_tag.mutagen.MutagenError:
+        pass
+    else:
+        assert False, 'expected MutagenError'
+
+    # values that don't fit are reported one by one, the rest is kept
+    def _snapshots(paths, keys, **kwargs):
+        for path in paths:
+            yield path, music_tag.file.TagSnapshot(
+                path, ['genre', 'year'], [('Rock', 'Pop'), ('199x', )])
+    orig_read = export.read_snapshots
+    export.read_snapshots = _snapshots
+    try:
+        errors = []
+        batch = next(export.to_arrow(
+            ['x.mp3'], ['genre', 'year'],
+            on_error=lambda f, e: errors.append((f, str(e)))))
+    finally:
+        export.read_snapshots = orig_read
+    assert batch.to_pylist() == [{'filename': 'x.mp3', 'genre': ['Rock', 'Pop'],
+                                  'year': None}], batch.to_pylist()
+    assert [f for f, _ in errors] == ['x.mp3'], errors
+    assert errors[0][1].startswith("year: can't export '199x' as int"), errors
+
+    # the parquet file is the same with or without workers / an index
+    tables = []
+    for argv in (('--jobs', '2'), ('--index', os.path.join(tmp_dir, 'i.db')),
+                 ('--index', os.path.join(tmp_dir, 'i.db'))):
+        out = os.path.join(tmp_dir, 'tags.parquet')
+        orig_argv = sys.argv
+        sys.argv = ['music_tag', '--tags', ' : '.join(_KEYS[:-1]),
+                    '--to-parquet', out] + list(argv) + fnames
+        try:
+            assert cli._main() == 0
+        finally:
+            sys.argv = orig_argv
+        tables.append(pq.read_table(out))
+    assert tables[0].num_rows == len(fnames)
+    assert tables[1].equals(tables[0]) and tables[2].equals(tables[0])
+
+
+def _main():
+    tmp_dir = tempfile.mkdtemp(prefix='music_tag_test_')
+    try:
+        _test_convert()
+        _test_no_pyarrow(tmp_dir)
+        try:
+            import pyarrow  # pylint: disable=unused-import
+        except ImportError:
+            pass
+        else:
+            _test_arrow(tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,116 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import fileops
+
+
+def _make_temp_fname(fname):
+    return os.path.join(os.path.dirname(fname),
+                        '_test_' + os.path.basename(fname))
+
+
+def _test_load():
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        with open(fname, 'rb') as fin:
+            data = fin.read()
+
+        with open(fname, 'rb') as fin:
+            for spec in (io.BytesIO(data), data, bytearray(data),
+                         memoryview(data), fin):
+                for lazy in (False, True):
+                    f = music_tag.load_file(spec, lazy=lazy)
+                    test_common.check_tags(f, rel_fname,
+                                           test_common.sample_tags)
+            f = music_tag.load_file(fin)
+            assert f.filename == fname, rel_fname
+
+
+def _test_save():
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        with open(fname, 'rb') as fin:
+            data = fin.read()
+
+        # in place, into the object the file was loaded from
+        buf = io.BytesIO(data)
+        f = music_tag.load_file(buf)
+        f.skip_clean_saves = True
+        f['album'] = 'in place'
+        report = f.save()
+        assert report.written and report.filename is None, rel_fname
+        assert not f.save().written, rel_fname
+        buf.seek(0)
+        assert str(music_tag.load_file(buf)['album']) == 'in place'
+
+        # copies from a read-only buffer
+        f = music_tag.load_file(memoryview(data))
+        f['album'] = 'copy'
+        out = io.BytesIO(b'junk')
+        report = f.save(fileobj=out)
+        assert report.written and report.copy_strategy == 'copy', rel_fname
+        assert str(music_tag.load_file(out)['album']) == 'copy', rel_fname
+
+        temp_fname = _make_temp_fname(fname)
+        try:
+            f['album'] = 'copy to path'
+            report = f.save(temp_fname)
+            assert report.filename == temp_fname, rel_fname
+            assert str(music_tag.load_file(temp_fname)['album']) == \
+                'copy to path', rel_fname
+
+            # a file loaded by path can be saved into a file object
+            f = music_tag.load_file(temp_fname)
+            out = io.BytesIO()
+            f.save(fileobj=out)
+            assert out.getvalue() == open(temp_fname, 'rb').read(), rel_fname
+        finally:
+            os.remove(temp_fname)
+
+        f = music_tag.load_file(memoryview(data))
+        f['album'] = 'nowhere to go'
+        try:
+            f.save()
+        except ValueError:
+            pass
+        else:
+            assert False, rel_fname
+        try:
+            f.save(temp_fname, fileobj=io.BytesIO())
+        except ValueError:
+            pass
+        else:
+            assert False, rel_fname
+
+        # the buffer the file was loaded from never changes
+        assert bytes(memoryview(data)) == open(fname, 'rb').read()
+
+
+def _test_buffer_reader():
+    data = bytes(range(256))
+    f = fileops.BufferReader(bytearray(data))
+    assert f.read(4) == data[:4]
+    assert f.seek(-8, io.SEEK_END) == 248
+    assert f.read() == data[248:]
+    assert f.seek(1000) == 1000
+    assert f.read(4) == b''
+    try:
+        f.seek(-1)
+    except OSError:
+        pass
+    else:
+        assert False
+    f.close()
+
+
+def _main():
+    _test_buffer_reader()
+    _test_load()
+    _test_save()
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import fileops
+
+
+def _make_temp_fname(fname):
+    return os.path.join(os.path.dirname(fname),
+                        '_test_' + os.path.basename(fname))
+
+
+def _main():
+    for fname in test_common.sample_files:
+        temp_fname = _make_temp_fname(fname)
+        rel_fname = os.path.relpath(temp_fname, test_common.sample_dir)
+        with open(fname, 'rb') as fin:
+            orig = fin.read()
+
+        try:
+            # every strategy either copies the file or falls through to the
+            # next one, ending with the plain copy
+            for i, name in enumerate(fileops.COPY_STRATEGIES):
+                used = fileops.copy_file(fname, temp_fname,
+                                         fileops.COPY_STRATEGIES[i:])
+                assert used in fileops.COPY_STRATEGIES[i:], (rel_fname, used)
+                with open(temp_fname, 'rb') as fin:
+                    assert fin.read() == orig, (rel_fname, used)
+
+            f = music_tag.load_file(fname)
+            f['album'] = 'save as'
+            report = f.save(temp_fname)
+            assert report.written, rel_fname
+            assert report.filename == temp_fname, rel_fname
+            assert report.copy_strategy in fileops.COPY_STRATEGIES, rel_fname
+            assert str(music_tag.load_file(temp_fname)['album']) == 'save as'
+            with open(fname, 'rb') as fin:
+                assert fin.read() == orig, rel_fname
+        finally:
+            if os.path.exists(temp_fname):
+                os.remove(temp_fname)
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import index
+
+
+_KEYS = ['title', 'Artist', 'tracknumber', 'artwork', 'bogus']
+
+
+class _CountingJob(object):
+    def __init__(self):
+        self.fnames = []
+        self._job = index._snapshot_job
+
+    def __call__(self, job):
+        self.fnames.append(job[0])
+        return self._job(job)
+
+
+def _scan(idx, fnames, keys=_KEYS, resolve=False):
+    counter = _CountingJob()
+    index._snapshot_job = counter
+    try:
+        ret = list(idx.snapshots(fnames, keys, resolve=resolve))
+    finally:
+        index._snapshot_job = counter._job
+    assert [fname for fname, _ in ret] == list(fnames)
+    return dict(ret), counter.fnames
+
+
+def _main():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        fnames = []
+        for fname in test_common.sample_files:
+            fnames.append(os.path.join(tmp_dir, os.path.basename(fname)))
+            shutil.copy(fname, fnames[-1])
+        db = os.path.join(tmp_dir, 'index.sqlite')
+
+        with index.TagIndex(db) as idx:
+            snaps, parsed = _scan(idx, fnames)
+            assert parsed == fnames
+            assert len(idx) == len(fnames)
+            for fname in fnames:
+                f = music_tag.load_file(fname)
+                expected = f.snapshot(f.known_keys(_KEYS))
+                assert dict(snaps[fname]) == dict(expected), fname
+                assert 'bogus' not in snaps[fname]
+
+        # unchanged files come from the index, also for fewer keys
+        with index.TagIndex(db) as idx:
+            snaps2, parsed = _scan(idx, fnames)
+            assert parsed == []
+            assert snaps2 == snaps
+            snaps3, parsed = _scan(idx, fnames, keys=['title'])
+            assert parsed == []
+            for fname in fnames:
+                assert list(snaps3[fname]) == ['title']
+                assert snaps3[fname]['title'] == snaps[fname]['title']
+
+            # a different resolve or more keys means reading again
+            _, parsed = _scan(idx, fnames[:2], resolve=True)
+            assert parsed == fnames[:2]
+            _, parsed = _scan(idx, fnames[:2], keys=_KEYS + ['album'])
+            assert parsed == fnames[:2]
+
+            # only changed files are read again
+            f = music_tag.load_file(fnames[0])
+            f['title'] = 'Changed Title'
+            f.save()
+            snaps4, parsed = _scan(idx, fnames)
+            assert parsed == [fnames[0]]
+            assert snaps4[fnames[0]]['title'] == ('Changed Title', )
+
+            # missing files are reported in place
+            missing = os.path.join(tmp_dir, 'missing.mp3')
+            snaps5, _ = _scan(idx, [fnames[1], missing, fnames[2]])
+            assert isinstance(snaps5[missing], OSError)
+
+            assert idx.snapshot(fnames[1], _KEYS) == snaps[fnames[1]]
+            assert dict(idx.items())[fnames[1]]['title'] == \
+                snaps[fnames[1]]['title']
+
+            os.remove(fnames[-1])
+            assert idx.prune() == 1
+            assert len(idx) == len(fnames) - 1
+
+        # without keys, everything but artwork is stored; artwork is read
+        # when asked for. Only formats that can read every key in their tag
+        # map (ID3 spotid and APEv2 conductor raise) are checked
+        whole = [f for f in fnames if f.endswith(('.flac', '.m4a', '.ogg',
+                                                  '.opus'))]
+        with index.TagIndex(os.path.join(tmp_dir, 'index3.sqlite')) as idx:
+            snaps7, parsed = _scan(idx, whole, keys=None)
+            assert parsed == whole
+            for fname in whole:
+                assert 'artwork' not in snaps7[fname], fname
+                assert snaps7[fname]['title'] == snaps4[fname]['title']
+            for _, tags in idx._db.execute('SELECT path, tags FROM snapshots'):
+                assert 'artwork' not in json.loads(tags)
+            snaps8, parsed = _scan(idx, whole, keys=None)
+            assert parsed == [] and snaps8 == snaps7
+            snaps9, _ = _scan(idx, whole, keys=['artwork'])
+            for fname in whole:
+                assert snaps9[fname]['artwork'] == snaps4[fname]['artwork']
+            assert dict(index.read_snapshots(whole, keys=None)) == snaps7
+
+        # parallel reads give the same snapshots
+        with index.TagIndex(os.path.join(tmp_dir, 'index2.sqlite')) as idx:
+            snaps6 = dict(idx.snapshots(fnames[:-1], _KEYS, workers=2))
+            assert snaps6 == {fname: snaps4[fname] for fname in fnames[:-1]}
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    _main()
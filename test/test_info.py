@@ -0,0 +1,65 @@
+import io
+import os
+import pickle
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import registry
+
+
+_INFO_KEYS = ('#bitrate', '#codec', '#length', '#channels',
+              '#bitspersample', '#samplerate')
+
+
+def _make_temp_fname(fname):
+    return os.path.join(os.path.dirname(fname),
+                        '_test_' + os.path.basename(fname))
+
+
+def _info_values(f):
+    ret = {}
+    for key in _INFO_KEYS:
+        try:
+            ret[key] = f[key].values
+        except Exception as e:  # pylint: disable=broad-except
+            ret[key] = type(e)
+    return ret
+
+
+def _main():
+    deferred = set()
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        expected = _info_values(music_tag.load_file(fname))
+
+        with open(fname, 'rb') as fin:
+            data = fin.read()
+        for spec in (fname, io.BytesIO(data), memoryview(data)):
+            for lazy in (False, True):
+                f = music_tag.load_file(spec, info=False, lazy=lazy)
+                test_common.check_tags(f, rel_fname, test_common.sample_tags)
+                if isinstance(f.mfile.info, registry.DeferredInfo):
+                    deferred.add(os.path.splitext(fname)[1])
+                if spec is fname:
+                    f = pickle.loads(pickle.dumps(f))
+                assert _info_values(f) == expected, rel_fname
+
+        # in place saves move the audio, so the info is read before saving
+        temp_fname = _make_temp_fname(fname)
+        shutil.copy(fname, temp_fname)
+        try:
+            f = music_tag.load_file(temp_fname, info=False)
+            f['comment'] = 'x' * 100000
+            f.save()
+            assert not isinstance(f.mfile.info, registry.DeferredInfo)
+            assert _info_values(f) == expected, rel_fname
+        finally:
+            os.remove(temp_fname)
+
+    assert '.mp3' in deferred, deferred
+
+if __name__ == '__main__':
+    _main()
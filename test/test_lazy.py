@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+
+
+def _main():
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+
+        eager = music_tag.load_file(fname)
+        f = music_tag.load_file(fname, lazy=True)
+        assert type(f) is type(eager), '{0}: {1}'.format(rel_fname, type(f))
+        assert not f.loaded, '{0} parsed too early'.format(rel_fname)
+
+        test_common.check_tags(f, rel_fname, test_common.sample_tags)
+        assert f.loaded
+        assert str(f['#length']) == str(eager['#length'])
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+
+
+def _main():
+    fnames = test_common.sample_files + [os.path.join(test_common.sample_dir,
+                                                      'cover.jpg')]
+
+    for executor in ('thread', 'process'):
+        loaded = list(music_tag.load_files(fnames, workers=2,
+                                           executor=executor))
+        assert [fname for fname, _ in loaded] == fnames, 'bad order'
+
+        for fname, f in loaded[:-1]:
+            assert isinstance(f, music_tag.AudioFile), repr(f)
+            rel_fname = os.path.relpath(fname, test_common.sample_dir)
+            test_common.check_tags(f, rel_fname, test_common.sample_tags)
+        assert isinstance(loaded[-1][1], Exception), 'jpeg loaded as audio'
+
+        unordered = music_tag.load_files(fnames, workers=2, executor=executor,
+                                         ordered=False, max_in_flight=3)
+        assert sorted(fname for fname, _ in unordered) == sorted(fnames)
+
+if __name__ == '__main__':
+    _main()
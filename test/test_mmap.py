@@ -0,0 +1,81 @@
+import io
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import fileops
+
+
+def _make_temp_fname(fname):
+    return os.path.join(os.path.dirname(fname),
+                        '_test_' + os.path.basename(fname))
+
+
+def _test_reader():
+    fname = test_common.sample_files[0]
+    size = os.path.getsize(fname)
+    with open(fname, 'rb') as fin:
+        orig = fin.read()
+
+    with fileops.open_for_reading(fname, 'mmap') as f:
+        assert isinstance(f, fileops.MmapReader)
+        assert f.read(0) == b''
+        assert f.read() == orig
+        assert f.seek(-128, io.SEEK_END) == size - 128
+        assert f.read() == orig[-128:]
+        assert f.seek(-10, io.SEEK_CUR) == size - 10
+        assert f.seek(size + 100) == size
+        assert f.read(4) == b''
+        try:
+            f.seek(-size - 1, io.SEEK_END)
+        except OSError:
+            pass
+        else:
+            assert False, 'seeking before the start should raise OSError'
+
+    # empty files can't be mapped, they're read as regular files
+    temp_fname = _make_temp_fname(fname)
+    open(temp_fname, 'wb').close()
+    try:
+        with fileops.open_for_reading(temp_fname, 'mmap') as f:
+            assert not isinstance(f, fileops.MmapReader)
+            assert f.read() == b''
+    finally:
+        os.remove(temp_fname)
+
+    try:
+        music_tag.load_file(fname, io='bogus')
+    except ValueError:
+        pass
+    else:
+        assert False, 'unknown io mode should raise ValueError'
+
+
+def _test_load_save():
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        for lazy in (False, True):
+            f = music_tag.load_file(fname, io='mmap', lazy=lazy)
+            test_common.check_tags(f, rel_fname, test_common.sample_tags)
+
+        temp_fname = _make_temp_fname(fname)
+        shutil.copy(fname, temp_fname)
+        try:
+            f = music_tag.load_file(temp_fname, io='mmap')
+            f['album'] = 'mmap album'
+            f.save()
+            g = music_tag.load_file(temp_fname, io='mmap')
+            assert str(g['album']) == 'mmap album', rel_fname
+        finally:
+            os.remove(temp_fname)
+
+
+def _main():
+    _test_reader()
+    _test_load_save()
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import file as mt_file
+
+
+_SPELLINGS = ('albumartist', 'Album Artist', 'album_artist', 'ALBUM-ARTIST',
+              'Album_Artist', 'album artist')
+
+
+def _test_spellings():
+    for spelling in _SPELLINGS:
+        assert mt_file.normalize_key(spelling) == 'albumartist', spelling
+
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        f = music_tag.load_file(fname)
+        for spelling in _SPELLINGS:
+            # twice: the second lookup comes from the cache
+            for _ in range(2):
+                assert f._normalize_norm_key(spelling) == 'albumartist', \
+                    (rel_fname, spelling)
+                assert (str(f[spelling])
+                        == test_common.sample_tags['albumartist']), \
+                    (rel_fname, spelling)
+
+
+def _test_cache_bound():
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        f = music_tag.load_file(fname)
+        cache = type(f)._norm_key_cache
+        assert f._norm_key_cache is cache, rel_fname
+        bound = max(len(cache), mt_file._NORM_KEY_CACHE_SIZE)
+
+        for i in range(2 * mt_file._NORM_KEY_CACHE_SIZE):
+            key = 'Custom Key {0}'.format(i)
+            assert f._normalize_norm_key(key) == 'customkey{0}'.format(i)
+        assert len(cache) <= bound, (rel_fname, len(cache))
+
+        # spellings that no longer fit are still normalized
+        assert f._normalize_norm_key('aLbUm_ArTiSt') == 'albumartist'
+        assert len(cache) <= bound, (rel_fname, len(cache))
+
+
+def _main():
+    _test_spellings()
+    _test_cache_bound()
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+
+
+def _make_temp_fname(fname):
+    return os.path.join(os.path.dirname(fname),
+                        '_test_' + os.path.basename(fname))
+
+
+def _main():
+    for fname in test_common.sample_files:
+        temp_fname = _make_temp_fname(fname)
+        shutil.copy(fname, temp_fname)
+        rel_fname = os.path.relpath(temp_fname, test_common.sample_dir)
+        try:
+            f = music_tag.load_file(temp_fname)
+
+            if f.padding_mechanism is None:
+                f['comment'] = 'no padding'
+                report = f.save(padding='keep')
+                assert report.in_place is None, rel_fname
+                assert report.padding is None, rel_fname
+                continue
+
+            # too big for the sample's padding, so the first save rewrites
+            # the file, leaving lots of padding for the next edits
+            f['comment'] = 'x' * 4096
+            report = f.save(padding=65536)
+            assert report.written and not report.in_place, rel_fname
+            assert report.padding == 65536, rel_fname
+            size = os.path.getsize(temp_fname)
+
+            f.padding_policy = 'keep'
+            f['comment'] = 'y' * 8192
+            report = f.save()
+            assert report.in_place, rel_fname
+            assert os.path.getsize(temp_fname) == size, rel_fname
+
+            f = music_tag.load_file(temp_fname)
+            assert str(f['comment']) == 'y' * 8192, rel_fname
+
+            f['comment'] = 'compact'
+            report = f.save(padding='compact')
+            assert not report.in_place and report.padding == 0, rel_fname
+            assert os.path.getsize(temp_fname) < size, rel_fname
+
+            try:
+                f.save(force=True, padding='lots')
+            except ValueError:
+                pass
+            else:
+                assert False, 'bad policy name should raise ValueError'
+        finally:
+            os.remove(temp_fname)
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+
+
+def _make_temp_fname(fname):
+    return os.path.join(os.path.dirname(fname),
+                        '_test_' + os.path.basename(fname))
+
+
+def _main():
+    for fname in test_common.sample_files:
+        temp_fname = _make_temp_fname(fname)
+        shutil.copy(fname, temp_fname)
+        rel_fname = os.path.relpath(temp_fname, test_common.sample_dir)
+        try:
+            f = music_tag.load_file(temp_fname)
+            f.skip_clean_saves = True
+            plan = f.plan_save()
+            assert not plan.written and plan.bytes_written == 0, rel_fname
+
+            for comment, padding in (('x' * 10, 'keep'), ('y' * 5000, 'keep'),
+                                     ('z', 'compact')):
+                f['comment'] = comment
+                with open(temp_fname, 'rb') as fin:
+                    orig = fin.read()
+
+                plan = f.plan_save(padding=padding)
+                assert plan.written, rel_fname
+                with open(temp_fname, 'rb') as fin:
+                    assert fin.read() == orig, rel_fname
+
+                report = f.save(padding=padding)
+                if f.padding_mechanism is None:
+                    assert plan.rewrite is None, rel_fname
+                    assert plan.bytes_written is None, rel_fname
+                    continue
+
+                assert plan.rewrite == (not report.in_place), rel_fname
+                assert plan.padding == report.padding, rel_fname
+                if not plan.rewrite:
+                    assert len(orig) == os.path.getsize(temp_fname), rel_fname
+                    assert plan.bytes_written < len(orig), rel_fname
+                assert str(music_tag.load_file(temp_fname)['comment']) == comment
+        finally:
+            os.remove(temp_fname)
+
+    _test_id3_rewrite()
+
+
+def _test_id3_rewrite():
+    # a rewrite writes the new tag and moves everything after the old one
+    for name, marker, offset in (('440Hz.mp3', b'ID3', 0),
+                                 ('440Hz.aiff', b'ID3 ', 8)):
+        fname = os.path.join(test_common.sample_dir, name)
+        temp_fname = _make_temp_fname(fname)
+        shutil.copy(fname, temp_fname)
+        try:
+            f = music_tag.load_file(temp_fname)
+            f['comment'] = 'y' * 50000
+            plan = f.plan_save(padding='compact')
+            assert plan.rewrite, name
+            f.save(padding='compact')
+            with open(temp_fname, 'rb') as fin:
+                data = fin.read()
+            rewritten = len(data) - data.index(marker) - offset
+            assert abs(plan.bytes_written - rewritten) <= 2, \
+                (name, plan.bytes_written, rewritten)
+        finally:
+            os.remove(temp_fname)
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+
+
+def _main():
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        f = music_tag.load_file(fname)
+
+        # fill the cache, then make sure edits show up through it
+        for key in ('title', 'artist', 'tracknumber', 'totaltracks',
+                    'discnumber', 'totaldiscs', 'artwork'):
+            f.get(key)
+
+        f['tracknumber'] = 3
+        assert f['tracknumber'].value == 3, rel_fname
+        assert f['totaltracks'].value == 1, rel_fname
+        f['totaltracks'] = 7
+        assert f['tracknumber'].value == 3, rel_fname
+        assert f['totaltracks'].value == 7, rel_fname
+
+        f['discnumber'] = 2
+        f['totaldiscs'] = 4
+        assert f['discnumber'].value == 2, rel_fname
+        assert f['totaldiscs'].value == 4, rel_fname
+
+        del f['artist']
+        assert 'artist' not in f, rel_fname
+        assert str(f.resolve('artist')) == 'Various Artists', rel_fname
+
+        if f.appendable:
+            f.append_tag('genre', 'Other')
+            assert str(f['genre']) == 'Analytic, Other', rel_fname
+
+        # items handed out are copies, mutating them doesn't touch the cache
+        title = f['title']
+        title.values = ['changed']
+        assert str(f['title']) == '440Hz', rel_fname
+
+        art0 = f['artwork'].first
+        assert f['artwork'].first is art0, rel_fname
+
+    # editing mfile directly needs clear_cache() or cache_reads = False
+    f = music_tag.load_file(os.path.join(test_common.sample_dir, '440Hz.flac'))
+    assert str(f['title']) == '440Hz'
+    f.mfile.tags['title'] = 'direct'
+    assert str(f['title']) == '440Hz'
+    f.clear_cache(['title'])
+    assert str(f['title']) == 'direct'
+
+    f.cache_reads = False
+    f.mfile.tags['title'] = 'direct 2'
+    assert str(f['title']) == 'direct 2'
+
+if __name__ == '__main__':
+    _main()
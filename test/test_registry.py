@@ -0,0 +1,52 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import mutagen
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+from music_tag import registry
+
+
+def _check(fname):
+    try:
+        expected = type(mutagen.File(fname))
+    except Exception as e:  # pylint: disable=broad-except
+        # mutagen picked a kind that can't parse the file; so must we
+        try:
+            music_tag.load_file(fname)
+        except type(e):
+            return
+        assert False, '{0}: expected {1}'.format(fname, type(e).__name__)
+
+    with open(fname, 'rb') as fin:
+        assert registry.guess_mutagen_kls(fname, fin) is expected, fname
+        fin.seek(0, 0)
+        header = fin.read(128)
+        assert registry.score(fname, fin, header) is expected, fname
+    kind = registry.sniff(fname, header)
+    assert kind is None or kind is expected, (fname, kind)
+    assert type(music_tag.load_file(fname).mfile) is expected, fname
+
+
+def _main():
+    exts = [os.path.splitext(f)[1] for f in test_common.sample_files]
+    tmp_dir = tempfile.mkdtemp(prefix='music_tag_test_')
+    try:
+        for i, fname in enumerate(test_common.sample_files):
+            _check(fname)
+            # the same file behind every other sample's extension
+            for ext in exts[:i] + exts[i + 1:]:
+                if ext == os.path.splitext(fname)[1]:
+                    continue
+                temp_fname = os.path.join(tmp_dir, 'mismatched' + ext)
+                shutil.copy(fname, temp_fname)
+                _check(temp_fname)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    _main()
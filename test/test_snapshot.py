@@ -0,0 +1,47 @@
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+
+
+def _main():
+    keys = [k for k in test_common.sample_tags if k != 'artwork']
+    keys += ['Album Artist', 'work']
+
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        f = music_tag.load_file(fname)
+
+        snap = f.snapshot(keys)
+        assert list(snap) == keys, rel_fname
+        for key in keys:
+            assert list(snap[key]) == f[key].values, (rel_fname, key)
+            assert snap.text(key) == str(f[key]), (rel_fname, key)
+        assert snap['work'] == (), rel_fname
+        assert 'work' not in snap.present(), rel_fname
+        assert snap.first('tracknumber') == 1, rel_fname
+
+        rsnap = f.snapshot(['albumartist', 'compilation', 'discnumber',
+                            'totaldiscs'], resolve=True)
+        for key in rsnap:
+            assert rsnap.text(key) == str(f.resolve(key)), (rel_fname, key)
+
+        art = f.snapshot(['artwork']).first('artwork')
+        assert art.data == test_common.sample_artwork, rel_fname
+
+        snap2 = pickle.loads(pickle.dumps(snap))
+        assert dict(snap2) == dict(snap), rel_fname
+        assert snap2.filename == fname, rel_fname
+
+        try:
+            f.snapshot(['not a tag'])
+        except KeyError:
+            pass
+        else:
+            assert False, 'unknown key should raise KeyError'
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,54 @@
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import _test_common as test_common
+music_tag = test_common.music_tag
+
+
+def _main():
+    for fname in test_common.sample_files:
+        rel_fname = os.path.relpath(fname, test_common.sample_dir)
+        f = music_tag.load_file(fname)
+        g = music_tag.load_file(fname)
+
+        # maps are shared by every file of a format until customized
+        assert f.tag_map is g.tag_map, rel_fname
+        assert 'tag_map' not in vars(f), rel_fname
+        try:
+            f.tag_map['title'] = None
+        except TypeError:
+            pass
+        else:
+            assert False, 'tag_map is writable'
+
+        f.customize(tag_aliases={'songname': 'title'},
+                    singular_keys=['artist'])
+        assert str(f['song name']) == test_common.sample_tags['tracktitle']
+        assert 'artist' in f.singular_keys
+        assert 'songname' not in g.tag_aliases
+        assert 'artist' not in g.singular_keys
+
+        f = pickle.loads(pickle.dumps(f))
+        assert str(f['song name']) == test_common.sample_tags['tracktitle']
+        assert 'artist' in f.singular_keys
+
+        # the maps are rebuilt from the customizations when unpickled
+        f.customize(tag_map={'mood': music_tag.file.TAG_MAP_ENTRY(
+                                 getter='mood', setter='mood', type=str)},
+                    resolvers={'mood': ('genre', )})
+        f = pickle.loads(pickle.dumps(f))
+        assert 'mood' in f.tag_map and 'mood' not in g.tag_map, rel_fname
+        assert str(f.resolve('mood')) == str(f['genre']), rel_fname
+        assert str(f['song name']) == test_common.sample_tags['tracktitle']
+
+        # keys() / info() list _TAG_MAP, which doesn't have the stream
+        # info these formats patch into tag_map
+        if rel_fname in ('440Hz.mp3', '440Hz.aiff', '440Hz.dsf'):
+            assert '#codec' in f.tag_map, rel_fname
+            assert '#codec' not in f._TAG_MAP, rel_fname
+            assert str(f['#codec']) == str(g['#codec']), rel_fname
+
+if __name__ == '__main__':
+    _main()